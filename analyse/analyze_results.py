@@ -32,7 +32,7 @@ DATABASES = ["MongoDB", "Redis", "Cassandra", "Neo4j"]
 SCENARIOS = {
     "scenario1_crud": {
         "name": "CRUD Operations",
-        "fields": ["latency_ms", "total_time", "cpu_percent", "memory_percent"],
+        "fields": ["latency_ms", "p50_ms", "p99_ms", "p999_ms", "total_time", "cpu_percent", "memory_percent"],
         "operations": ["insert", "read", "update", "delete"]
     },
     "scenario2_iot": {
@@ -183,6 +183,7 @@ def display_comparison():
     comparisons = [
         ("scenario1_crud", "latency_ms", "insert", "CRUD Insert Latency (ms) - Lower is better"),
         ("scenario1_crud", "latency_ms", "read", "CRUD Read Latency (ms) - Lower is better"),
+        ("scenario1_crud", "p99_ms", "read", "CRUD Read p99 Latency (ms) - Lower is better"),
         ("scenario2_iot", "insert_throughput", None, "IoT Insert Throughput (records/sec) - Higher is better"),
         ("scenario4_keyvalue", "get_latency_ms", None, "Key-Value GET Latency (ms) - Lower is better"),
     ]
@@ -1,82 +1,151 @@
 """
-Script principal pour lancer TOUS les benchmarks automatiquement
-Usage: python run_all_benchmarks.py
+Script principal pour lancer TOUS les benchmarks dans un seul processus
+Usage:
+    python run/run_all_benchmarks.py                          # tous les scénarios, toutes les bases
+    python run/run_all_benchmarks.py -s 1 4 -d Redis MongoDB  # sélection
+    python run/run_all_benchmarks.py --stand-ins              # sans conteneurs (stores en mémoire)
+    python run/run_all_benchmarks.py -s 2 --bulk-load         # + chargement driver vs outils natifs
+    python run/run_all_benchmarks.py --schema-stages none after   # sans index puis indexé après chargement
+
+Les scénarios sont importés comme modules: les drivers ne sont chargés
+qu'une fois, les connexions (backends) et le client InfluxDB sont partagés
+entre scénarios, et les pauses fixes sont remplacées par des pings.
 """
-import subprocess
-import time
+import argparse
+import importlib
+import os
 import sys
+import time
+
+SCENARIOS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scenarios")
+sys.path.insert(0, SCENARIOS_DIR)
+
+import backends  # noqa: E402
+import datasets  # noqa: E402
+import metrics  # noqa: E402
+import schema  # noqa: E402
 
-# Liste de tous les scénarios
-SCENARIOS = [
-    "scenarios/scenario1_crud_benchmark.py",
-    "scenarios/scenario2_iot_logs.py", 
-    "scenarios/scenario3_graph_queries.py",
-    "scenarios/scenario4_keyvalue_speed.py",
-    "scenarios/scenario5_fulltext_search.py",
-    "scenarios/scenario6_scalability.py"
-]
-
-def run_scenario(script_name):
-    """Execute un scénario"""
+# Liste de tous les scénarios (numéro -> module)
+SCENARIOS = {
+    "1": "scenario1_crud_benchmark",
+    "2": "scenario2_iot_logs",
+    "3": "scenario3_graph_queries",
+    "4": "scenario4_keyvalue_speed",
+    "5": "scenario5_fulltext_search",
+    "6": "scenario6_scalability",
+}
+BULK_LOAD = "bulkload"  # Étape optionnelle: chargement driver vs outils d'import natifs
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark NoSQL - exécution complète")
+    parser.add_argument("-s", "--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help="Scénarios à exécuter (1 à 6, tous par défaut)")
+    parser.add_argument("-d", "--databases", nargs="+", choices=backends.available_backends(),
+                        default=backends.available_backends(),
+                        help="Bases à tester (toutes par défaut)")
+    parser.add_argument("--stand-ins", action="store_true",
+                        help="Remplace les bases par des stores en mémoire (aucun conteneur requis)")
+    parser.add_argument("--ready-timeout", type=float, default=60.0,
+                        help="Attente max (s) qu'une base réponde au ping")
+    parser.add_argument("--schema-stages", nargs="+", choices=schema.SCHEMA_STAGES, default=[schema.SCHEMA_STAGE],
+                        help="Création des index (before, after, none); plusieurs valeurs: scénarios rejoués "
+                             "pour chacune, points étiquetés indexes=<mode>")
+    parser.add_argument("--bulk-load", action="store_true",
+                        help="Compare aussi le chargement par driver et par outil d'import natif (bulkload.py)")
+    return parser.parse_args(argv)
+
+def warm_up(databases, timeout):
+    """Ouvre et vérifie une fois les connexions de chaque base, retourne les bases prêtes"""
+    ready = []
+    for db_name in databases:
+        start = time.perf_counter()
+        try:
+            backends.wait_ready(db_name, timeout=timeout)
+        except Exception as e:
+            print(f"  ❌ {db_name} indisponible: {e}")
+            continue
+        print(f"  ✅ {db_name} prêt ({(time.perf_counter() - start)*1000:.0f}ms)")
+        ready.append(db_name)
+    return ready
+
+def prepare_datasets(modules):
+    """Importe les scénarios et construit (ou réutilise) leurs jeux de données, hors mesure"""
+    start = time.perf_counter()
+    for module_name in modules:
+        importlib.import_module(module_name)
+    names = datasets.build_all()
+    print(f"  ✅ {len(names)} jeux de données prêts ({(time.perf_counter() - start):.1f}s)")
+
+def run_scenario(module_name, databases):
+    """Importe et exécute un scénario dans le processus courant"""
     print(f"\n{'='*70}")
-    print(f"🚀 LANCEMENT: {script_name}")
+    print(f"🚀 LANCEMENT: {module_name}")
     print(f"{'='*70}\n")
-    
+
     try:
-        result = subprocess.run(
-            [sys.executable, script_name],
-            check=True,
-            capture_output=False
-        )
-        print(f"\n✅ {script_name} terminé avec succès")
+        module = importlib.import_module(module_name)
+        module.run(databases)
+        print(f"\n✅ {module_name} terminé avec succès")
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"\n❌ Erreur dans {script_name}: {e}")
-        return False
-    except KeyboardInterrupt:
-        print("\n⚠️ Interruption utilisateur")
+    except Exception as e:
+        print(f"\n❌ Erreur dans {module_name}: {e}")
         return False
 
-def main():
+def main(argv=None):
+    args = parse_args(argv)
+    if args.stand_ins:
+        backends.use_stand_ins()
+
+    selected = ([BULK_LOAD] if args.bulk_load else []) + [SCENARIOS[s] for s in args.scenarios]
+
     print("="*70)
     print("🔥 BENCHMARK NOSQL - EXECUTION COMPLETE")
     print("="*70)
-    print(f"📊 {len(SCENARIOS)} scénarios à exécuter")
-    print("⏱️  Durée estimée: 15-30 minutes")
+    print(f"📊 {len(selected)} scénarios à exécuter")
+    print(f"🧱 Index: {', '.join(args.schema_stages)}")
+    print(f"🗄️  Bases: {', '.join(args.databases)}{' (stand-ins en mémoire)' if args.stand_ins else ''}")
     print("="*70)
-    
-    input("\nAppuyez sur ENTREE pour démarrer...")
-    
+
     start_time = time.time()
     success_count = 0
-    
-    # Exécuter chaque scénario
-    for i, scenario in enumerate(SCENARIOS, 1):
-        print(f"\n📍 Progression: {i}/{len(SCENARIOS)}")
-        
-        if run_scenario(scenario):
-            success_count += 1
+
+    try:
+        print("\n🔌 Connexion aux bases...")
+        databases = warm_up(args.databases, args.ready_timeout)
+        if not databases:
+            print("\n❌ Aucune base disponible")
+            return 1
         
-        # Pause entre les scénarios
-        if i < len(SCENARIOS):
-            print("\n⏸️  Pause de 3 secondes...")
-            time.sleep(3)
-    
+        print("\n📦 Jeux de données...")
+        prepare_datasets(selected)
+
+        # Exécuter chaque scénario, une fois par mode d'indexation
+        runs = [(stage, module_name) for stage in args.schema_stages for module_name in selected]
+        for i, (stage, module_name) in enumerate(runs, 1):
+            schema.set_stage(stage)
+            print(f"\n📍 Progression: {i}/{len(runs)} (index: {stage})")
+            if run_scenario(module_name, databases):
+                success_count += 1
+    finally:
+        metrics.close()
+        backends.close_all()
+
     # Résumé
     elapsed = time.time() - start_time
     print("\n" + "="*70)
     print("✅ BENCHMARK TERMINÉ")
     print("="*70)
     print(f"⏱️  Temps total: {elapsed/60:.1f} minutes")
-    print(f"📊 Réussis: {success_count}/{len(SCENARIOS)}")
+    print(f"📊 Réussis: {success_count}/{len(selected) * len(args.schema_stages)}")
     print(f"📈 Résultats disponibles sur:")
     print(f"   - Grafana: http://localhost:3000")
     print(f"   - InfluxDB: http://localhost:8086")
     print("="*70)
+    return 0 if success_count == len(selected) * len(args.schema_stages) else 1
 
 if __name__ == "__main__":
     try:
-        main()
+        sys.exit(main())
     except KeyboardInterrupt:
         print("\n\n⚠️ Benchmark interrompu par l'utilisateur")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -0,0 +1,1155 @@
+"""
+Couche d'adaptateurs commune aux six scénarios.
+
+Chaque base NoSQL est exposée derrière la même interface
+(put/get/update/delete/bulk/scan/query) avec une connexion longue durée
+et poolée, ouverte une seule fois hors des régions chronométrées.
+
+Usage:
+    from backends import get_backend
+    mongo = get_backend("MongoDB")
+    mongo.reset("users_crud", key="user_id", fields={"user_id": int, "name": str})
+    mongo.put("users_crud", 1, {"user_id": 1, "name": "Test User 1"})
+
+Ajouter une base = une classe décorée par @register_backend("Nom").
+Mode stand-in (BENCH_STAND_INS=1 ou use_stand_ins()) : toutes les bases sont
+remplacées par des stores en mémoire, la suite tourne sans conteneurs.
+"""
+import asyncio
+import atexit
+import importlib
+import importlib.util
+import os
+import subprocess
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ---------------- CONFIGURATION DES CONNEXIONS ----------------
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB = os.getenv("MONGO_DB", "testdb")
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
+NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
+CASSANDRA_HOSTS = os.getenv("CASSANDRA_HOSTS", "localhost").split(",")
+CASSANDRA_PORT = int(os.getenv("CASSANDRA_PORT", "9042"))
+CASSANDRA_CONTAINER = os.getenv("CASSANDRA_CONTAINER", "cassandra")
+CASSANDRA_KEYSPACE = os.getenv("CASSANDRA_KEYSPACE", "benchks")
+
+POOL_SIZE = int(os.getenv("BENCH_POOL_SIZE", "64"))  # Connexions max par base
+ASYNC_POOL_SIZE = int(os.getenv("BENCH_ASYNC_POOL_SIZE", "10000"))  # Plafond des connexions des clients asyncio
+CASSANDRA_CONCURRENCY = int(os.getenv("CASSANDRA_CONCURRENCY", "64"))  # Requêtes CQL en vol pour bulk()
+BULK_CHUNK = 1000  # Taille des paquets pour bulk()
+
+_REGISTRY = {}
+_INSTANCES = {}
+_lock = threading.Lock()
+_stand_ins = os.getenv("BENCH_STAND_INS", "0") == "1"
+
+
+class NotSupportedError(Exception):
+    """Opération native indisponible sur ce backend (ex: stand-in en mémoire)"""
+
+
+# ============================================
+# REGISTRE
+# ============================================
+def register_backend(name):
+    """Décorateur: enregistre une classe de backend sous un nom (tag InfluxDB)"""
+    def decorator(cls):
+        cls.name = name
+        _REGISTRY[name] = cls
+        return cls
+    return decorator
+
+
+def available_backends():
+    """Noms des backends enregistrés, dans l'ordre d'enregistrement"""
+    return list(_REGISTRY)
+
+
+def use_stand_ins(enabled=True):
+    """Active/désactive le remplacement de toutes les bases par des stores en mémoire"""
+    global _stand_ins
+    _stand_ins = enabled
+
+
+def stand_ins_enabled():
+    return _stand_ins
+
+
+def get_backend(name):
+    """Retourne l'instance connectée (partagée) du backend demandé"""
+    with _lock:
+        cache_key = (name, _stand_ins)
+        backend = _INSTANCES.get(cache_key)
+        if backend is None:
+            if name not in _REGISTRY:
+                raise KeyError(f"Backend inconnu: {name} (disponibles: {', '.join(_REGISTRY)})")
+            backend = MemoryBackend(name) if _stand_ins else _REGISTRY[name].open()
+            _INSTANCES[cache_key] = backend
+        return backend
+
+
+def wait_ready(name, timeout=60.0, interval=0.5):
+    """
+    Attend que le backend réponde à ping() (remplace les pauses fixes).
+    Retourne le backend connecté; lève TimeoutError après `timeout` secondes.
+    """
+    deadline = time.monotonic() + timeout
+    last_error = None
+    while True:
+        try:
+            backend = get_backend(name)
+            if backend.ping():
+                return backend
+        except Exception as e:
+            last_error = e
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"{name} non disponible après {timeout:.0f}s ({last_error})")
+        time.sleep(interval)
+
+
+def close_all():
+    """Ferme toutes les connexions ouvertes par get_backend()"""
+    with _lock:
+        for backend in _INSTANCES.values():
+            try:
+                backend.close()
+            except Exception:
+                pass
+        _INSTANCES.clear()
+
+
+atexit.register(close_all)
+
+
+# ============================================
+# INTERFACE COMMUNE
+# ============================================
+class Backend:
+    """
+    Interface uniforme d'un backend.
+
+    Un namespace (ns) correspond à une collection MongoDB, un préfixe de clés
+    Redis, une table Cassandra ou un label Neo4j. La clé d'un document est
+    décrite par reset(): un champ, ou un tuple de champs (clé composite).
+    """
+    name = None
+    stand_in = False
+    process_per_op = False  # True si chaque opération lance un processus (repli cqlsh)
+
+    def __init__(self):
+        self._schemas = {}
+
+    # ---- cycle de vie ----
+    @classmethod
+    def open(cls):
+        """Crée et connecte une instance (surchargé pour choisir une implémentation)"""
+        backend = cls()
+        backend.connect()
+        return backend
+
+    def connect(self):
+        pass
+
+    def close(self):
+        pass
+
+    def ping(self):
+        """True si la base répond (aller-retour minimal)"""
+        return True
+
+    @property
+    def client(self):
+        """Client natif du driver, pour les requêtes spécifiques au scénario"""
+        raise NotSupportedError(f"{self.name}: pas de client natif")
+
+    # ---- schéma ----
+    def reset(self, ns, key="_id", fields=None):
+        """Vide le namespace et mémorise sa clé et ses types de champs"""
+        self._schemas[ns] = (key, dict(fields or {}))
+        self.drop(ns)
+
+    def drop(self, ns):
+        raise NotImplementedError
+
+    def key_fields(self, ns):
+        key = self._schemas.get(ns, ("_id", {}))[0]
+        return key if isinstance(key, tuple) else (key,)
+
+    def field_types(self, ns):
+        return self._schemas.get(ns, ("_id", {}))[1]
+
+    def key_of(self, ns, doc):
+        """Extrait la clé d'un document selon le schéma du namespace"""
+        fields = self.key_fields(ns)
+        if len(fields) == 1:
+            return doc[fields[0]]
+        return tuple(doc[f] for f in fields)
+
+    def key_filter(self, ns, key):
+        """Clé -> dict {champ: valeur}"""
+        fields = self.key_fields(ns)
+        values = key if isinstance(key, tuple) else (key,)
+        return dict(zip(fields, values))
+
+    def create_index(self, ns, name, fields, kind="index", ttl=None):
+        """
+        Crée l'index `name` sur `fields` (kind: index, unique, text) ou une
+        expiration (kind ttl, `ttl` secondes). Retourne False si la clé
+        primaire le couvre déjà; NotSupportedError si la base n'a pas d'équivalent.
+        """
+        raise NotSupportedError(f"{self.name}: pas d'index secondaire")
+
+    def drop_index(self, ns, name):
+        """Supprime l'index (ou la contrainte) `name` s'il existe"""
+
+    def explain(self, ns, where):
+        """Plan de query(ns, where): (description des opérateurs, True si un index est utilisé)"""
+        raise NotSupportedError(f"{self.name}: pas de plan d'exécution")
+
+    # ---- opérations uniformes ----
+    def put(self, ns, key, doc):
+        raise NotImplementedError
+
+    def get(self, ns, key):
+        raise NotImplementedError
+
+    def update(self, ns, key, fields):
+        raise NotImplementedError
+
+    def delete(self, ns, key):
+        raise NotImplementedError
+
+    def bulk(self, ns, docs):
+        """Insère une liste de documents, retourne le nombre inséré"""
+        count = 0
+        for doc in docs:
+            self.put(ns, self.key_of(ns, doc), doc)
+            count += 1
+        return count
+
+    def scan(self, ns, prefix=None):
+        """Itère sur les clés du namespace (préfixe optionnel sur la clé)"""
+        raise NotImplementedError
+
+    def query(self, ns, where=None, limit=None):
+        """
+        Itère sur les documents filtrés.
+        where: {champ: valeur} pour une égalité, {champ: (min, max)} pour un intervalle inclusif.
+        """
+        raise NotImplementedError
+
+    def execute(self, *args, **kwargs):
+        """Requête native (Cypher, CQL, pipeline d'agrégation, commande Redis)"""
+        raise NotSupportedError(f"{self.name}: requêtes natives non supportées")
+
+    # ---- variantes asyncio ----
+    # Clients async liés à la boucle courante: aopen()/aclose() dans la même boucle.
+    # pool_size: connexions du client async (= requêtes en vol possibles côté serveur).
+    # Par défaut, l'appel bloquant est déporté dans un thread.
+    async def aopen(self, pool_size=ASYNC_POOL_SIZE):
+        pass
+
+    async def aclose(self):
+        pass
+
+    async def aput(self, ns, key, doc):
+        await asyncio.to_thread(self.put, ns, key, doc)
+
+    async def aget(self, ns, key):
+        return await asyncio.to_thread(self.get, ns, key)
+
+
+def key_str(key):
+    """Forme texte d'une clé (les clés composites sont jointes par ':')"""
+    if isinstance(key, tuple):
+        return ":".join(str(k) for k in key)
+    return str(key)
+
+
+def _matches(doc, where):
+    """Filtre commun aux backends qui évaluent `where` côté client"""
+    for field, cond in (where or {}).items():
+        value = doc.get(field)
+        if isinstance(cond, tuple):
+            low, high = cond
+            if value is None or value < low or value > high:
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+# ============================================
+# MONGODB
+# ============================================
+@register_backend("MongoDB")
+class MongoBackend(Backend):
+    def connect(self):
+        from pymongo import MongoClient
+        self._mongo = MongoClient(MONGO_URI, maxPoolSize=POOL_SIZE)
+        self._db = self._mongo[MONGO_DB]
+
+    def close(self):
+        self._mongo.close()
+
+    def ping(self):
+        return self._mongo.admin.command("ping").get("ok") == 1
+
+    @property
+    def client(self):
+        return self._db
+
+    def collection(self, ns):
+        return self._db[ns]
+
+    def drop(self, ns):
+        self._db[ns].drop()
+
+    def put(self, ns, key, doc):
+        # insert_one ajoute _id au dict: on insère une copie
+        self._db[ns].insert_one(dict(doc))
+
+    def get(self, ns, key):
+        return self._db[ns].find_one(self.key_filter(ns, key), {"_id": 0})
+
+    def update(self, ns, key, fields):
+        self._db[ns].update_one(self.key_filter(ns, key), {"$set": fields})
+
+    def delete(self, ns, key):
+        self._db[ns].delete_one(self.key_filter(ns, key))
+
+    def bulk(self, ns, docs):
+        docs = [dict(doc) for doc in docs]
+        if docs:
+            self._db[ns].insert_many(docs, ordered=False)
+        return len(docs)
+
+    def scan(self, ns, prefix=None):
+        fields = self.key_fields(ns)
+        projection = {f: 1 for f in fields}
+        for doc in self._db[ns].find({}, projection):
+            key = doc[fields[0]] if len(fields) == 1 else tuple(doc[f] for f in fields)
+            if prefix is None or key_str(key).startswith(prefix):
+                yield key
+
+    @staticmethod
+    def _filter(where):
+        mongo_filter = {}
+        for field, cond in (where or {}).items():
+            if isinstance(cond, tuple):
+                mongo_filter[field] = {"$gte": cond[0], "$lte": cond[1]}
+            else:
+                mongo_filter[field] = cond
+        return mongo_filter
+
+    def query(self, ns, where=None, limit=None):
+        cursor = self._db[ns].find(self._filter(where), {"_id": 0})
+        if limit:
+            cursor = cursor.limit(limit)
+        return cursor
+
+    def create_index(self, ns, name, fields, kind="index", ttl=None):
+        direction = "text" if kind == "text" else 1
+        options = {"unique": True} if kind == "unique" else {}
+        if kind == "ttl":
+            options["expireAfterSeconds"] = int(ttl)
+        self._db[ns].create_index([(f, direction) for f in fields], name=name, **options)
+        return True
+
+    def drop_index(self, ns, name):
+        from pymongo.errors import OperationFailure
+        try:
+            self._db[ns].drop_index(name)
+        except OperationFailure:
+            pass  # Index (ou collection) absent
+
+    def explain(self, ns, where):
+        plan = self._db[ns].find(self._filter(where), {"_id": 0}).explain()["queryPlanner"]["winningPlan"]
+        # Étapes de la racine à la feuille (moteur SBE: sous "queryPlan")
+        stages = []
+        while plan:
+            plan = plan.get("queryPlan", plan)
+            stage = plan.get("stage", "?")
+            stages.append(f"{stage}({plan['indexName']})" if "indexName" in plan else stage)
+            plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+        indexed = any(s.startswith(("IXSCAN", "IDHACK", "EXPRESS")) for s in stages)
+        return " > ".join(reversed(stages)), indexed
+
+    def execute(self, ns, pipeline):
+        """Pipeline d'agrégation sur la collection ns"""
+        return list(self._db[ns].aggregate(pipeline))
+
+    async def aopen(self, pool_size=ASYNC_POOL_SIZE):
+        try:
+            from motor.motor_asyncio import AsyncIOMotorClient
+        except ImportError:
+            raise NotSupportedError("MongoDB: motor non installé (pip install motor)")
+        self._amongo = AsyncIOMotorClient(MONGO_URI, maxPoolSize=pool_size)
+        self._adb = self._amongo[MONGO_DB]
+
+    async def aclose(self):
+        self._amongo.close()
+
+    async def aput(self, ns, key, doc):
+        await self._adb[ns].insert_one(dict(doc))
+
+    async def aget(self, ns, key):
+        return await self._adb[ns].find_one(self.key_filter(ns, key), {"_id": 0})
+
+
+# ============================================
+# REDIS
+# ============================================
+@register_backend("Redis")
+class RedisBackend(Backend):
+    def connect(self):
+        import redis
+        self._pool = redis.ConnectionPool(
+            host=REDIS_HOST, port=REDIS_PORT,
+            max_connections=POOL_SIZE, decode_responses=True
+        )
+        self._redis = redis.Redis(connection_pool=self._pool)
+
+    def close(self):
+        self._pool.disconnect()
+
+    def ping(self):
+        return self._redis.ping()
+
+    @property
+    def client(self):
+        return self._redis
+
+    def redis_key(self, ns, key):
+        return f"{ns}:{key_str(key)}"
+
+    @staticmethod
+    def _encode(doc):
+        mapping = {}
+        for field, value in doc.items():
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple)):
+                value = ",".join(str(v) for v in value)
+            elif isinstance(value, bool):
+                value = int(value)
+            mapping[field] = value
+        return mapping
+
+    def _decode(self, ns, raw):
+        types = self.field_types(ns)
+        doc = {}
+        for field, value in raw.items():
+            kind = types.get(field, str)
+            if kind is list:
+                doc[field] = value.split(",") if value else []
+            elif kind in (int, float):
+                doc[field] = kind(value)
+            else:
+                doc[field] = value
+        return doc
+
+    def explain(self, ns, where):
+        # Pas d'index secondaire: accès direct si la clé complète est fixée, sinon parcours
+        if all(not isinstance(where.get(f, ()), tuple) for f in self.key_fields(ns)):
+            return "HGETALL (clé)", True
+        return "SCAN + filtre côté client", False
+
+    def drop(self, ns):
+        batch = []
+        for key in self._redis.scan_iter(match=f"{ns}:*", count=BULK_CHUNK):
+            batch.append(key)
+            if len(batch) >= BULK_CHUNK:
+                self._redis.unlink(*batch)
+                batch = []
+        if batch:
+            self._redis.unlink(*batch)
+
+    def put(self, ns, key, doc):
+        self._redis.hset(self.redis_key(ns, key), mapping=self._encode(doc))
+
+    def get(self, ns, key):
+        raw = self._redis.hgetall(self.redis_key(ns, key))
+        return self._decode(ns, raw) if raw else None
+
+    def update(self, ns, key, fields):
+        self._redis.hset(self.redis_key(ns, key), mapping=self._encode(fields))
+
+    def delete(self, ns, key):
+        self._redis.delete(self.redis_key(ns, key))
+
+    def bulk(self, ns, docs):
+        count = 0
+        pipe = self._redis.pipeline(transaction=False)
+        for doc in docs:
+            pipe.hset(self.redis_key(ns, self.key_of(ns, doc)), mapping=self._encode(doc))
+            count += 1
+            if count % BULK_CHUNK == 0:
+                pipe.execute()
+        pipe.execute()
+        return count
+
+    def scan(self, ns, prefix=None):
+        offset = len(ns) + 1
+        for key in self._redis.scan_iter(match=f"{ns}:{prefix or ''}*", count=BULK_CHUNK):
+            yield key[offset:]
+
+    def query(self, ns, where=None, limit=None):
+        # Pas d'index secondaire: parcours des hashes + filtre côté client
+        found = 0
+        keys = []
+        for key in self._redis.scan_iter(match=f"{ns}:*", count=BULK_CHUNK):
+            keys.append(key)
+            if len(keys) < BULK_CHUNK:
+                continue
+            for doc in self._fetch_filtered(ns, keys, where):
+                yield doc
+                found += 1
+                if limit and found >= limit:
+                    return
+            keys = []
+        for doc in self._fetch_filtered(ns, keys, where):
+            yield doc
+            found += 1
+            if limit and found >= limit:
+                return
+
+    def _fetch_filtered(self, ns, keys, where):
+        if not keys:
+            return
+        pipe = self._redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(key)
+        for raw in pipe.execute():
+            if raw:
+                doc = self._decode(ns, raw)
+                if _matches(doc, where):
+                    yield doc
+
+    def execute(self, *command):
+        return self._redis.execute_command(*command)
+
+    async def aopen(self, pool_size=ASYNC_POOL_SIZE):
+        import redis.asyncio as aioredis
+        # Pool bloquant: au-delà de pool_size, les requêtes attendent une connexion
+        self._apool = aioredis.BlockingConnectionPool(
+            host=REDIS_HOST, port=REDIS_PORT,
+            max_connections=pool_size, timeout=None, decode_responses=True
+        )
+        self._aredis = aioredis.Redis(connection_pool=self._apool)
+
+    async def aclose(self):
+        await self._aredis.aclose()
+        await self._apool.disconnect()
+
+    async def aput(self, ns, key, doc):
+        await self._aredis.hset(self.redis_key(ns, key), mapping=self._encode(doc))
+
+    async def aget(self, ns, key):
+        raw = await self._aredis.hgetall(self.redis_key(ns, key))
+        return self._decode(ns, raw) if raw else None
+
+
+# ============================================
+# CASSANDRA
+# ============================================
+_CQL_TYPES = {int: "bigint", float: "double", str: "text", bool: "boolean", list: "list<text>"}
+
+
+def cql_type(python_type):
+    """Type CQL d'une colonne déclarée avec un type Python (fields de reset)"""
+    return _CQL_TYPES.get(python_type, "text")
+
+
+def cql_literal(value):
+    """Formate une valeur Python en littéral CQL"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(cql_literal(v) for v in value) + "]"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class CqlshCassandraBackend(Backend):
+    """
+    Repli sans driver Python: chaque requête passe par `docker exec cqlsh`.
+    Le coût du fork/exec domine les mesures; utilisé seulement si
+    cassandra-driver ne peut pas être importé.
+    """
+    name = "Cassandra"
+    keyspace = CASSANDRA_KEYSPACE
+    process_per_op = True
+
+    def __init__(self):
+        super().__init__()
+        self._indexes = {}  # ns -> {colonne: index secondaire}
+
+    def connect(self):
+        self.run_cql(
+            f"CREATE KEYSPACE IF NOT EXISTS {self.keyspace} WITH replication = "
+            "{'class': 'SimpleStrategy', 'replication_factor': 1}"
+        )
+
+    def ping(self):
+        return self.run_cql("SELECT release_version FROM system.local", timeout=10) is not None
+
+    def run_cql(self, query, timeout=30):
+        """Exécute une requête CQL via docker exec, retourne la sortie (None si échec)"""
+        cmd = ["docker", "exec", CASSANDRA_CONTAINER, "cqlsh", "-e", query]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        return result.stdout if result.returncode == 0 else None
+
+    def _select_json(self, query):
+        import json
+        output = self.run_cql(query) or ""
+        return [json.loads(line.strip()) for line in output.splitlines() if line.strip().startswith("{")]
+
+    def table(self, ns):
+        return f"{self.keyspace}.{ns}"
+
+    def _where(self, ns, conditions):
+        clauses = []
+        for field, cond in conditions.items():
+            if isinstance(cond, tuple):
+                clauses.append(f"{field} >= {cql_literal(cond[0])} AND {field} <= {cql_literal(cond[1])}")
+            else:
+                clauses.append(f"{field} = {cql_literal(cond)}")
+        return " AND ".join(clauses)
+
+    def reset(self, ns, key="_id", fields=None):
+        super().reset(ns, key, fields)
+        keys = self.key_fields(ns)
+        columns = ", ".join(f"{f} {cql_type(t)}" for f, t in self.field_types(ns).items())
+        # Premier champ de clé = partition, les suivants = clustering
+        primary = f"({keys[0]})" + "".join(f", {k}" for k in keys[1:])
+        self.run_cql(f"CREATE TABLE {self.table(ns)} ({columns}, PRIMARY KEY ({primary}))")
+
+    def drop(self, ns):
+        self.run_cql(f"DROP TABLE IF EXISTS {self.table(ns)}")
+        self._indexes.pop(ns, None)
+
+    def create_index(self, ns, name, fields, kind="index", ttl=None):
+        if kind == "ttl":
+            self.run_cql(f"ALTER TABLE {self.table(ns)} WITH default_time_to_live = {int(ttl)}")
+            return True
+        if tuple(fields) == self.key_fields(ns)[:len(fields)]:
+            return False  # Préfixe de la clé primaire: partition (+ clustering), déjà unique et ordonnée
+        if kind != "index" or len(fields) != 1:
+            raise NotSupportedError(f"Cassandra: pas d'index {kind} sur {', '.join(fields)} "
+                                    "(ni contrainte unique ni index secondaire composite)")
+        self.run_cql(f"CREATE INDEX IF NOT EXISTS {name} ON {self.table(ns)} ({fields[0]})")
+        self._indexes.setdefault(ns, {})[fields[0]] = name
+        return True
+
+    def drop_index(self, ns, name):
+        self.run_cql(f"DROP INDEX IF EXISTS {self.keyspace}.{name}")
+        columns = self._indexes.get(ns, {})
+        for column in [c for c, index in columns.items() if index == name]:
+            del columns[column]
+
+    def explain(self, ns, where):
+        # Pas d'EXPLAIN en CQL: chemin déduit de la clé primaire et des index créés
+        partition = self.key_fields(ns)[0]
+        if partition in where and not isinstance(where[partition], tuple):
+            return f"partition ({partition})", True
+        for field in where:
+            index = self._indexes.get(ns, {}).get(field)
+            if index:
+                return f"index secondaire {index}", True
+        return "ALLOW FILTERING (parcours de la table)", False
+
+    def _insert(self, ns, doc):
+        columns = ", ".join(doc)
+        values = ", ".join(cql_literal(v) for v in doc.values())
+        return f"INSERT INTO {self.table(ns)} ({columns}) VALUES ({values})"
+
+    def put(self, ns, key, doc):
+        self.run_cql(self._insert(ns, doc))
+
+    def get(self, ns, key):
+        rows = self._select_json(
+            f"SELECT JSON * FROM {self.table(ns)} WHERE {self._where(ns, self.key_filter(ns, key))} LIMIT 1"
+        )
+        return rows[0] if rows else None
+
+    def update(self, ns, key, fields):
+        assignments = ", ".join(f"{f} = {cql_literal(v)}" for f, v in fields.items())
+        self.run_cql(
+            f"UPDATE {self.table(ns)} SET {assignments} WHERE {self._where(ns, self.key_filter(ns, key))}"
+        )
+
+    def delete(self, ns, key):
+        self.run_cql(f"DELETE FROM {self.table(ns)} WHERE {self._where(ns, self.key_filter(ns, key))}")
+
+    def bulk(self, ns, docs, batch_size=50):
+        # Petits BATCH non journalisés pour rester sous le timeout de cqlsh
+        count = 0
+        statements = []
+        for doc in docs:
+            statements.append(self._insert(ns, doc))
+            count += 1
+            if len(statements) >= batch_size:
+                self.run_cql("BEGIN UNLOGGED BATCH " + "; ".join(statements) + "; APPLY BATCH")
+                statements = []
+        if statements:
+            self.run_cql("BEGIN UNLOGGED BATCH " + "; ".join(statements) + "; APPLY BATCH")
+        return count
+
+    def scan(self, ns, prefix=None):
+        fields = self.key_fields(ns)
+        for row in self._select_json(f"SELECT JSON {', '.join(fields)} FROM {self.table(ns)}"):
+            key = row[fields[0]] if len(fields) == 1 else tuple(row[f] for f in fields)
+            if prefix is None or key_str(key).startswith(prefix):
+                yield key
+
+    def query(self, ns, where=None, limit=None):
+        query = f"SELECT JSON * FROM {self.table(ns)}"
+        if where:
+            query += f" WHERE {self._where(ns, where)}"
+        if limit:
+            query += f" LIMIT {limit}"
+        if where:
+            query += " ALLOW FILTERING"
+        return iter(self._select_json(query))
+
+    def execute(self, query):
+        return self.run_cql(query)
+
+
+@register_backend("Cassandra")
+class CassandraBackend(CqlshCassandraBackend):
+    """
+    Driver CQL natif: statements préparés (mis en cache), routage token-aware
+    et exécution asynchrone concurrente pour bulk().
+    """
+    process_per_op = False
+
+    @classmethod
+    def open(cls):
+        try:
+            if importlib.util.find_spec("cassandra.cluster") is None:
+                raise ImportError("cassandra-driver non installé")
+            # Installé mais inutilisable: DependencyException à l'import (pas de boucle libev/asyncore en 3.12+)
+            importlib.import_module("cassandra.cluster")
+        except Exception as e:
+            print(f"  ⚠️  cassandra-driver indisponible ({e.__class__.__name__}: {e})")
+            print("  ℹ️  Repli sur cqlsh via docker exec (mesures non comparables)")
+            return CqlshCassandraBackend.open()
+        return super().open()
+
+    def connect(self):
+        from cassandra.cluster import Cluster, ExecutionProfile, EXEC_PROFILE_DEFAULT
+        from cassandra.policies import TokenAwarePolicy, DCAwareRoundRobinPolicy
+        from cassandra.query import dict_factory
+
+        profile = ExecutionProfile(
+            load_balancing_policy=TokenAwarePolicy(DCAwareRoundRobinPolicy()),
+            row_factory=dict_factory,
+            request_timeout=30
+        )
+        self._cluster = Cluster(
+            CASSANDRA_HOSTS, port=CASSANDRA_PORT,
+            execution_profiles={EXEC_PROFILE_DEFAULT: profile}
+        )
+        self._session = self._cluster.connect()
+        self._prepared = {}
+        self._statements = {}  # (opération, ns, colonnes) -> statement: pas de CQL formaté par opération
+        self._prepare_lock = threading.Lock()
+        super().connect()
+
+    def close(self):
+        self._cluster.shutdown()
+
+    def ping(self):
+        return self._session.execute("SELECT release_version FROM system.local").one() is not None
+
+    @property
+    def client(self):
+        return self._session
+
+    def run_cql(self, query, timeout=30):
+        return self._session.execute(query, timeout=timeout)
+
+    def prepare(self, query):
+        """Statement préparé, mis en cache par texte de requête"""
+        statement = self._prepared.get(query)
+        if statement is None:
+            with self._prepare_lock:
+                statement = self._prepared.get(query)
+                if statement is None:
+                    statement = self._session.prepare(query)
+                    self._prepared[query] = statement
+        return statement
+
+    def drop(self, ns):
+        super().drop(ns)
+        # Les statements préparés sur l'ancienne table ne sont plus valides
+        self._prepared = {q: st for q, st in self._prepared.items() if f" {self.table(ns)} " not in f"{q} "}
+        self._statements = {k: st for k, st in self._statements.items() if k[1] != ns}
+
+    def _statement(self, op, ns, columns=None):
+        """Statement préparé de l'opération, mis en cache par (op, ns, colonnes)"""
+        key = (op, ns, columns)
+        statement = self._statements.get(key)
+        if statement is None:
+            table = self.table(ns)
+            if op == "insert":
+                query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+            elif op == "get":
+                query = f"SELECT * FROM {table} WHERE {self._key_clause(ns)} LIMIT 1"
+            elif op == "update":
+                query = f"UPDATE {table} SET {', '.join(f'{f} = ?' for f in columns)} WHERE {self._key_clause(ns)}"
+            else:
+                query = f"DELETE FROM {table} WHERE {self._key_clause(ns)}"
+            statement = self._statements[key] = self.prepare(query)
+        return statement
+
+    def _key_clause(self, ns):
+        return " AND ".join(f"{f} = ?" for f in self.key_fields(ns))
+
+    def _key_values(self, ns, key):
+        return list(key) if isinstance(key, tuple) else [key]
+
+    def put(self, ns, key, doc):
+        self._session.execute(self._statement("insert", ns, tuple(doc)), list(doc.values()))
+
+    def put_async(self, ns, key, doc):
+        """Comme put(), retourne un ResponseFuture"""
+        return self._session.execute_async(self._statement("insert", ns, tuple(doc)), list(doc.values()))
+
+    def get(self, ns, key):
+        return self._session.execute(self._statement("get", ns), self._key_values(ns, key)).one()
+
+    def get_async(self, ns, key):
+        """Comme get(), retourne un ResponseFuture"""
+        return self._session.execute_async(self._statement("get", ns), self._key_values(ns, key))
+
+    def update(self, ns, key, fields):
+        statement = self._statement("update", ns, tuple(fields))
+        self._session.execute(statement, list(fields.values()) + self._key_values(ns, key))
+
+    def delete(self, ns, key):
+        self._session.execute(self._statement("delete", ns), self._key_values(ns, key))
+
+    def bulk(self, ns, docs, concurrency=CASSANDRA_CONCURRENCY):
+        from cassandra.concurrent import execute_concurrent_with_args
+
+        docs = list(docs)
+        if not docs:
+            return 0
+        columns = tuple(docs[0])
+        statement = self._statement("insert", ns, columns)
+        params = [[doc[c] for c in columns] for doc in docs]
+        execute_concurrent_with_args(
+            self._session, statement, params,
+            concurrency=concurrency, raise_on_first_error=True
+        )
+        return len(docs)
+
+    def scan(self, ns, prefix=None):
+        fields = self.key_fields(ns)
+        for row in self._session.execute(f"SELECT {', '.join(fields)} FROM {self.table(ns)}"):
+            key = row[fields[0]] if len(fields) == 1 else tuple(row[f] for f in fields)
+            if prefix is None or key_str(key).startswith(prefix):
+                yield key
+
+    def query(self, ns, where=None, limit=None):
+        clauses, params = [], []
+        for field, cond in (where or {}).items():
+            if isinstance(cond, tuple):
+                clauses.append(f"{field} >= ? AND {field} <= ?")
+                params.extend(cond)
+            else:
+                clauses.append(f"{field} = ?")
+                params.append(cond)
+        query = f"SELECT * FROM {self.table(ns)}"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        if clauses:
+            query += " ALLOW FILTERING"
+        # Pagination automatique du driver (fetch_size)
+        return iter(self._session.execute(self.prepare(query), params))
+
+    def execute(self, query, params=None):
+        """Requête CQL (préparée si des paramètres sont fournis), retourne la liste des lignes"""
+        if params is not None:
+            return list(self._session.execute(self.prepare(query), params))
+        return list(self._session.execute(query))
+
+    def execute_async(self, query, params=None):
+        statement = self.prepare(query) if params is not None else query
+        return self._session.execute_async(statement, params)
+
+    @staticmethod
+    def wrap_future(response_future):
+        """ResponseFuture du driver -> future asyncio (première page de lignes)"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve(setter, value):
+            if not future.done():
+                setter(value)
+
+        response_future.add_callbacks(
+            lambda rows: loop.call_soon_threadsafe(resolve, future.set_result, rows),
+            lambda exc: loop.call_soon_threadsafe(resolve, future.set_exception, exc)
+        )
+        return future
+
+    async def aput(self, ns, key, doc):
+        await self.wrap_future(self.put_async(ns, key, doc))
+
+    async def aget(self, ns, key):
+        rows = await self.wrap_future(self.get_async(ns, key))
+        return rows[0] if rows else None
+
+
+# ============================================
+# NEO4J
+# ============================================
+@register_backend("Neo4j")
+class Neo4jBackend(Backend):
+    def connect(self):
+        from neo4j import GraphDatabase
+        self._driver = GraphDatabase.driver(
+            NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD),
+            max_connection_pool_size=POOL_SIZE
+        )
+        self._local = threading.local()
+        self._sessions = []
+
+    def close(self):
+        for session in self._sessions:
+            session.close()
+        self._driver.close()
+
+    def ping(self):
+        self._driver.verify_connectivity()
+        return True
+
+    @property
+    def client(self):
+        return self._driver
+
+    def session(self):
+        """Session longue durée propre au thread courant (les sessions ne sont pas thread-safe)"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._driver.session()
+            self._local.session = session
+            self._sessions.append(session)
+        return session
+
+    @staticmethod
+    def label(ns):
+        return f"`{ns}`"
+
+    def _match(self, ns, key):
+        conditions = self.key_filter(ns, key)
+        props = ", ".join(f"{f}: $k_{f}" for f in conditions)
+        params = {f"k_{f}": v for f, v in conditions.items()}
+        return f"MATCH (n:{self.label(ns)} {{{props}}})", params
+
+    def drop(self, ns):
+        self.session().run(f"MATCH (n:{self.label(ns)}) DETACH DELETE n").consume()
+
+    def put(self, ns, key, doc):
+        self.session().run(f"CREATE (n:{self.label(ns)}) SET n = $props", props=doc).consume()
+
+    def get(self, ns, key):
+        match, params = self._match(ns, key)
+        record = self.session().run(f"{match} RETURN n LIMIT 1", **params).single()
+        return dict(record["n"]) if record else None
+
+    def update(self, ns, key, fields):
+        match, params = self._match(ns, key)
+        self.session().run(f"{match} SET n += $fields", fields=fields, **params).consume()
+
+    def delete(self, ns, key):
+        match, params = self._match(ns, key)
+        self.session().run(f"{match} DETACH DELETE n", **params).consume()
+
+    def bulk(self, ns, docs):
+        docs = list(docs)
+        for i in range(0, len(docs), BULK_CHUNK):
+            self.session().run(
+                f"UNWIND $rows AS row CREATE (n:{self.label(ns)}) SET n = row",
+                rows=docs[i:i + BULK_CHUNK]
+            ).consume()
+        return len(docs)
+
+    def scan(self, ns, prefix=None):
+        fields = self.key_fields(ns)
+        returns = ", ".join(f"n.{f} AS {f}" for f in fields)
+        for record in self.session().run(f"MATCH (n:{self.label(ns)}) RETURN {returns}"):
+            key = record[fields[0]] if len(fields) == 1 else tuple(record[f] for f in fields)
+            if prefix is None or key_str(key).startswith(prefix):
+                yield key
+
+    def _query(self, ns, where=None, limit=None):
+        clauses, params = [], {}
+        for i, (field, cond) in enumerate((where or {}).items()):
+            if isinstance(cond, tuple):
+                clauses.append(f"n.{field} >= $lo{i} AND n.{field} <= $hi{i}")
+                params[f"lo{i}"], params[f"hi{i}"] = cond
+            else:
+                clauses.append(f"n.{field} = $eq{i}")
+                params[f"eq{i}"] = cond
+        query = f"MATCH (n:{self.label(ns)})"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " RETURN n"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return query, params
+
+    def query(self, ns, where=None, limit=None):
+        query, params = self._query(ns, where, limit)
+        return (dict(record["n"]) for record in self.session().run(query, **params))
+
+    def create_index(self, ns, name, fields, kind="index", ttl=None):
+        props = ", ".join(f"n.{f}" for f in fields)
+        target = f"(n:{self.label(ns)})"
+        if kind == "unique":
+            props = f"({props})" if len(fields) > 1 else props
+            query = f"CREATE CONSTRAINT {name} IF NOT EXISTS FOR {target} REQUIRE {props} IS UNIQUE"
+        elif kind == "text":
+            query = f"CREATE FULLTEXT INDEX {name} IF NOT EXISTS FOR {target} ON EACH [{props}]"
+        elif kind == "index":
+            query = f"CREATE INDEX {name} IF NOT EXISTS FOR {target} ON ({props})"
+        else:
+            raise NotSupportedError(f"Neo4j: pas d'index {kind}")
+        self.execute(query)
+        # Index peuplé en arrière-plan: attendu pour que la durée couvre la construction
+        self.execute("CALL db.awaitIndexes()")
+        return True
+
+    def drop_index(self, ns, name):
+        self.execute(f"DROP CONSTRAINT {name} IF EXISTS")
+        self.execute(f"DROP INDEX {name} IF EXISTS")
+
+    def explain(self, ns, where):
+        query, params = self._query(ns, where)
+        plan = self.session().run(f"EXPLAIN {query}", **params).consume().plan
+        # Opérateurs de la feuille à la racine (premier enfant)
+        operators = []
+        while plan:
+            operators.append(plan["operatorType"].split("@")[0])
+            plan = (plan.get("children") or [None])[0]
+        return " > ".join(reversed(operators)), any("Index" in op for op in operators)
+
+    def execute(self, query, **params):
+        """Requête Cypher, retourne la liste des enregistrements (dicts)"""
+        return self.session().run(query, **params).data()
+
+    async def aopen(self, pool_size=ASYNC_POOL_SIZE):
+        from neo4j import AsyncGraphDatabase
+        self._adriver = AsyncGraphDatabase.driver(
+            NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD),
+            max_connection_pool_size=pool_size
+        )
+
+    async def aclose(self):
+        await self._adriver.close()
+
+    async def aput(self, ns, key, doc):
+        # Une session par requête (légère: emprunte une connexion au pool)
+        async with self._adriver.session() as session:
+            result = await session.run(f"CREATE (n:{self.label(ns)}) SET n = $props", props=doc)
+            await result.consume()
+
+    async def aget(self, ns, key):
+        match, params = self._match(ns, key)
+        async with self._adriver.session() as session:
+            result = await session.run(f"{match} RETURN n LIMIT 1", **params)
+            record = await result.single()
+        return dict(record["n"]) if record else None
+
+
+# ============================================
+# STAND-IN EN MEMOIRE
+# ============================================
+class MemoryBackend(Backend):
+    """
+    Remplaçant en mémoire d'une base, pour exécuter la suite sans conteneurs.
+    Supporte l'interface uniforme; les requêtes natives lèvent NotSupportedError.
+    """
+    stand_in = True
+
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self._data = {}
+        self._data_lock = threading.Lock()
+
+    def _ns(self, ns):
+        return self._data.setdefault(ns, {})
+
+    def drop(self, ns):
+        with self._data_lock:
+            self._data.pop(ns, None)
+
+    def put(self, ns, key, doc):
+        with self._data_lock:
+            self._ns(ns)[key] = dict(doc)
+
+    def get(self, ns, key):
+        doc = self._data.get(ns, {}).get(key)
+        return dict(doc) if doc is not None else None
+
+    def update(self, ns, key, fields):
+        with self._data_lock:
+            doc = self._ns(ns).get(key)
+            if doc is not None:
+                doc.update(fields)
+
+    def delete(self, ns, key):
+        with self._data_lock:
+            self._ns(ns).pop(key, None)
+
+    def bulk(self, ns, docs):
+        with self._data_lock:
+            store = self._ns(ns)
+            count = 0
+            for doc in docs:
+                store[self.key_of(ns, doc)] = dict(doc)
+                count += 1
+        return count
+
+    def scan(self, ns, prefix=None):
+        for key in list(self._data.get(ns, {})):
+            if prefix is None or key_str(key).startswith(prefix):
+                yield key
+
+    def query(self, ns, where=None, limit=None):
+        found = 0
+        for doc in list(self._data.get(ns, {}).values()):
+            if _matches(doc, where):
+                yield dict(doc)
+                found += 1
+                if limit and found >= limit:
+                    return
+
+    async def aput(self, ns, key, doc):
+        # Pas d'E/S: appel direct, sans thread
+        self.put(ns, key, doc)
+
+    async def aget(self, ns, key):
+        return self.get(ns, key)
@@ -0,0 +1,318 @@
+"""
+Chargement initial: driver vs outil d'import natif de chaque base.
+
+Le jeu IoT du scénario 2 (relevés de capteurs) est chargé deux fois dans une
+base vide:
+  1. par le driver (pipeline d'ingestion, ingest.py) -> driver_load_*
+  2. par l'outil officiel, à partir d'un export dans le format natif:
+
+    MongoDB     mongoimport (JSON lignes), mongorestore (BSON)
+    Redis       redis-cli --pipe (protocole RESP, HSET comme RedisBackend)
+    Cassandra   COPY FROM de cqlsh (CSV)
+    Neo4j       neo4j-admin database import full (CSV typé), dans un conteneur
+                jetable de la même image (l'import exige une base arrêtée)
+
+L'export (hors chrono) et la copie dans le conteneur (docker cp) sont mesurés
+à part; seul l'appel de l'outil est chronométré. Champs {outil}_load_s,
+{outil}_records_per_s, {outil}_speedup (= driver / outil), {outil}_export_s,
+{outil}_file_mb, {outil}_records_loaded. Sans docker ou avec les stand-ins,
+seul le chargement par le driver est mesuré.
+
+Usage:
+    python run/run_all_benchmarks.py -s 2 --bulk-load
+    python scenarios/bulkload.py
+"""
+import csv
+import io
+import json
+import os
+import re
+import subprocess
+import time
+
+from influxdb_client import Point
+
+import metrics
+from backends import get_backend, MONGO_DB, RedisBackend
+from containers import SERVICES, compose_containers, container_id
+from datasets import DATASETS_DIR, declare
+from harness import Phase, skip_native, run_tests
+from ingest import ingest
+from scenario2_iot_logs import BATCH_SIZE, NUM_RECORDS, SENSOR_FIELDS, SENSOR_KEY, sensor_columns
+
+# ---------------- CONFIGURATION ----------------
+BULK_LOAD_RECORDS = int(os.getenv("BENCH_BULK_LOAD_RECORDS", str(NUM_RECORDS)))
+BULK_LOAD_WORKERS = int(os.getenv("BENCH_BULK_LOAD_WORKERS", "4"))  # Parallélisme des outils natifs
+NEO4J_IMAGE = os.getenv("NEO4J_IMAGE", "neo4j:5")  # Image du conteneur d'import jetable
+EXPORT_DIR = os.path.join(DATASETS_DIR, "export")
+EXPORT_CHUNK = 10000  # Lignes lues par lot pendant l'export
+TOOL_TIMEOUT = 3600
+
+NS = "bulk_sensors"
+COLUMNS = list(SENSOR_FIELDS)
+NEO4J_TYPES = {int: "int", float: "float", str: "string"}
+
+SENSORS = declare("iot_sensors", sensor_columns, BULK_LOAD_RECORDS)
+
+# ============================================
+# EXPORTS (formats natifs)
+# ============================================
+def export(name, write):
+    """Écrit EXPORT_DIR/name avec write(f, rows) lot par lot: (chemin, secondes, MB)"""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, name)
+    start = time.perf_counter()
+    with open(path, "wb") as f:
+        for rows in SENSORS.chunks(EXPORT_CHUNK, BULK_LOAD_RECORDS):
+            write(f, rows)
+    return path, time.perf_counter() - start, os.path.getsize(path) / (1024 * 1024)
+
+def write_jsonl(f, rows):
+    f.write("".join(json.dumps(row) + "\n" for row in rows).encode())
+
+def write_bson(f, rows):
+    import bson
+    f.write(b"".join(bson.encode(row) for row in rows))
+
+def resp_command(*args):
+    """Commande encodée en protocole RESP (tableau de bulk strings)"""
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+def write_resp(f, rows):
+    # Même clé et même encodage que RedisBackend.bulk: HSET ns:sensor_id:timestamp champ valeur...
+    for row in rows:
+        key = f"{NS}:{row['sensor_id']}:{row['timestamp']}"
+        fields = [item for pair in RedisBackend._encode(row).items() for item in pair]
+        f.write(resp_command("HSET", key, *fields))
+
+def csv_writer(header):
+    """write(f, rows) CSV dans l'ordre COLUMNS; `header` écrit au premier lot"""
+    pending = [header]
+
+    def write(f, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if pending:
+            writer.writerow(pending.pop())
+        writer.writerows([row[c] for c in COLUMNS] for row in rows)
+        f.write(buffer.getvalue().encode())
+    return write
+
+# ============================================
+# OUTILS NATIFS (docker)
+# ============================================
+def container_of(db_name):
+    """Nom du conteneur de la base s'il tourne, sinon None"""
+    service = SERVICES[db_name]
+    name = compose_containers().get(service, service)
+    return name if container_id(name) else None
+
+def docker(*args, timeout=TOOL_TIMEOUT):
+    result = subprocess.run(["docker", *args], capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        raise RuntimeError(f"docker {args[0]} a échoué: {(result.stderr or result.stdout).strip()[-500:]}")
+    return result.stdout + result.stderr
+
+def native_load(results, tool, exported, run, loaded=None):
+    """
+    Chronomètre run(chemin) (appel de l'outil), après copie de l'export
+    dans le conteneur si besoin. loaded(sortie) -> lignes chargées.
+    """
+    path, export_s, file_mb = exported
+    print(f"  📦 {tool}: {BULK_LOAD_RECORDS} records ({file_mb:.1f} MB, export {export_s:.2f}s)...")
+    start = time.perf_counter()
+    output = run(path)
+    elapsed = time.perf_counter() - start
+    count = loaded(output) if loaded else BULK_LOAD_RECORDS
+    results[f'{tool}_load_s'] = elapsed
+    results[f'{tool}_records_per_s'] = BULK_LOAD_RECORDS / elapsed if elapsed > 0 else 0.0
+    results[f'{tool}_export_s'] = export_s
+    results[f'{tool}_file_mb'] = file_mb
+    results[f'{tool}_records_loaded'] = float(count)
+    if results.get('driver_load_time'):
+        results[f'{tool}_speedup'] = results['driver_load_time'] / elapsed if elapsed > 0 else 0.0
+    print(f"     ✅ {elapsed:.2f}s ({results[f'{tool}_records_per_s']:.0f} records/s, "
+          f"x{results.get(f'{tool}_speedup', 0):.1f} vs driver, {count} chargés)")
+
+def in_container(container, path):
+    """Copie l'export dans /tmp du conteneur (hors chrono), retourne le chemin distant"""
+    remote = f"/tmp/{os.path.basename(path)}"
+    docker("cp", path, f"{container}:{remote}")
+    return remote
+
+def parse_count(pattern, output):
+    match = re.search(pattern, output)
+    return int(match.group(1)) if match else -1
+
+def driver_load(backend, results):
+    """Chargement de référence: pipeline d'ingestion (backend.bulk en parallèle)"""
+    backend.reset(NS, key=SENSOR_KEY, fields=SENSOR_FIELDS)
+    SENSORS.open()
+    print(f"  📝 DRIVER LOAD {BULK_LOAD_RECORDS} records...")
+    with Phase(results, 'driver_load', BULK_LOAD_RECORDS) as phase:
+        stats = ingest(backend, NS, SENSORS, BULK_LOAD_RECORDS, phase, batch_size=BATCH_SIZE, prefix='driver_load')
+    results.update(stats)
+
+def native_container(backend, db_name):
+    """Conteneur où lancer l'outil natif, ou None (message) si indisponible"""
+    if skip_native(backend, "outils d'import natifs"):
+        return None
+    container = container_of(db_name)
+    if container is None:
+        print(f"  ℹ️  Outils d'import natifs ignorés: conteneur {SERVICES[db_name]} introuvable (docker)")
+    return container
+
+# ============================================
+# MONGODB
+# ============================================
+def test_mongodb_bulkload():
+    print("\n🔵 Testing MongoDB bulk load...")
+    backend = get_backend("MongoDB")
+    results = {}
+    driver_load(backend, results)
+
+    container = native_container(backend, "MongoDB")
+    if container:
+        collection = backend.collection(NS)
+        for tool, exported, extra in (
+            ("mongoimport", export("sensors.jsonl", write_jsonl),
+             ["--type", "json", "--numInsertionWorkers", str(BULK_LOAD_WORKERS), "--file"]),
+            ("mongorestore", export("sensors.bson", write_bson),
+             ["--numInsertionWorkersPerCollection", str(BULK_LOAD_WORKERS)]),
+        ):
+            backend.reset(NS, key=SENSOR_KEY, fields=SENSOR_FIELDS)
+            remote = in_container(container, exported[0])
+            native_load(results, tool, exported,
+                        lambda path: docker("exec", container, tool, "--db", MONGO_DB, "--collection", NS,
+                                            "--quiet", *extra, remote),
+                        lambda output: collection.count_documents({}))
+
+    backend.drop(NS)
+    return results
+
+# ============================================
+# REDIS
+# ============================================
+def test_redis_bulkload():
+    print("\n🔴 Testing Redis bulk load...")
+    backend = get_backend("Redis")
+    results = {}
+    driver_load(backend, results)
+
+    container = native_container(backend, "Redis")
+    if container:
+        backend.reset(NS, key=SENSOR_KEY, fields=SENSOR_FIELDS)
+        exported = export("sensors.resp", write_resp)
+        remote = in_container(container, exported[0])
+        native_load(results, "redis_pipe", exported,
+                    lambda path: docker("exec", container, "sh", "-c", f"redis-cli --pipe < {remote}"),
+                    lambda output: parse_count(r"replies:\s*(\d+)", output))
+
+    backend.drop(NS)
+    return results
+
+# ============================================
+# CASSANDRA
+# ============================================
+def test_cassandra_bulkload():
+    print("\n🟣 Testing Cassandra bulk load...")
+    backend = get_backend("Cassandra")
+    results = {}
+    driver_load(backend, results)
+
+    container = native_container(backend, "Cassandra")
+    if container:
+        backend.reset(NS, key=SENSOR_KEY, fields=SENSOR_FIELDS)
+        exported = export("sensors.csv", csv_writer(COLUMNS))
+        remote = in_container(container, exported[0])
+        copy = (f"COPY {backend.table(NS)} ({', '.join(COLUMNS)}) FROM '{remote}' "
+                f"WITH HEADER = TRUE AND NUMPROCESSES = {BULK_LOAD_WORKERS}")
+        native_load(results, "cql_copy", exported,
+                    lambda path: docker("exec", container, "cqlsh", "-e", copy),
+                    lambda output: parse_count(r"(\d+) rows imported", output))
+
+    backend.drop(NS)
+    return results
+
+# ============================================
+# NEO4J
+# ============================================
+def import_duration(output):
+    """'IMPORT DONE in 1m 2s 345ms' -> secondes (-1 si absent)"""
+    match = re.search(r"IMPORT DONE in ([^.]+)\.", output)
+    if not match:
+        return -1.0
+    units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(float(value) * units[unit] for value, unit in re.findall(r"(\d+)(ms|h|m|s)\b", match.group(1)))
+
+def test_neo4j_bulkload():
+    print("\n🟢 Testing Neo4j bulk load...")
+    backend = get_backend("Neo4j")
+    results = {}
+    driver_load(backend, results)
+
+    # L'import hors ligne écrit une base neuve: conteneur jetable, même image, export monté en lecture
+    if native_container(backend, "Neo4j"):
+        header = [f"{c}:{NEO4J_TYPES[SENSOR_FIELDS[c]]}" for c in COLUMNS]
+        exported = export("sensors_neo4j.csv", csv_writer(header))
+        command = ["run", "--rm", "-v", f"{EXPORT_DIR}:/import:ro", NEO4J_IMAGE,
+                   "neo4j-admin", "database", "import", "full", "--overwrite-destination",
+                   f"--nodes=Sensor=/import/{os.path.basename(exported[0])}", "neo4j"]
+
+        def loaded(output):
+            # Durée annoncée par l'outil, sans le démarrage du conteneur
+            results['neo4j_admin_import_tool_s'] = import_duration(output)
+            return parse_count(r"Imported:\s*(\d+) nodes", output)
+
+        native_load(results, "neo4j_admin_import", exported, lambda path: docker(*command), loaded)
+
+    backend.drop(NS)
+    return results
+
+# ============================================
+# ENVOI DES RESULTATS
+# ============================================
+def send_results_to_influx(db_name, results, scenario="bulk_load"):
+    """Envoie les résultats vers InfluxDB"""
+    point = Point(scenario).tag("database", db_name)
+
+    for key, value in results.items():
+        if isinstance(value, (int, float)):
+            point.field(key, float(value))
+
+    metrics.write(point)
+    print(f"  📊 Résultats envoyés vers InfluxDB pour {db_name}")
+
+# ============================================
+# MAIN
+# ============================================
+DB_TESTS = [
+    ("MongoDB", test_mongodb_bulkload),
+    ("Redis", test_redis_bulkload),
+    ("Cassandra", test_cassandra_bulkload),
+    ("Neo4j", test_neo4j_bulkload),
+]
+
+def run(databases=None):
+    """Exécute la comparaison sur les bases sélectionnées (toutes par défaut)"""
+    print("="*60)
+    print("🔥 CHARGEMENT INITIAL - DRIVER vs OUTILS NATIFS")
+    print(f"📊 Nombre d'enregistrements: {BULK_LOAD_RECORDS}")
+    print("="*60)
+
+    run_tests(DB_TESTS, send_results_to_influx, databases, scenario="bulk_load")
+
+    print("\n" + "="*60)
+    print("✅ CHARGEMENT INITIAL TERMINÉ !")
+    print("="*60)
+
+if __name__ == "__main__":
+    try:
+        run()
+    finally:
+        metrics.close()
+        print("🔒 Connexion InfluxDB fermée proprement")
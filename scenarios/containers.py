@@ -0,0 +1,188 @@
+"""
+Ressources consommées côté serveur, lues dans les cgroups des conteneurs.
+
+Les services de docker/docker-compose.yml (mongo, redis, cassandra, neo4j)
+sont associés à leur conteneur (`docker inspect`), puis à leur cgroup sous
+/sys/fs/cgroup (v2, ou v1 cpuacct/memory/blkio). Chaque relevé donne le temps
+CPU cumulé, la mémoire de travail (usage - cache inactif), les octets lus /
+écrits sur disque et les octets réseau de l'espace de noms du conteneur.
+
+Sans docker, sans cgroup lisible, ou avec les stand-ins, container_for()
+retourne None et les phases n'ont que les mesures côté client.
+
+Usage:
+    cgroup = container_for("MongoDB")
+    before = cgroup.read()   # {"cpu_ns", "mem", "blk_read", "blk_write", "net_recv", "net_sent"}
+"""
+import os
+import re
+import subprocess
+
+import backends
+
+CGROUP_ROOT = os.getenv("BENCH_CGROUP_ROOT", "/sys/fs/cgroup")
+CONTAINER_STATS = os.getenv("BENCH_CONTAINER_STATS", "1") == "1"
+COMPOSE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "docker", "docker-compose.yml")
+
+# Base -> service docker-compose
+SERVICES = {
+    "MongoDB": "mongo",
+    "Redis": "redis",
+    "Cassandra": "cassandra",
+    "Neo4j": "neo4j",
+}
+
+
+def compose_containers(path=COMPOSE_FILE):
+    """{service: container_name} lu dans docker-compose.yml (sans dépendance YAML)"""
+    containers = {}
+    service = None
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                match = re.match(r"^  (\w[\w.-]*):\s*$", line)
+                if match:
+                    service = match.group(1)
+                    containers[service] = service  # Nom par défaut si pas de container_name
+                    continue
+                match = re.match(r"^\s+container_name:\s*[\"']?([\w.-]+)", line)
+                if match and service:
+                    containers[service] = match.group(1)
+    except OSError:
+        pass
+    return containers
+
+
+def container_id(name):
+    """Identifiant complet du conteneur (None si docker absent ou conteneur arrêté)"""
+    try:
+        result = subprocess.run(["docker", "inspect", "--format", "{{.Id}}", name],
+                                capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    cid = result.stdout.strip()
+    return cid if result.returncode == 0 and cid else None
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _read_int(path):
+    text = _read(path)
+    return int(text.strip()) if text and text.strip().isdigit() else 0
+
+
+def _stat(path):
+    """Fichier "clé valeur" (cpu.stat, memory.stat) -> dict"""
+    stats = {}
+    for line in (_read(path) or "").splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[1].isdigit():
+            stats[parts[0]] = int(parts[1])
+    return stats
+
+
+def _net_bytes(pid):
+    """(reçus, envoyés) de l'espace de noms réseau du processus, hors loopback"""
+    text = _read(f"/proc/{pid}/net/dev")
+    if text is None:
+        return None
+    recv = sent = 0
+    for line in text.splitlines()[2:]:
+        iface, _, data = line.partition(":")
+        if iface.strip() == "lo":
+            continue
+        values = data.split()
+        recv += int(values[0])
+        sent += int(values[8])
+    return recv, sent
+
+
+class ContainerCgroup:
+    """Lecture des compteurs cgroup d'un conteneur (v2: un dossier, v1: un dossier par contrôleur)"""
+
+    def __init__(self, name, paths, version):
+        self.name = name
+        self.paths = paths
+        self.version = version
+
+    def _pid(self):
+        procs = _read(os.path.join(self.paths["cpu"], "cgroup.procs")) or ""
+        return procs.split()[0] if procs.split() else None
+
+    def read(self):
+        if self.version == 2:
+            path = self.paths["cpu"]
+            cpu_ns = _stat(os.path.join(path, "cpu.stat")).get("usage_usec", 0) * 1000
+            usage = _read_int(os.path.join(path, "memory.current"))
+            inactive = _stat(os.path.join(path, "memory.stat")).get("inactive_file", 0)
+            blk_read = blk_write = 0
+            for line in (_read(os.path.join(path, "io.stat")) or "").splitlines():
+                fields = dict(kv.split("=") for kv in line.split()[1:] if "=" in kv)
+                blk_read += int(fields.get("rbytes", 0))
+                blk_write += int(fields.get("wbytes", 0))
+        else:
+            cpu_ns = _read_int(os.path.join(self.paths["cpu"], "cpuacct.usage"))
+            usage = _read_int(os.path.join(self.paths["memory"], "memory.usage_in_bytes"))
+            inactive = _stat(os.path.join(self.paths["memory"], "memory.stat")).get("total_inactive_file", 0)
+            blk_read = blk_write = 0
+            for line in (_read(os.path.join(self.paths["blkio"], "blkio.throttle.io_service_bytes")) or "").splitlines():
+                parts = line.split()
+                if len(parts) == 3 and parts[1] == "Read":
+                    blk_read += int(parts[2])
+                elif len(parts) == 3 and parts[1] == "Write":
+                    blk_write += int(parts[2])
+
+        pid = self._pid()
+        net = _net_bytes(pid) if pid else None
+        return {
+            "cpu_ns": cpu_ns,
+            "mem": max(usage - inactive, 0),  # Working set (comme docker stats / kubelet)
+            "blk_read": blk_read,
+            "blk_write": blk_write,
+            "net_recv": net[0] if net else 0,
+            "net_sent": net[1] if net else 0,
+        }
+
+
+def find_cgroup(name, cid, root=CGROUP_ROOT):
+    """Cgroup du conteneur: pilotes systemd et cgroupfs, v2 puis v1"""
+    for relative in (f"system.slice/docker-{cid}.scope", f"docker/{cid}"):
+        path = os.path.join(root, relative)
+        if os.path.exists(os.path.join(path, "cpu.stat")):
+            return ContainerCgroup(name, {"cpu": path}, version=2)
+
+    for relative in (f"docker/{cid}", f"system.slice/docker-{cid}.scope"):
+        paths = {
+            "cpu": os.path.join(root, "cpuacct", relative),
+            "memory": os.path.join(root, "memory", relative),
+            "blkio": os.path.join(root, "blkio", relative),
+        }
+        if os.path.exists(os.path.join(paths["cpu"], "cpuacct.usage")):
+            return ContainerCgroup(name, paths, version=1)
+    return None
+
+
+_cache = {}
+
+
+def container_for(db_name):
+    """Cgroup du conteneur de la base (mémorisé), None si indisponible"""
+    if not CONTAINER_STATS or not db_name or backends.stand_ins_enabled():
+        return None
+    if db_name not in _cache:
+        _cache[db_name] = None
+        service = SERVICES.get(db_name)
+        name = compose_containers().get(service, service) if service else None
+        cid = container_id(name) if name else None
+        if cid:
+            _cache[db_name] = find_cgroup(name, cid)
+        if _cache[db_name] is None:
+            print(f"  ℹ️  Ressources serveur indisponibles pour {db_name} (conteneur ou cgroup introuvable)")
+    return _cache[db_name]
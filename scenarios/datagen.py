@@ -0,0 +1,275 @@
+"""
+Génération de données vectorisée (NumPy), en colonnes et reproductible.
+
+Chaque valeur est dérivée d'un hachage (SplitMix64) de (graine, identifiant,
+colonne): une ligne ne dépend que de son identifiant, quel que soit l'ordre,
+la taille des lots ou la base qui la reçoit. Toutes les bases reçoivent donc
+exactement les mêmes données, et un lot de 1M lignes se génère en quelques
+opérations sur des tableaux au lieu d'un million d'appels à random.*.
+
+Un générateur de jeu de données est une fonction make(ids, seed) -> ColumnBatch.
+La conversion en dicts (lignes des backends) est paresseuse:
+
+    batch = sensor_columns(np.arange(1_000_000), SEED)   # colonnes NumPy
+    for rows in batch.chunks(BATCH_SIZE):                 # dicts créés lot par lot
+        backend.bulk("iot_sensors", rows)
+
+    docs = RowSource(user_columns)   # accès par identifiant, blocs générés à la demande
+    backend.put(NS, -1, docs[-1])
+
+Les graphes (scenario3) sont des tableaux d'arêtes (source, cible) en int32,
+dédupliqués, à distribution de degrés en loi de puissance:
+
+    src, dst = barabasi_albert(1_000_000, 5)      # attachement préférentiel
+    src, dst = chung_lu(1_000_000, 3_000_000, 2.5, directed=True)
+"""
+import functools
+import os
+
+import numpy as np
+
+SEED = int(os.getenv("BENCH_SEED", "42"))
+DATAGEN_VERSION = 1  # À incrémenter si ColumnBatch / generate changent les valeurs produites (datasets.py)
+BLOCK_ROWS = 4096  # Lignes générées d'un coup par RowSource
+CACHE_BLOCKS = 64  # Blocs convertis gardés en mémoire par RowSource
+GRAPH_GROWTH = float(os.getenv("BENCH_GRAPH_GROWTH", "0.05"))  # Nœuds ajoutés par itération (fraction du graphe)
+
+ALPHANUMERIC = np.frombuffer(b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789", dtype=np.uint8)
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+# ============================================
+# PRIMITIVES ALEATOIRES (fonction pure de graine, id, colonne)
+# ============================================
+def _mix(x):
+    """Finaliseur SplitMix64 (uint64, débordements voulus)"""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def hash64(ids, seed, stream):
+    """Entiers 64 bits pseudo-aléatoires, un par id, pour une colonne `stream` donnée"""
+    ids = np.asarray(ids, dtype=np.int64).view(np.uint64)
+    with np.errstate(over="ignore"):
+        key = _mix(np.uint64(seed) * _GOLDEN + np.uint64(stream))
+        return _mix(ids * _GOLDEN + key)
+
+
+def uniform(ids, seed, stream, low=0.0, high=1.0):
+    """Flottants uniformes dans [low, high)"""
+    unit = (hash64(ids, seed, stream) >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+    return low + unit * (high - low)
+
+
+def integers(ids, seed, stream, low, high):
+    """Entiers uniformes dans [low, high)"""
+    return low + (hash64(ids, seed, stream) % np.uint64(high - low)).astype(np.int64)
+
+
+def choice(ids, seed, stream, values):
+    """Un élément de `values` (tableau NumPy) par id"""
+    return values[integers(ids, seed, stream, 0, len(values))]
+
+
+def random_strings(ids, seed, stream, length, alphabet=ALPHANUMERIC):
+    """Chaînes de `length` caractères tirés dans `alphabet` (octets ASCII)"""
+    ids = np.asarray(ids, dtype=np.int64)
+    # Une colonne de hachage par position de caractère
+    positions = np.arange(length, dtype=np.int64)
+    codes = hash64(ids[:, None] * length + positions, seed, stream) % np.uint64(len(alphabet))
+    chars = np.ascontiguousarray(alphabet[codes], dtype=np.uint8)
+    return chars.view(f"S{length}").ravel().astype(f"U{length}")
+
+
+def sample_lists(ids, seed, stream, values, min_size, max_size):
+    """
+    Sous-listes sans répétition de `values` (comme random.sample), de taille
+    min_size..max_size: (matrice des éléments, tailles)
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    positions = np.arange(len(values), dtype=np.int64)
+    order = np.argsort(hash64(ids[:, None] * len(values) + positions, seed, stream), axis=1)
+    sizes = integers(ids, seed, stream + 1, min_size, max_size + 1)
+    return values[order[:, :max_size]], sizes
+
+
+def with_ids(prefix, ids, suffix=""):
+    """Chaînes prefix{id}suffix"""
+    strings = np.char.add(prefix, np.asarray(ids).astype(str))
+    return np.char.add(strings, suffix) if suffix else strings
+
+
+def timestamps(ids, base, step_seconds=1):
+    """Horodatages base + id * step, formatés "YYYY-MM-DD HH:MM:SS" (sans strftime par ligne)"""
+    times = np.datetime64(base, "s") + np.asarray(ids, dtype=np.int64) * np.timedelta64(step_seconds, "s")
+    return np.char.replace(np.datetime_as_string(times, unit="s"), "T", " ")
+
+
+# ============================================
+# LOTS DE COLONNES
+# ============================================
+class ColumnBatch:
+    """
+    Colonnes NumPy de même longueur. `lists`: colonnes de listes de taille
+    variable, stockées en (matrice, tailles). Les dicts ne sont créés qu'à la
+    lecture (rows, chunks), avec des types Python natifs.
+    """
+
+    def __init__(self, columns, lists=None):
+        self.columns = columns
+        self.lists = lists or {}
+
+    def __len__(self):
+        for column in self.columns.values():
+            return len(column)
+        return 0
+
+    def __getitem__(self, index):
+        """Tranche (vue, sans copie)"""
+        if not isinstance(index, slice):
+            raise TypeError("ColumnBatch ne s'indexe que par tranche (utiliser rows())")
+        return ColumnBatch({name: col[index] for name, col in self.columns.items()},
+                           {name: (matrix[index], sizes[index]) for name, (matrix, sizes) in self.lists.items()})
+
+    def to_lists(self):
+        """Colonnes converties en listes Python (une conversion par colonne, pas par valeur)"""
+        converted = {name: col.tolist() for name, col in self.columns.items()}
+        for name, (matrix, sizes) in self.lists.items():
+            converted[name] = [row[:size] for row, size in zip(matrix.tolist(), sizes.tolist())]
+        return converted
+
+    def rows(self):
+        """Liste de dicts {colonne: valeur}"""
+        converted = self.to_lists()
+        names = list(converted)
+        return [dict(zip(names, values)) for values in zip(*converted.values())]
+
+    def tuples(self, names):
+        """Tuples positionnels (requêtes préparées, COPY...)"""
+        converted = self.to_lists()
+        return list(zip(*(converted[name] for name in names)))
+
+    def chunks(self, size):
+        """Lignes par lots de `size`, converties au fur et à mesure"""
+        for start in range(0, len(self), size):
+            yield self[start:start + size].rows()
+
+
+def concat(batches):
+    """Un seul ColumnBatch à partir de plusieurs lots de mêmes colonnes"""
+    batches = list(batches)
+    first = batches[0]
+    return ColumnBatch(
+        {name: np.concatenate([b.columns[name] for b in batches]) for name in first.columns},
+        {name: (np.concatenate([b.lists[name][0] for b in batches]),
+                np.concatenate([b.lists[name][1] for b in batches])) for name in first.lists}
+    )
+
+
+def generate(make, count, start=0, seed=SEED):
+    """Lot des ids start..start+count-1"""
+    return make(np.arange(start, start + count, dtype=np.int64), seed)
+
+
+class RowSource:
+    """
+    Lignes par identifiant (y compris négatif), générées par blocs de
+    BLOCK_ROWS et mises en cache. Chaque accès construit un nouveau dict:
+    un backend qui modifie la ligne n'altère pas celle des suivants.
+    """
+
+    def __init__(self, make, seed=SEED, block_rows=BLOCK_ROWS, cache_blocks=CACHE_BLOCKS):
+        self.make = make
+        self.seed = seed
+        self.block_rows = block_rows
+        self._block = functools.lru_cache(maxsize=cache_blocks)(self._generate_block)
+
+    def _generate_block(self, block):
+        converted = generate(self.make, self.block_rows, block * self.block_rows, self.seed).to_lists()
+        return list(converted), list(zip(*converted.values()))
+
+    def __getitem__(self, row_id):
+        names, rows = self._block(row_id // self.block_rows)
+        values = rows[row_id % self.block_rows]
+        return {name: list(v) if isinstance(v, list) else v for name, v in zip(names, values)}
+
+    def batch(self, start, count):
+        return generate(self.make, count, start, self.seed)
+
+
+# ============================================
+# GRAPHES EN LOI DE PUISSANCE (tableaux d'arêtes)
+# ============================================
+def dedupe_edges(src, dst, directed=False):
+    """
+    Retire boucles et doublons. Non orienté: une arête {a, b} est rangée
+    (min, max). Retourne (src, dst) en int32, triés par source.
+    """
+    src, dst = np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+    if not directed:
+        src, dst = np.minimum(src, dst), np.maximum(src, dst)
+    keep = src != dst
+    src, dst = src[keep], dst[keep]
+    width = int(max(src.max(initial=0), dst.max(initial=0))) + 1
+    pairs = np.unique(src * width + dst)
+    return (pairs // width).astype(np.int32), (pairs % width).astype(np.int32)
+
+
+def barabasi_albert(num_nodes, m, seed=SEED, stream=201):
+    """
+    Graphe de Barabási–Albert non orienté: chaque nouveau nœud se relie à m
+    nœuds existants choisis proportionnellement à leur degré (tirage uniforme
+    dans la liste des extrémités d'arêtes). Les nœuds sont ajoutés par blocs
+    de GRAPH_GROWTH x la taille courante, chaque bloc tirant dans le graphe
+    déjà construit: O(log n) itérations vectorisées. Les plus anciens nœuds
+    (ids bas) deviennent les hubs.
+    """
+    m = max(1, min(m, num_nodes - 1))
+    core = np.arange(m + 1, dtype=np.int64)
+    first, second = np.triu_indices(m + 1, k=1)  # Clique initiale des m + 1 premiers nœuds
+    total = len(first) + (num_nodes - m - 1) * m
+    src = np.empty(total, dtype=np.int64)
+    dst = np.empty(total, dtype=np.int64)
+    endpoints = np.empty(2 * total, dtype=np.int64)
+    count = len(first)
+    src[:count], dst[:count] = core[first], core[second]
+    endpoints[:2 * count] = np.concatenate([src[:count], dst[:count]])
+
+    start = m + 1
+    while start < num_nodes:
+        stop = min(num_nodes, start + max(1, int(start * GRAPH_GROWTH)))
+        nodes = np.repeat(np.arange(start, stop, dtype=np.int64), m)
+        picks = (uniform(nodes * m + np.tile(np.arange(m), stop - start), seed, stream)
+                 * (2 * count)).astype(np.int64)
+        added = len(nodes)
+        src[count:count + added] = nodes
+        dst[count:count + added] = endpoints[picks]
+        endpoints[2 * count:2 * count + added] = nodes
+        endpoints[2 * count + added:2 * (count + added)] = endpoints[picks]
+        count += added
+        start = stop
+    return dedupe_edges(src, dst)
+
+
+def chung_lu(num_nodes, num_edges, exponent=2.5, seed=SEED, stream=211, directed=False):
+    """
+    Degrés attendus en loi de puissance P(k) ~ k^-exponent (modèle de
+    Chung–Lu): chaque extrémité est tirée avec un poids (i + 1)^(-1/(exponent - 1)),
+    par recherche dans la fonction de répartition. `num_edges` tirages,
+    moins les boucles et doublons. Le nœud 0 est le plus gros hub.
+    """
+    weights = np.arange(1, num_nodes + 1, dtype=np.float64) ** (-1.0 / (exponent - 1.0))
+    cdf = np.cumsum(weights)
+    cdf /= cdf[-1]
+    ids = np.arange(num_edges, dtype=np.int64)
+    src = np.minimum(np.searchsorted(cdf, uniform(ids, seed, stream)), num_nodes - 1)
+    dst = np.minimum(np.searchsorted(cdf, uniform(ids, seed, stream + 1)), num_nodes - 1)
+    return dedupe_edges(src, dst, directed)
+
+
+def degrees(src, dst, num_nodes, directed=False):
+    """Degré de chaque nœud (sortant si orienté)"""
+    counts = np.bincount(src, minlength=num_nodes)
+    return counts if directed else counts + np.bincount(dst, minlength=num_nodes)
@@ -0,0 +1,341 @@
+"""
+Jeux de données pré-générés sur disque, lus par mmap.
+
+Chaque jeu déclaré (nom, générateur datagen, nombre de lignes) est écrit une
+fois dans datasets/<nom>/ en colonnes binaires:
+
+    <col>.bin               colonne numérique à largeur fixe (dtype du manifeste)
+    <col>.off + <col>.arena chaînes UTF-8: décalages int64 (n+1) + arène d'octets
+    <col>.loff              listes de chaînes: décalages int64 (n+1) dans <col>.off
+    manifest.json           graine, nombre de lignes, empreinte du générateur et
+                            de ses entrées (globales, helpers datagen, version)
+
+Le manifeste est écrit en dernier: un jeu incomplet ou produit par un autre
+générateur / une autre graine / d'autres entrées (SENSOR_IDS, SAMPLE_TAGS...)
+est reconstruit, sinon il est réutilisé d'une exécution à l'autre. Un jeu plus
+grand de même empreinte est réutilisé: chaque ligne ne dépend que de son id. La lecture (rows, row) ne fait que des tranches des
+fichiers mappés: aucune génération dans les régions chronométrées.
+
+Usage:
+    USERS = declare("users_crud", user_columns, 100000)
+    USERS.rows(0, 1000)     # dicts prêts pour backend.bulk
+    USERS[42]               # une ligne; hors [0, count): générée (même valeur)
+
+    python scenarios/datasets.py --build    # construit tous les jeux déclarés
+"""
+import argparse
+import glob
+import hashlib
+import importlib
+import json
+import mmap
+import os
+import shutil
+import sys
+import threading
+import types
+
+import numpy as np
+
+from datagen import DATAGEN_VERSION, RowSource, SEED, generate
+
+DATASETS_DIR = os.getenv("BENCH_DATASETS_DIR", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "datasets"))
+BUILD_BLOCK = 65536  # Lignes générées puis écrites par itération
+
+FORMAT_VERSION = 1
+
+# Jeux déclarés par les scénarios importés (nom -> Dataset)
+DATASETS = {}
+
+
+def _hash_inputs(code, scope, digest, inputs, seen):
+    """
+    Hache le bytecode puis, récursivement, les globales qu'il lit: constantes
+    de module (tableaux, listes, chaînes) et fonctions appelées (helpers datagen)
+    """
+    digest.update(code.co_code)
+    digest.update(repr([c for c in code.co_consts if not isinstance(c, types.CodeType)]).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _hash_inputs(const, scope, digest, inputs, seen)
+    for name in code.co_names:
+        if name not in scope or id(scope[name]) in seen:
+            continue
+        value = scope[name]
+        seen.add(id(value))
+        digest.update(name.encode())
+        if isinstance(value, types.FunctionType):
+            inputs.append(f"{value.__module__}.{value.__qualname__}")
+            digest.update(repr(value.__defaults__).encode())
+            _hash_inputs(value.__code__, value.__globals__, digest, inputs, seen)
+        elif isinstance(value, (types.ModuleType, type)):
+            continue  # Modules et classes: couverts par DATAGEN_VERSION
+        elif isinstance(value, np.ndarray):
+            inputs.append(f"{scope.get('__name__')}.{name}")
+            digest.update(value.dtype.str.encode() + repr(value.shape).encode() + value.tobytes())
+        else:
+            inputs.append(f"{scope.get('__name__')}.{name}")
+            digest.update(repr(value).encode())
+
+
+def fingerprint(make, inputs=None):
+    """
+    Empreinte du générateur: son code, les globales et helpers qu'il lit
+    (SENSOR_IDS, BASE_TIME, SAMPLE_TAGS, primitives datagen...) et
+    DATAGEN_VERSION. Un jeu n'est réutilisé que si rien de cela n'a changé.
+    `inputs` (liste) reçoit les noms des entrées hachées, pour le manifeste.
+    """
+    digest = hashlib.sha1(f"{make.__module__}.{make.__qualname__}:{DATAGEN_VERSION}".encode())
+    _hash_inputs(make.__code__, make.__globals__, digest, inputs if inputs is not None else [], set())
+    return digest.hexdigest()
+
+
+# ============================================
+# ECRITURE
+# ============================================
+def _write_strings(values, off_file, arena_file, position):
+    """Ajoute des chaînes à l'arène, retourne la nouvelle position (octets)"""
+    encoded = [s.encode() for s in values]
+    offsets = position + np.cumsum([len(b) for b in encoded], dtype=np.int64)
+    offsets.tofile(off_file)
+    arena_file.write(b"".join(encoded))
+    return int(offsets[-1]) if len(offsets) else position
+
+
+def write_dataset(path, make, count, seed=SEED):
+    """Génère `count` lignes par blocs et les écrit en colonnes dans `path`"""
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    columns = {}
+    files = {}
+    positions = {}
+
+    def open_file(name, ext):
+        key = (name, ext)
+        if key not in files:
+            files[key] = open(os.path.join(tmp, f"{name}.{ext}"), "wb")
+            if ext in ("off", "loff"):
+                np.zeros(1, dtype=np.int64).tofile(files[key])  # Décalage initial
+        return files[key]
+
+    try:
+        for start in range(0, count, BUILD_BLOCK):
+            batch = generate(make, min(BUILD_BLOCK, count - start), start, seed)
+            for name, col in batch.columns.items():
+                if col.dtype.kind in "US":
+                    columns[name] = {"kind": "str"}
+                    positions[name] = _write_strings(col.tolist(), open_file(name, "off"),
+                                                     open_file(name, "arena"), positions.get(name, 0))
+                else:
+                    columns[name] = {"kind": "num", "dtype": col.dtype.str}
+                    np.ascontiguousarray(col).tofile(open_file(name, "bin"))
+            for name, (matrix, sizes) in batch.lists.items():
+                columns[name] = {"kind": "list"}
+                elements = [v for row, size in zip(matrix.tolist(), sizes.tolist()) for v in row[:size]]
+                base = positions.get((name, "list"), 0)
+                (base + np.cumsum(sizes, dtype=np.int64)).tofile(open_file(name, "loff"))
+                positions[(name, "list")] = base + len(elements)
+                positions[name] = _write_strings(elements, open_file(name, "off"),
+                                                 open_file(name, "arena"), positions.get(name, 0))
+    finally:
+        for f in files.values():
+            f.close()
+
+    inputs = []
+    manifest = {"version": FORMAT_VERSION, "count": count, "seed": seed, "datagen": DATAGEN_VERSION,
+                "generator": fingerprint(make, inputs), "inputs": inputs, "columns": columns}
+    with open(os.path.join(tmp, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    return manifest
+
+
+# ============================================
+# LECTURE (mmap)
+# ============================================
+class _Strings:
+    """Colonne de chaînes mappée: décalages + arène"""
+
+    def __init__(self, path, name):
+        self.offsets = np.memmap(os.path.join(path, f"{name}.off"), dtype=np.int64, mode="r")
+        arena_path = os.path.join(path, f"{name}.arena")
+        if os.path.getsize(arena_path):
+            with open(arena_path, "rb") as f:
+                self.arena = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.arena = b""
+
+    def get(self, i):
+        return self.arena[self.offsets[i]:self.offsets[i + 1]].decode()
+
+    def slice(self, start, stop):
+        offsets = self.offsets[start:stop + 1].tolist()
+        block = self.arena[offsets[0]:offsets[-1]].decode()
+        if block.isascii():
+            # ASCII: décalages en octets = décalages en caractères, un seul decode
+            base = offsets[0]
+            return [block[a - base:b - base] for a, b in zip(offsets, offsets[1:])]
+        return [self.arena[a:b].decode() for a, b in zip(offsets, offsets[1:])]
+
+
+class MappedDataset:
+    """Jeu de données ouvert: colonnes en np.memmap / mmap, lecture par tranches"""
+
+    def __init__(self, path):
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self.count = self.manifest["count"]
+        self.numeric, self.strings, self.lists = {}, {}, {}
+        for name, spec in self.manifest["columns"].items():
+            if spec["kind"] == "num":
+                self.numeric[name] = np.memmap(os.path.join(path, f"{name}.bin"),
+                                               dtype=np.dtype(spec["dtype"]), mode="r", shape=(self.count,))
+            elif spec["kind"] == "str":
+                self.strings[name] = _Strings(path, name)
+            else:
+                self.lists[name] = (np.memmap(os.path.join(path, f"{name}.loff"), dtype=np.int64, mode="r"),
+                                    _Strings(path, name))
+        self.names = list(self.manifest["columns"])
+
+    def __len__(self):
+        return self.count
+
+    def _value(self, name, i):
+        if name in self.numeric:
+            return self.numeric[name][i].item()
+        if name in self.strings:
+            return self.strings[name].get(i)
+        list_offsets, elements = self.lists[name]
+        return elements.slice(list_offsets[i], list_offsets[i + 1])
+
+    def row(self, i):
+        return {name: self._value(name, i) for name in self.names}
+
+    def columns(self, start, stop):
+        """{colonne: liste Python} pour les lignes [start, stop)"""
+        converted = {}
+        for name in self.names:
+            if name in self.numeric:
+                converted[name] = self.numeric[name][start:stop].tolist()
+            elif name in self.strings:
+                converted[name] = self.strings[name].slice(start, stop)
+            else:
+                list_offsets, elements = self.lists[name]
+                bounds = list_offsets[start:stop + 1].tolist()
+                flat = elements.slice(bounds[0], bounds[-1])
+                converted[name] = [flat[a - bounds[0]:b - bounds[0]] for a, b in zip(bounds, bounds[1:])]
+        return converted
+
+    def rows(self, start, stop):
+        converted = self.columns(start, stop)
+        return [dict(zip(self.names, values)) for values in zip(*converted.values())]
+
+
+class Dataset:
+    """
+    Jeu déclaré par un scénario, construit (ou réutilisé) à la première
+    lecture ou par build(). Les ids hors [0, count) sont générés à la volée
+    par datagen: mêmes valeurs, sans passer par le disque.
+    """
+
+    def __init__(self, name, make, count, seed=SEED):
+        self.name = name
+        self.make = make
+        self.count = count
+        self.seed = seed
+        self.path = os.path.join(DATASETS_DIR, name)
+        self._mapped = None
+        self._lock = threading.Lock()
+        self._fallback = RowSource(make, seed)
+
+    def is_current(self):
+        try:
+            with open(os.path.join(self.path, "manifest.json")) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        # count >= : les lignes [0, self.count) d'un jeu plus grand de même empreinte sont identiques
+        return (manifest.get("version") == FORMAT_VERSION and manifest.get("seed") == self.seed
+                and manifest.get("datagen") == DATAGEN_VERSION
+                and manifest.get("count", 0) >= self.count
+                and manifest.get("generator") == fingerprint(self.make))
+
+    def build(self, force=False):
+        """Écrit le jeu sur disque s'il est absent ou périmé, puis l'ouvre"""
+        with self._lock:
+            if self._mapped is not None and not force:
+                return self._mapped
+            if force or not self.is_current():
+                print(f"  📦 Dataset {self.name}: génération de {self.count} lignes -> {self.path}")
+                write_dataset(self.path, self.make, self.count, self.seed)
+            self._mapped = MappedDataset(self.path)
+            return self._mapped
+
+    def open(self):
+        return self._mapped if self._mapped is not None else self.build()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        mapped = self.open()
+        if 0 <= i < self.count:
+            return mapped.row(i)
+        return self._fallback[i]
+
+    def rows(self, start=0, stop=None):
+        """Lignes [start, stop) en dicts (à appeler hors des régions chronométrées)"""
+        stop = self.count if stop is None else stop
+        if start < 0 or stop > self.count:
+            return self._fallback.batch(start, stop - start).rows()
+        return self.open().rows(start, stop)
+
+    def chunks(self, size, count=None):
+        """Lignes [0, count) par lots de `size`, lues au fur et à mesure"""
+        count = self.count if count is None else count
+        for start in range(0, count, size):
+            yield self.rows(start, min(start + size, count))
+
+
+def declare(name, make, count, seed=SEED):
+    """Déclare (ou redimensionne) un jeu de données; retourne le Dataset partagé"""
+    dataset = DATASETS.get(name)
+    if dataset is None or dataset.make is not make:
+        dataset = DATASETS[name] = Dataset(name, make, count, seed)
+    elif count > dataset.count:
+        dataset.count = count
+        dataset._mapped = None
+    return dataset
+
+
+def build_all(force=False):
+    """Construit (ou vérifie) tous les jeux déclarés, hors de toute mesure"""
+    for dataset in DATASETS.values():
+        dataset.build(force=force)
+    return list(DATASETS)
+
+
+def import_scenarios():
+    """Importe les scénarios pour enregistrer leurs jeux de données"""
+    scenarios_dir = os.path.dirname(os.path.abspath(__file__))
+    for path in sorted(glob.glob(os.path.join(scenarios_dir, "scenario*.py"))):
+        importlib.import_module(os.path.splitext(os.path.basename(path))[0])
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Jeux de données pré-générés")
+    parser.add_argument("--build", action="store_true", help="Construit les jeux absents ou périmés")
+    parser.add_argument("--force", action="store_true", help="Reconstruit tous les jeux")
+    args = parser.parse_args()
+    if args.build or args.force:
+        # Les scénarios déclarent leurs jeux dans le module importé "datasets", pas dans __main__
+        import datasets
+        datasets.import_scenarios()
+        names = datasets.build_all(force=args.force)
+        print(f"✅ {len(names)} jeux de données prêts dans {DATASETS_DIR}: {', '.join(names)}")
+    else:
+        parser.print_help()
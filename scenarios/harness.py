@@ -0,0 +1,282 @@
+"""
+Outils de mesure communs aux scénarios.
+
+Usage:
+    results = {}
+    with Phase(results, "insert", NUM_OPS) as phase:
+        put = phase.timer(backend.put)  # chaque appel est chronométré
+        for doc in docs:
+            put(NS, doc["user_id"], doc)
+    # results: insert_time, insert_latency, insert_throughput,
+    #          insert_p50_ms, insert_p95_ms, insert_p99_ms, insert_p999_ms, insert_max_ms, insert_stddev_ms,
+    #          insert_cpu, insert_cpu_peak, insert_client_cpu, insert_mem, insert_rss_peak_mb... (sampler.py)
+    #          insert_server_cpu_ms_per_op, insert_server_write_bytes_per_op... (cgroup du conteneur, containers.py)
+
+    # Échauffement avant la mesure (hors chrono), rapporté dans read_warmup_*
+    with Phase(results, "read", NUM_OPS, warmup=lambda i: backend.get(NS, i % NUM_OPS)) as phase:
+        ...
+"""
+import math
+import os
+import time
+
+from backends import wait_ready
+from containers import container_for
+from histogram import HistogramRecorder, LatencyHistogram
+from sampler import ResourceSampler, get_tag, set_tags
+
+READY_TIMEOUT = 60.0  # Attente max (s) qu'une base réponde avant son test
+
+# ---------------- ECHAUFFEMENT ----------------
+WARMUP_OPS = int(os.getenv("BENCH_WARMUP_OPS", "50"))  # Ops d'échauffement avant chaque phase
+WARMUP_SECONDS = float(os.getenv("BENCH_WARMUP_SECONDS", "0"))  # Si > 0: durée d'échauffement (remplace WARMUP_OPS)
+STEADY_STATE = os.getenv("BENCH_STEADY_STATE", "0") == "1"  # Échauffer jusqu'au régime stationnaire
+STEADY_WINDOW = int(os.getenv("BENCH_STEADY_WINDOW", "50"))  # Ops par fenêtre
+STEADY_TOLERANCE = float(os.getenv("BENCH_STEADY_TOLERANCE", "0.10"))  # Écart relatif max entre fenêtres
+STEADY_MAX_OPS = int(os.getenv("BENCH_STEADY_MAX_OPS", "5000"))  # Borne si le régime n'est jamais atteint
+QUERY_WARMUP_OPS = int(os.getenv("BENCH_QUERY_WARMUP_OPS", "3"))  # Exécutions à blanc d'une requête lourde
+
+# ---------------- DUREE ADAPTATIVE (Phase.run) ----------------
+ADAPTIVE = os.getenv("BENCH_ADAPTIVE", "1") == "1"  # 0: nombre d'ops fixe (constantes des scénarios)
+TARGET_PRECISION = float(os.getenv("BENCH_TARGET_PRECISION", "0.05"))  # Demi-largeur relative de l'IC visée
+PRECISION_METRIC = os.getenv("BENCH_PRECISION_METRIC", "mean")  # "mean" ou "p99"
+CONFIDENCE_Z = float(os.getenv("BENCH_CONFIDENCE_Z", "1.96"))  # 1.96: IC à 95%
+MIN_OPS = int(os.getenv("BENCH_MIN_OPS", "100"))
+MAX_OPS = int(os.getenv("BENCH_MAX_OPS", "100000"))
+TIME_BUDGET = float(os.getenv("BENCH_TIME_BUDGET", "30"))  # Secondes max par phase
+CHECK_EVERY = 50  # Ops entre deux évaluations de la précision
+
+
+class SteadyStateDetector:
+    """
+    Régime stationnaire atteint quand deux fenêtres consécutives de `window`
+    ops ont une latence moyenne et un débit à moins de `tolerance` (relatif).
+    """
+
+    def __init__(self, window=STEADY_WINDOW, tolerance=STEADY_TOLERANCE):
+        self.window = window
+        self.tolerance = tolerance
+        self._total = 0
+        self._count = 0
+        self._start = None
+        self._previous = None
+
+    def add(self, latency_ns, now_ns):
+        """Ajoute une mesure, retourne True quand le régime est stable"""
+        if self._start is None:
+            self._start = now_ns - latency_ns
+        self._total += latency_ns
+        self._count += 1
+        if self._count < self.window:
+            return False
+
+        elapsed = max(now_ns - self._start, 1)
+        current = (self._total / self._count, self._count / elapsed)
+        previous, self._previous = self._previous, current
+        self._total, self._count, self._start = 0, 0, now_ns
+        if previous is None:
+            return False
+        return all(abs(c - p) <= self.tolerance * p for c, p in zip(current, previous))
+
+
+def run_label(ops):
+    """Texte du nombre d'ops d'une phase Phase.run, pour l'affichage"""
+    if not ADAPTIVE:
+        return f"{ops}"
+    return f"{MIN_OPS}-{MAX_OPS} (±{TARGET_PRECISION:.0%} sur {PRECISION_METRIC}, ≤{TIME_BUDGET:.0f}s)"
+
+
+def run_warmup(op, name, ops=None):
+    """
+    Exécute op(i) avant une phase: WARMUP_OPS opérations, ou WARMUP_SECONDS
+    secondes, ou jusqu'au régime stationnaire si STEADY_STATE. Un `ops`
+    explicite (requêtes lourdes) fixe le nombre d'exécutions dans tous les modes.
+    Retourne les champs {name}_warmup_* (histogramme, nombre d'ops, durée).
+    """
+    seconds, detector = 0.0, None
+    if ops is not None:
+        max_ops = ops
+    elif STEADY_STATE:
+        max_ops, seconds, detector = STEADY_MAX_OPS, WARMUP_SECONDS, SteadyStateDetector()
+    elif WARMUP_SECONDS > 0:
+        max_ops, seconds = None, WARMUP_SECONDS
+    else:
+        max_ops = WARMUP_OPS
+    if max_ops == 0:
+        return {}
+
+    hist = LatencyHistogram()
+    clock = time.perf_counter_ns
+    start = clock()
+    deadline = start + int(seconds * 1e9) if seconds > 0 else None
+    done, steady = 0, False
+    while (max_ops is None or done < max_ops) and (deadline is None or clock() < deadline):
+        t0 = clock()
+        op(done)
+        t1 = clock()
+        hist.record(t1 - t0)
+        done += 1
+        if detector is not None and detector.add(t1 - t0, t1):
+            steady = True
+            break
+
+    elapsed = (clock() - start) / 1e9
+    fields = hist.fields(f'{name}_warmup')
+    fields[f'{name}_warmup_ops'] = float(done)
+    fields[f'{name}_warmup_time'] = elapsed
+    message = f"     🔥 Warmup: {done} ops en {elapsed:.2f}s (p50: {fields[f'{name}_warmup_p50_ms']:.3f}ms)"
+    if detector is not None:
+        fields[f'{name}_steady_state'] = 1.0 if steady else 0.0
+        message += ", régime stable" if steady else ", régime NON stable (borne atteinte)"
+    print(message)
+    return fields
+
+
+class Phase:
+    """
+    Chronomètre une phase et enregistre temps, latence moyenne, débit, CPU et RAM.
+    Les opérations passées par timer()/record() alimentent un histogramme
+    (percentiles, max, écart-type); sans elles, la phase entière compte
+    comme une seule mesure.
+    """
+
+    def __init__(self, results, name, ops=None, warmup=None, warmup_ops=None):
+        self.results = results
+        self.name = name
+        self.ops = ops  # Peut être fixé dans le bloc si inconnu au départ
+        self.warmup = warmup  # op(i) exécutée avant le chrono (voir run_warmup)
+        self.warmup_ops = warmup_ops
+        self.elapsed = 0.0
+        self.recorder = HistogramRecorder()
+
+    def record(self, latency_ns):
+        """Enregistre la latence d'une opération (ns), thread-safe"""
+        self.recorder.record(latency_ns)
+
+    def run(self, fn, args, ops=None, limit=None):
+        """
+        Appelle fn(*args(i)) pour i = 0, 1, ... (args hors chrono, fn chronométré).
+        Mode fixe: `ops` appels (défaut: ops de la phase). Mode adaptatif
+        (ADAPTIVE): jusqu'à ce que l'IC de PRECISION_METRIC soit plus étroit
+        que TARGET_PRECISION, entre MIN_OPS et MAX_OPS (et `limit`), dans
+        TIME_BUDGET secondes. Retourne le nombre d'appels.
+        """
+        ops = self.ops if ops is None else ops
+        if ADAPTIVE:
+            min_ops, max_ops = MIN_OPS, MAX_OPS
+        else:
+            min_ops = max_ops = ops
+        if limit is not None:
+            min_ops, max_ops = min(min_ops, limit), min(max_ops, limit)
+
+        hist = LatencyHistogram()
+        clock = time.perf_counter_ns
+        deadline = clock() + int(TIME_BUDGET * 1e9) if ADAPTIVE else None
+        precision = math.inf
+        done = 0
+        while done < max_ops:
+            call_args = args(done)
+            start = clock()
+            fn(*call_args)
+            end = clock()
+            hist.record(end - start)
+            done += 1
+            if ADAPTIVE and done >= min_ops and done % CHECK_EVERY == 0:
+                precision = hist.relative_ci(PRECISION_METRIC, CONFIDENCE_Z)
+                if precision <= TARGET_PRECISION or end >= deadline:
+                    break
+
+        self.merge(hist)
+        self.ops = done
+        if ADAPTIVE:
+            precision = hist.relative_ci(PRECISION_METRIC, CONFIDENCE_Z)
+            self.results[f'{self.name}_precision'] = precision if math.isfinite(precision) else -1.0
+            self.results[f'{self.name}_precision_target'] = TARGET_PRECISION
+            self.results[f'{self.name}_converged'] = 1.0 if precision <= TARGET_PRECISION else 0.0
+            print(f"     🎯 {done} ops, précision ±{precision:.1%} sur {PRECISION_METRIC} "
+                  f"({'atteinte' if precision <= TARGET_PRECISION else 'NON atteinte'}, cible ±{TARGET_PRECISION:.0%})")
+        return done
+
+    def merge(self, hist):
+        """Intègre un LatencyHistogram mesuré ailleurs (autre processus)"""
+        self.recorder.add(hist)
+
+    def timer(self, fn):
+        """Enveloppe fn: chaque appel est chronométré dans l'histogramme de la phase"""
+        record = self.recorder.record
+        clock = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            start = clock()
+            result = fn(*args, **kwargs)
+            record(clock() - start)
+            return result
+        return timed
+
+    def __enter__(self):
+        if self.warmup is not None:
+            self.results.update(run_warmup(self.warmup, self.name, self.warmup_ops))
+        self._sampler = ResourceSampler(container=container_for(get_tag("database"))).start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self._start
+        self._sampler.stop()
+        if exc_type is not None:
+            return False
+
+        name, results = self.name, self.results
+        results[f'{name}_time'] = self.elapsed
+        if self.ops:
+            results[f'{name}_latency'] = self.elapsed / self.ops
+            results[f'{name}_throughput'] = self.ops / self.elapsed if self.elapsed > 0 else 0.0
+        # CPU / mémoire / E/S échantillonnés pendant la phase (client et conteneur de la base)
+        results.update(self._sampler.fields(name, self.ops))
+        self._sampler.write_series(phase=name)
+
+        hist = self.recorder.merged()
+        if not hist.count:
+            hist.record(self.elapsed * 1e9)
+        results.update(hist.fields(name))
+
+        if self.ops:
+            print(f"     ✅ Done in {self.elapsed:.2f}s "
+                  f"(avg: {results[f'{name}_latency']*1000:.4f}ms, {results[f'{name}_throughput']:.0f} ops/sec)")
+        else:
+            print(f"     ✅ Done in {self.elapsed:.2f}s")
+        if hist.count > 1:
+            print(f"     ⏱️  p50: {results[f'{name}_p50_ms']:.3f}ms, p99: {results[f'{name}_p99_ms']:.3f}ms, "
+                  f"p99.9: {results[f'{name}_p999_ms']:.3f}ms, max: {results[f'{name}_max_ms']:.3f}ms")
+        if f'{name}_server_cpu_ms_per_op' in results:
+            print(f"     🗄️  Serveur: {results[f'{name}_server_cpu_ms_per_op']:.4f} CPU-ms/op, "
+                  f"{results[f'{name}_server_write_bytes_per_op']:.0f} o écrits/op, "
+                  f"{results[f'{name}_server_mem_peak_mb']:.0f}MB max")
+        return False
+
+
+def skip_native(backend, what):
+    """True (et message) si la phase nécessite des requêtes natives absentes du stand-in"""
+    if backend.stand_in:
+        print(f"  ⏭️  {what}: ignoré (stand-in en mémoire)")
+        return True
+    return False
+
+
+def run_tests(db_tests, send_results, databases=None, scenario=None):
+    """
+    Exécute les tests [(nom_base, fonction)] dans l'ordre, en filtrant sur
+    `databases`. Chaque base est attendue (ping) avant son test; une erreur
+    n'interrompt pas les bases suivantes. `scenario` étiquette les séries de ressources.
+    """
+    for db_name, test in db_tests:
+        if databases and db_name not in databases:
+            continue
+        print("\n" + "="*60)
+        set_tags(scenario=scenario, database=db_name)
+        try:
+            wait_ready(db_name, timeout=READY_TIMEOUT)
+            results = test()
+            send_results(db_name, results)
+        except Exception as e:
+            print(f"❌ Erreur {db_name}: {e}")
@@ -0,0 +1,167 @@
+"""
+Histogramme de latences à buckets logarithmiques (style HdrHistogram).
+
+Chaque puissance de deux est découpée en 64 sous-buckets linéaires:
+erreur relative < 1.6% sur toute la plage (1 ns à ~30 min) pour un tableau
+fixe de quelques milliers d'entiers. Les enregistrements se font dans un
+histogramme par thread (HistogramRecorder), fusionnés en fin de phase.
+
+Usage:
+    recorder = HistogramRecorder()
+    t0 = time.perf_counter_ns(); op(); recorder.record(time.perf_counter_ns() - t0)
+    hist = recorder.merged()
+    hist.percentile(99.9)  # en ns
+"""
+import math
+import threading
+
+SUB_BUCKET_BITS = 7
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS  # 128 valeurs exactes, puis 64 buckets par puissance de 2
+HALF = SUB_BUCKETS >> 1
+MAX_SHIFT = 38  # 2^45 ns ≈ 9.7 heures
+NUM_BUCKETS = SUB_BUCKETS + MAX_SHIFT * HALF
+
+# Champs exportés: suffixe -> percentile
+PERCENTILES = {"p50": 50.0, "p95": 95.0, "p99": 99.0, "p999": 99.9}
+
+
+def bucket_index(value):
+    """Index du bucket contenant value (ns)"""
+    if value < SUB_BUCKETS:
+        return value if value > 0 else 0
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    if shift > MAX_SHIFT:
+        return NUM_BUCKETS - 1
+    return SUB_BUCKETS + (shift - 1) * HALF + (value >> shift) - HALF
+
+
+def bucket_bounds(index):
+    """Bornes (incluses) des valeurs d'un bucket"""
+    if index < SUB_BUCKETS:
+        return index, index
+    offset = index - SUB_BUCKETS
+    shift = offset // HALF + 1
+    top = offset % HALF + HALF
+    return top << shift, ((top + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Histogramme de latences en nanosecondes"""
+
+    def __init__(self):
+        self.counts = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total = 0
+        self.total_sq = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, value):
+        value = int(value)
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.total_sq += value * value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Ajoute les comptes d'un autre histogramme"""
+        counts = self.counts
+        for i, n in enumerate(other.counts):
+            if n:
+                counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, pct):
+        """Valeur (ns) sous laquelle se trouvent pct% des enregistrements"""
+        if not self.count:
+            return 0
+        target = max(1, math.ceil(self.count * pct / 100.0))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            if n:
+                seen += n
+                if seen >= target:
+                    # Plus haute valeur équivalente du bucket, bornée par le max observé
+                    return min(bucket_bounds(index)[1], self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def stddev(self):
+        if self.count < 2:
+            return 0.0
+        mean = self.mean()
+        return math.sqrt(max(self.total_sq / self.count - mean * mean, 0.0))
+
+    def relative_ci(self, metric="mean", z=1.96):
+        """
+        Demi-largeur relative de l'intervalle de confiance (z=1.96: 95%) de la
+        moyenne ("mean") ou d'un percentile ("p99"...). Pour un percentile:
+        intervalle de rangs binomial n*q ± z*sqrt(n*q*(1-q)).
+        """
+        n = self.count
+        if n < 2:
+            return math.inf
+        if metric == "mean":
+            mean = self.mean()
+            return z * self.stddev() / math.sqrt(n) / mean if mean else math.inf
+        q = PERCENTILES[metric] / 100.0
+        spread = z * math.sqrt(n * q * (1 - q))
+        center = self.percentile(q * 100)
+        low = self.percentile(100.0 * max(n * q - spread, 1) / n)
+        high = self.percentile(100.0 * min(n * q + spread, n) / n)
+        return (high - low) / 2 / center if center else math.inf
+
+    def fields(self, prefix):
+        """Champs InfluxDB en millisecondes: {prefix}_p50_ms ... {prefix}_max_ms, {prefix}_stddev_ms"""
+        fields = {f'{prefix}_{name}_ms': self.percentile(pct) / 1e6 for name, pct in PERCENTILES.items()}
+        fields[f'{prefix}_max_ms'] = self.max / 1e6
+        fields[f'{prefix}_stddev_ms'] = self.stddev() / 1e6
+        fields[f'{prefix}_samples'] = float(self.count)
+        return fields
+
+
+class HistogramRecorder:
+    """Un histogramme par thread (pas de verrou dans le chemin chaud), fusionnés à la demande"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._histograms = []
+        self._lock = threading.Lock()
+
+    def _histogram(self):
+        hist = LatencyHistogram()
+        self._local.hist = hist
+        with self._lock:
+            self._histograms.append(hist)
+        return hist
+
+    def record(self, value):
+        try:
+            hist = self._local.hist
+        except AttributeError:
+            hist = self._histogram()
+        hist.record(value)
+
+    def add(self, hist):
+        """Ajoute un histogramme déjà rempli (ex: reçu d'un processus fils)"""
+        with self._lock:
+            self._histograms.append(hist)
+
+    def merged(self):
+        merged = LatencyHistogram()
+        with self._lock:
+            for hist in self._histograms:
+                merged.merge(hist)
+        return merged
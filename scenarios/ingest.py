@@ -0,0 +1,188 @@
+"""
+Ingestion en flux à mémoire bornée (producteur / consommateurs).
+
+Un thread producteur lit le jeu de données (datasets.py, mmap) par lots et
+les dépose dans une file bornée; N threads écrivains les envoient en
+parallèle avec backend.bulk (insert_many, pipelines Redis, CQL asynchrone).
+La mémoire ne dépend que de la taille de la file, pas du nombre de lignes:
+100M enregistrements passent avec quelques lots en vol.
+
+La taille de lot s'adapte à la contre-pression (AIMD): divisée par deux si
+un lot dépasse la latence cible (serveur saturé), augmentée tant qu'elle
+reste bien en dessous. Le débit soutenu (enregistrements/s) est relevé à
+intervalle fixe et envoyé à InfluxDB (mesure "ingest").
+
+Usage:
+    with Phase(results, "insert", NUM_RECORDS) as phase:
+        stats = ingest(backend, "iot_sensors", SENSORS, NUM_RECORDS, phase, prefix="insert")
+    results.update(stats)   # insert_records_per_s, insert_rate_p50, insert_batch_size_final...
+"""
+import os
+import queue
+import threading
+import time
+
+from sampler import get_tag
+
+INGEST_WRITERS = int(os.getenv("BENCH_INGEST_WRITERS", "4"))  # Écrivains parallèles par base
+INGEST_QUEUE = int(os.getenv("BENCH_INGEST_QUEUE", "8"))  # Lots en attente max (mémoire bornée)
+INGEST_MIN_BATCH = int(os.getenv("BENCH_INGEST_MIN_BATCH", "100"))
+INGEST_MAX_BATCH = int(os.getenv("BENCH_INGEST_MAX_BATCH", "20000"))
+INGEST_TARGET_MS = float(os.getenv("BENCH_INGEST_TARGET_MS", "100"))  # Latence visée par lot
+REPORT_INTERVAL = float(os.getenv("BENCH_INGEST_REPORT_INTERVAL", "1.0"))  # s entre deux relevés de débit
+MEASUREMENT = "ingest"
+
+_DONE = object()
+
+
+class BatchSizer:
+    """
+    Taille de lot AIMD: lot plus lent que la cible -> taille / 2 (contre-pression),
+    lot sous la moitié de la cible -> taille x 1.25, sinon inchangée.
+    """
+
+    def __init__(self, initial, min_size=INGEST_MIN_BATCH, max_size=INGEST_MAX_BATCH,
+                 target_ms=INGEST_TARGET_MS):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target = target_ms / 1000
+        self.size = max(min_size, min(initial, max_size))
+        self.backoffs = 0
+        self._lock = threading.Lock()
+
+    def observe(self, latency_s):
+        with self._lock:
+            if latency_s > self.target:
+                self.size = max(self.min_size, self.size // 2)
+                self.backoffs += 1
+            elif latency_s < self.target / 2:
+                self.size = min(self.max_size, int(self.size * 1.25) + 1)
+
+
+def ingest(backend, ns, dataset, count, phase, writers=INGEST_WRITERS, batch_size=1000,
+           queue_size=INGEST_QUEUE, prefix="insert", bulk=None, prepare=None):
+    """
+    Insère les lignes [0, count) de `dataset` dans `ns` avec bulk(ns, rows)
+    (défaut: backend.bulk). prepare(rows), si fourni, convertit chaque lot
+    dans le producteur, avant la file: seul l'envoi est chronométré.
+    La latence de chaque lot est enregistrée dans `phase`. Retourne les champs {prefix}_records_per_s
+    (débit soutenu), _rate_min/_rate_p50/_rate_max (par intervalle),
+    _batch_size_final, _batch_size_mean, _backoffs, _queue_peak, _writers.
+    """
+    batches = queue.Queue(maxsize=queue_size)
+    sizer = BatchSizer(batch_size)
+    stop = threading.Event()
+    errors = []
+    state = {"done": 0, "batches": 0, "queue_peak": 0}
+    lock = threading.Lock()
+    clock = time.perf_counter
+
+    def put(item):
+        # Bloque tant que la file est pleine (contre-pression), sauf arrêt sur erreur
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def producer():
+        try:
+            start = 0
+            while start < count:
+                stop_row = min(start + sizer.size, count)
+                rows = dataset.rows(start, stop_row)
+                if not put((len(rows), prepare(rows) if prepare else rows)):
+                    return
+                state["queue_peak"] = max(state["queue_peak"], batches.qsize())
+                start = stop_row
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            for _ in range(writers):
+                put(_DONE)
+
+    write = bulk or backend.bulk
+
+    def writer():
+        record = phase.record
+        while not stop.is_set():
+            try:
+                item = batches.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                return
+            size, batch = item
+            try:
+                begin = clock()
+                write(ns, batch)
+                latency = clock() - begin
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+                return
+            record(latency * 1e9)
+            sizer.observe(latency)
+            with lock:
+                state["done"] += size
+                state["batches"] += 1
+
+    threads = [threading.Thread(target=producer, name="ingest-producer", daemon=True)]
+    threads += [threading.Thread(target=writer, name=f"ingest-writer-{i}", daemon=True) for i in range(writers)]
+    start = clock()
+    for thread in threads:
+        thread.start()
+
+    # Relevé du débit soutenu pendant l'ingestion
+    series = []
+    last_time, last_done = start, 0
+    while any(thread.is_alive() for thread in threads):
+        deadline = last_time + REPORT_INTERVAL
+        for thread in threads:
+            thread.join(max(0.0, deadline - clock()))
+        now, done = clock(), state["done"]
+        if now - last_time >= REPORT_INTERVAL or not any(thread.is_alive() for thread in threads):
+            series.append((time.time_ns(), (done - last_done) / (now - last_time) if now > last_time else 0.0,
+                           sizer.size, batches.qsize()))
+            last_time, last_done = now, done
+    for thread in threads:
+        thread.join()
+    elapsed = clock() - start
+
+    if errors:
+        raise errors[0]
+
+    write_series(series, phase=prefix)
+    rates = sorted(rate for _, rate, _, _ in series) or [0.0]
+    return {
+        f'{prefix}_records_per_s': state["done"] / elapsed if elapsed > 0 else 0.0,
+        f'{prefix}_rate_min': rates[0],
+        f'{prefix}_rate_p50': rates[len(rates) // 2],
+        f'{prefix}_rate_max': rates[-1],
+        f'{prefix}_batch_size_final': float(sizer.size),
+        f'{prefix}_batch_size_mean': state["done"] / state["batches"] if state["batches"] else 0.0,
+        f'{prefix}_backoffs': float(sizer.backoffs),
+        f'{prefix}_queue_peak': float(state["queue_peak"]),
+        f'{prefix}_writers': float(writers),
+    }
+
+
+def write_series(series, **tags):
+    """Série records/s, taille de lot et profondeur de file, via le sink de métriques"""
+    from influxdb_client import Point, WritePrecision
+    import metrics
+
+    tags = {"scenario": get_tag("scenario"), "database": get_tag("database"), **tags}
+    points = []
+    for ts, rate, size, depth in series:
+        point = Point(MEASUREMENT).time(ts, WritePrecision.NS)
+        for key, value in tags.items():
+            if value is not None:
+                point.tag(key, value)
+        point.field("records_per_s", float(rate)).field("batch_size", float(size)).field("queue_depth", float(depth))
+        points.append(point)
+    if points:
+        metrics.write(points)
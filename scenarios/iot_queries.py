@@ -0,0 +1,418 @@
+"""
+Suite de requêtes de lecture IoT (formes des tableaux de bord).
+
+Quatre formes de requête, exécutées de nombreuses fois avec des capteurs et
+des fenêtres tirés au hasard (reproductibles: mêmes tirages pour toutes les
+bases), avec les percentiles de latence par forme:
+
+    downsample   moyenne par minute d'un capteur sur la fenêtre
+    latest       dernier relevé de chaque capteur à la fin de la fenêtre (as-of)
+    top_hottest  les IOT_TOP_N capteurs les plus chauds sur la fenêtre
+    rolling      moyenne glissante sur IOT_ROLLING_MINUTES minutes d'un capteur
+
+IotQueries passe par l'interface uniforme (backend.query), pour les stand-ins
+et Neo4j; MongoIotQueries (pipelines d'agrégation), RedisZsetIotQueries
+(sorted sets par capteur, voir scenario2) et CassandraIotQueries (CQL par
+partition, en parallèle) utilisent les requêtes natives.
+
+Le balayage de sélectivité (selectivity_sweep) fait varier la fenêtre d'une
+seconde au jeu complet, sur un capteur ou sur tous: latence totale et temps
+jusqu'à la première ligne en fonction du nombre de lignes renvoyées, curseurs
+consommés en flux (stream). Une courbe par base dans la mesure "selectivity".
+
+Usage:
+    windows = random_windows(SENSOR_IDS, BASE_TIME, NUM_RECORDS)
+    run_suite(MongoIotQueries(backend, "iot_sensors", SENSOR_IDS), windows, results)
+    # q_downsample_p50_ms, q_latest_p99_ms, q_top_hottest_rows_mean...
+    selectivity_sweep(queries, SENSOR_IDS, BASE_TIME, NUM_RECORDS, results)
+"""
+import os
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+
+from backends import CASSANDRA_CONCURRENCY
+from datagen import SEED, choice, integers, timestamps
+from harness import Phase, QUERY_WARMUP_OPS
+from histogram import LatencyHistogram
+from sampler import get_tag
+
+IOT_QUERY_SHAPES = [s for s in os.getenv("BENCH_IOT_QUERIES", "downsample,latest,top_hottest,rolling").split(",") if s]
+IOT_QUERY_RUNS = int(os.getenv("BENCH_IOT_QUERY_RUNS", "200"))  # Exécutions max par forme de requête
+IOT_WINDOW_MIN_S = int(os.getenv("BENCH_IOT_WINDOW_MIN_S", "60"))  # Durée des fenêtres tirées (s)
+IOT_WINDOW_MAX_S = int(os.getenv("BENCH_IOT_WINDOW_MAX_S", "3600"))
+IOT_TOP_N = int(os.getenv("BENCH_IOT_TOP_N", "5"))
+IOT_ROLLING_MINUTES = int(os.getenv("BENCH_IOT_ROLLING_MINUTES", "5"))
+
+SWEEP_POINTS = int(os.getenv("BENCH_SWEEP_POINTS", "10"))  # Tailles de fenêtre, de 1 s au jeu complet
+SWEEP_RUNS = int(os.getenv("BENCH_SWEEP_RUNS", "20"))  # Fenêtres tirées par taille
+SWEEP_BATCH = int(os.getenv("BENCH_SWEEP_BATCH", "1000"))  # Lignes par lot de curseur
+SWEEP_MEASUREMENT = "selectivity"
+
+# Fenêtre tirée: capteur, bornes "YYYY-MM-DD HH:MM:SS" et en secondes epoch
+Window = namedtuple("Window", "sensor start end start_s end_s")
+
+
+def epoch(timestamp):
+    """'YYYY-MM-DD HH:MM:SS' (UTC) -> secondes depuis l'epoch"""
+    return int(datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp())
+
+
+def random_windows(sensor_ids, base_time, span, runs=IOT_QUERY_RUNS, seed=SEED, length=None):
+    """
+    `runs` fenêtres dans [base_time, base_time + span s): un capteur et une
+    durée uniforme entre IOT_WINDOW_MIN_S et IOT_WINDOW_MAX_S (bornée par span),
+    ou de `length` secondes
+    """
+    ids = np.arange(runs, dtype=np.int64)
+    max_length = max(1, min(IOT_WINDOW_MAX_S, span))
+    if length is not None:
+        lengths = np.full(runs, max(1, min(length, span)), dtype=np.int64)
+    else:
+        lengths = integers(ids, seed, 101, min(IOT_WINDOW_MIN_S, max_length), max_length + 1)
+    offsets = integers(ids, seed, 102, 0, 1 << 62) % np.maximum(span - lengths + 1, 1)
+    starts = timestamps(offsets, base_time).tolist()
+    ends = timestamps(offsets + lengths - 1, base_time).tolist()
+    sensors = choice(ids, seed, 103, np.asarray(sensor_ids)).tolist()
+    return [Window(sensor, start, end, epoch(start), epoch(end))
+            for sensor, start, end in zip(sensors, starts, ends)]
+
+
+def per_minute(readings):
+    """[(timestamp, temperature)] -> [(minute, moyenne)] triés (minute = "YYYY-MM-DD HH:MM")"""
+    sums = {}
+    for ts, temperature in readings:
+        total = sums.setdefault(ts[:16], [0.0, 0])
+        total[0] += temperature
+        total[1] += 1
+    return [(minute, total / n) for minute, (total, n) in sorted(sums.items())]
+
+
+def rolling_mean(points, width=IOT_ROLLING_MINUTES):
+    """[(minute, moyenne)] -> moyenne des `width` dernières minutes présentes"""
+    values = [value for _, value in points]
+    return [(minute, sum(values[max(0, i - width + 1):i + 1]) / (i + 1 - max(0, i - width + 1)))
+            for i, (minute, _) in enumerate(points)]
+
+
+# ============================================
+# INTERFACE UNIFORME (stand-ins, Neo4j)
+# ============================================
+class IotQueries:
+    """
+    Formes de requête calculées à partir de backend.query (filtre par capteur
+    et intervalle de timestamp), agrégats côté client.
+    """
+    FIRST = "0000-01-01 00:00:00"  # Borne basse des requêtes "as-of"
+
+    def __init__(self, backend, ns, sensor_ids):
+        self.backend = backend
+        self.ns = ns
+        self.sensor_ids = list(sensor_ids)
+
+    def readings(self, sensor, start, end):
+        return [(doc["timestamp"], doc["temperature"]) for doc in
+                self.backend.query(self.ns, where={"sensor_id": sensor, "timestamp": (start, end)})]
+
+    def stream(self, w, all_sensors=False):
+        """Lignes de la fenêtre (un capteur ou tous), itérées au fil du curseur"""
+        where = {"timestamp": (w.start, w.end)}
+        if not all_sensors:
+            where["sensor_id"] = w.sensor
+        yield from self.backend.query(self.ns, where=where)
+
+    def downsample(self, w):
+        return per_minute(self.readings(w.sensor, w.start, w.end))
+
+    def latest(self, w):
+        found = {}
+        for sensor in self.sensor_ids:
+            readings = self.readings(sensor, self.FIRST, w.end)
+            if readings:
+                found[sensor] = max(readings)
+        return found
+
+    def top_hottest(self, w):
+        averages = []
+        for sensor in self.sensor_ids:
+            temperatures = [t for _, t in self.readings(sensor, w.start, w.end)]
+            if temperatures:
+                averages.append((sum(temperatures) / len(temperatures), sensor))
+        return sorted(averages, reverse=True)[:IOT_TOP_N]
+
+    def rolling(self, w):
+        return rolling_mean(self.downsample(w))
+
+
+# ============================================
+# MONGODB (pipelines d'agrégation)
+# ============================================
+class MongoIotQueries(IotQueries):
+    def __init__(self, backend, ns, sensor_ids):
+        super().__init__(backend, ns, sensor_ids)
+        self.collection = backend.collection(ns)
+
+    def _per_minute(self, w):
+        return [
+            {"$match": {"sensor_id": w.sensor, "timestamp": {"$gte": w.start, "$lte": w.end}}},
+            {"$group": {"_id": {"$substrBytes": ["$timestamp", 0, 16]}, "avg_temp": {"$avg": "$temperature"}}},
+            {"$sort": {"_id": 1}},
+        ]
+
+    def downsample(self, w):
+        return list(self.collection.aggregate(self._per_minute(w)))
+
+    def stream(self, w, all_sensors=False):
+        where = {"timestamp": {"$gte": w.start, "$lte": w.end}}
+        if not all_sensors:
+            where["sensor_id"] = w.sensor
+        return self.collection.find(where, {"_id": 0}, batch_size=SWEEP_BATCH)
+
+    def latest(self, w):
+        return list(self.collection.aggregate([
+            {"$match": {"timestamp": {"$lte": w.end}}},
+            {"$sort": {"sensor_id": 1, "timestamp": -1}},
+            {"$group": {"_id": "$sensor_id", "timestamp": {"$first": "$timestamp"},
+                        "temperature": {"$first": "$temperature"}}},
+        ]))
+
+    def top_hottest(self, w):
+        return list(self.collection.aggregate([
+            {"$match": {"timestamp": {"$gte": w.start, "$lte": w.end}}},
+            {"$group": {"_id": "$sensor_id", "avg_temp": {"$avg": "$temperature"}}},
+            {"$sort": {"avg_temp": -1}},
+            {"$limit": IOT_TOP_N},
+        ]))
+
+    def rolling(self, w):
+        return list(self.collection.aggregate(self._per_minute(w) + [
+            {"$setWindowFields": {"sortBy": {"_id": 1}, "output": {"rolling_temp": {
+                "$avg": "$avg_temp", "window": {"documents": [-(IOT_ROLLING_MINUTES - 1), 0]}}}}},
+        ]))
+
+
+# ============================================
+# REDIS (sorted sets par capteur, score = epoch)
+# ============================================
+class RedisZsetIotQueries(IotQueries):
+    """
+    Index iot:zset:{capteur} de scenario2 (membres "record_id|temperature|humidity").
+    `key(sensor)` donne la clé, `average` est le script Lua {nombre, somme} d'une fenêtre.
+    """
+
+    def __init__(self, backend, key, average, sensor_ids):
+        super().__init__(backend, None, sensor_ids)
+        self.r = backend.client
+        self.key = key
+        self.average = average
+
+    def downsample(self, w):
+        sums = {}
+        for member, score in self.r.zrangebyscore(self.key(w.sensor), w.start_s, w.end_s, withscores=True):
+            total = sums.setdefault(int(score) // 60, [0.0, 0])
+            total[0] += float(member.split("|")[1])
+            total[1] += 1
+        return [(minute, total / n) for minute, (total, n) in sorted(sums.items())]
+
+    def stream(self, w, all_sensors=False):
+        # Lots de SWEEP_BATCH membres, reprise après le dernier score (un relevé par seconde et par capteur)
+        for sensor in self.sensor_ids if all_sensors else [w.sensor]:
+            low = w.start_s
+            while True:
+                batch = self.r.zrangebyscore(self.key(sensor), low, w.end_s, start=0, num=SWEEP_BATCH, withscores=True)
+                yield from batch
+                if len(batch) < SWEEP_BATCH:
+                    break
+                low = f"({int(batch[-1][1])}"
+
+    def latest(self, w):
+        pipe = self.r.pipeline(transaction=False)
+        for sensor in self.sensor_ids:
+            pipe.zrevrangebyscore(self.key(sensor), w.end_s, "-inf", start=0, num=1, withscores=True)
+        return {sensor: entries[0] for sensor, entries in zip(self.sensor_ids, pipe.execute()) if entries}
+
+    def top_hottest(self, w):
+        pipe = self.r.pipeline(transaction=False)
+        for sensor in self.sensor_ids:
+            self.average(keys=[self.key(sensor)], args=[w.start_s, w.end_s], client=pipe)
+        averages = [(float(total) / n, sensor) for sensor, (n, total) in zip(self.sensor_ids, pipe.execute()) if n]
+        return sorted(averages, reverse=True)[:IOT_TOP_N]
+
+
+# ============================================
+# CASSANDRA (une partition par capteur)
+# ============================================
+def iter_fan_out(backend, query, params, concurrency=CASSANDRA_CONCURRENCY):
+    """
+    Exécute la requête préparée pour chaque jeu de paramètres (une partition
+    chacun), au plus `concurrency` en vol. Produit le ResultSet de chaque jeu,
+    dans l'ordre des paramètres (pages suivantes lues à l'itération).
+    """
+    pending = deque()
+    for values in params:
+        if len(pending) >= concurrency:
+            yield pending.popleft().result()
+        pending.append(backend.execute_async(query, values))
+    while pending:
+        yield pending.popleft().result()
+
+
+def fan_out(backend, query, params, concurrency=CASSANDRA_CONCURRENCY):
+    """Lignes de chaque partition, dans l'ordre des paramètres (fusion à la charge de l'appelant)"""
+    return [rows.all() for rows in iter_fan_out(backend, query, params, concurrency)]
+
+
+class CassandraIotQueries(IotQueries):
+    """
+    Requêtes CQL préparées sur la table PRIMARY KEY (sensor_id, timestamp).
+    Les requêtes multi-capteurs interrogent chaque partition en parallèle
+    (execute_async) et fusionnent côté client.
+    """
+
+    def __init__(self, backend, ns, sensor_ids):
+        super().__init__(backend, ns, sensor_ids)
+        table = backend.table(ns)
+        self.window_query = (f"SELECT timestamp, temperature FROM {table} "
+                             "WHERE sensor_id = ? AND timestamp >= ? AND timestamp <= ?")
+        self.latest_query = (f"SELECT timestamp, temperature FROM {table} "
+                             "WHERE sensor_id = ? AND timestamp <= ? ORDER BY timestamp DESC LIMIT 1")
+        self.average_query = (f"SELECT avg(temperature) AS avg_temp, count(*) AS n FROM {table} "
+                              "WHERE sensor_id = ? AND timestamp >= ? AND timestamp <= ?")
+
+    def readings(self, sensor, start, end):
+        return [(row["timestamp"], row["temperature"])
+                for row in self.backend.execute(self.window_query, [sensor, start, end])]
+
+    def stream(self, w, all_sensors=False):
+        sensors = self.sensor_ids if all_sensors else [w.sensor]
+        for rows in iter_fan_out(self.backend, self.window_query, [[s, w.start, w.end] for s in sensors]):
+            yield from rows
+
+    def _fan_out(self, query, params):
+        """Une requête par capteur, en parallèle: [(capteur, lignes)]"""
+        return list(zip(self.sensor_ids, fan_out(self.backend, query, [[s, *params] for s in self.sensor_ids])))
+
+    def latest(self, w):
+        return {sensor: rows[0] for sensor, rows in self._fan_out(self.latest_query, [w.end]) if rows}
+
+    def top_hottest(self, w):
+        averages = [(rows[0]["avg_temp"], sensor) for sensor, rows in
+                    self._fan_out(self.average_query, [w.start, w.end]) if rows and rows[0]["n"]]
+        return sorted(averages, reverse=True)[:IOT_TOP_N]
+
+
+# ============================================
+# EXECUTION
+# ============================================
+def run_suite(queries, windows, results, shapes=None, prefix="q"):
+    """
+    Exécute chaque forme de requête sur les fenêtres tirées (une fenêtre par
+    exécution), jusqu'à len(windows) fois. Champs {prefix}_{forme}_* (percentiles
+    du harnais) et {prefix}_{forme}_rows_mean (taille moyenne des résultats).
+    """
+    for shape in shapes or IOT_QUERY_SHAPES:
+        query = getattr(queries, shape)
+        sizes = []
+
+        def call(w):
+            sizes.append(len(query(w)))
+
+        def args(i):
+            return (windows[i % len(windows)],)
+
+        name = f"{prefix}_{shape}"
+        print(f"  🔎 IOT QUERY {shape} ({len(windows)} fenêtres tirées)...")
+        with Phase(results, name, len(windows), warmup=lambda i: query(*args(i)),
+                   warmup_ops=QUERY_WARMUP_OPS) as phase:
+            phase.run(call, args, limit=len(windows))
+        results[f'{name}_rows_mean'] = sum(sizes) / len(sizes) if sizes else 0.0
+        print(f"     📊 {results[f'{name}_rows_mean']:.1f} lignes / requête en moyenne")
+
+
+# ============================================
+# BALAYAGE DE SELECTIVITE
+# ============================================
+def sweep_lengths(span, points=SWEEP_POINTS):
+    """Durées de fenêtre (s) en progression géométrique de 1 s à `span`"""
+    return sorted({int(round(x)) for x in np.geomspace(1, max(span, 1), points)})
+
+
+def consume(query):
+    """
+    Lance query() (qui retourne le curseur) et l'itère jusqu'au bout: (temps
+    jusqu'à la première ligne, temps total) en ns, lignes. Chrono démarré avant
+    l'appel: les backends qui exécutent dès l'appel (Neo4j, Cassandra) sont
+    mesurés comme les curseurs paresseux (pymongo).
+    """
+    clock = time.perf_counter_ns
+    start = clock()
+    first = None
+    count = 0
+    for _ in query():
+        if first is None:
+            first = clock() - start
+        count += 1
+    total = clock() - start
+    return total if first is None else first, total, count
+
+
+def selectivity_sweep(queries, sensor_ids, base_time, span, results, prefix="sweep"):
+    """
+    Pour chaque filtre (un capteur, tous) et chaque durée de sweep_lengths(span):
+    SWEEP_RUNS fenêtres tirées, curseur consommé en flux. Un point par
+    (filtre, durée) dans la mesure "selectivity": lignes moyennes, latence
+    et temps jusqu'à la première ligne (p50 / p99). Champs {prefix}_{filtre}_points
+    et {prefix}_{filtre}_full_p50_ms (fenêtre = jeu complet).
+    """
+    points = []
+    for scope in ("sensor", "all"):
+        print(f"  📈 SELECTIVITY SWEEP ({'un capteur' if scope == 'sensor' else 'tous les capteurs'})...")
+        print(f"     {'fenêtre':>10} {'lignes':>10} {'p50 ms':>10} {'p99 ms':>10} {'1re ligne p50':>14}")
+        for length in sweep_lengths(span):
+            windows = random_windows(sensor_ids, base_time, span, SWEEP_RUNS, seed=SEED + length, length=length)
+            for w in windows[:QUERY_WARMUP_OPS]:
+                consume(lambda: queries.stream(w, scope == "all"))
+            latency, first_row = LatencyHistogram(), LatencyHistogram()
+            rows = 0
+            for w in windows:
+                first, total, count = consume(lambda: queries.stream(w, scope == "all"))
+                latency.record(total)
+                first_row.record(first)
+                rows += count
+            point = {
+                "time": time.time_ns(), "scope": scope, "window_s": float(length), "rows_mean": rows / len(windows),
+                "latency_p50_ms": latency.percentile(50) / 1e6, "latency_p99_ms": latency.percentile(99) / 1e6,
+                "first_row_p50_ms": first_row.percentile(50) / 1e6, "first_row_p99_ms": first_row.percentile(99) / 1e6,
+            }
+            points.append(point)
+            print(f"     {length:>9}s {point['rows_mean']:>10.1f} {point['latency_p50_ms']:>10.3f} "
+                  f"{point['latency_p99_ms']:>10.3f} {point['first_row_p50_ms']:>14.3f}")
+        scoped = [p for p in points if p["scope"] == scope]
+        results[f'{prefix}_{scope}_points'] = float(len(scoped))
+        results[f'{prefix}_{scope}_full_p50_ms'] = scoped[-1]["latency_p50_ms"]
+        results[f'{prefix}_{scope}_full_rows'] = scoped[-1]["rows_mean"]
+    write_sweep(points)
+    return points
+
+
+def write_sweep(points, **tags):
+    """Courbe latence / lignes renvoyées, via le sink de métriques"""
+    from influxdb_client import Point, WritePrecision
+    import metrics
+
+    tags = {"scenario": get_tag("scenario"), "database": get_tag("database"), **tags}
+    batch = []
+    for values in points:
+        # Un horodatage par point: sinon le lot entier partage le même instant
+        point = Point(SWEEP_MEASUREMENT).time(values["time"], WritePrecision.NS).tag("scope", values["scope"])
+        for key, value in tags.items():
+            if value is not None:
+                point.tag(key, value)
+        for key, value in values.items():
+            if key not in ("time", "scope"):
+                point.field(key, float(value))
+        batch.append(point)
+    if batch:
+        metrics.write(batch)
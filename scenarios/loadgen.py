@@ -0,0 +1,192 @@
+"""
+Générateur de charge en boucle ouverte (open loop).
+
+En boucle fermée, un thread n'envoie l'opération suivante qu'après la
+réponse à la précédente: quand le serveur cale, la charge envoyée baisse et
+les latences sont sous-estimées (coordinated omission). Ici les opérations
+suivent un planning d'arrivées fixé à l'avance (débit constant ou Poisson) et
+la latence est mesurée depuis l'instant PRÉVU de chaque opération.
+
+Usage:
+    schedule = arrival_schedule(rate=1000, num_ops=5000, arrivals="poisson", seed=42)
+    with Phase(results, "rate_1000", len(schedule)) as phase:
+        service = run_open_loop(lambda i: backend.get(NS, keys[i]), schedule, phase, workers=64)
+    # phase: temps de réponse (attente + service), service: temps de service seul
+
+run_in_processes() répartit la charge sur plusieurs processus (hors GIL),
+chacun avec ses propres connexions; compteurs et histogrammes reviennent
+au parent par pipe et sont fusionnés dans une Phase.
+"""
+import itertools
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import BrokenBarrierError
+
+import backends
+from harness import Phase, READY_TIMEOUT
+from histogram import HistogramRecorder
+
+ARRIVALS = ("constant", "poisson")
+FD_MARGIN = 256  # Descripteurs gardés pour le reste du processus (pools synchrones, fichiers)
+
+
+def arrival_schedule(rate, num_ops, arrivals="poisson", seed=None):
+    """Instants d'arrivée prévus (s, relatifs au départ) pour un débit cible en ops/s"""
+    if arrivals == "constant":
+        interval = 1.0 / rate
+        return [i * interval for i in range(num_ops)]
+    if arrivals == "poisson":
+        rng = random.Random(seed)
+        schedule = []
+        t = 0.0
+        for _ in range(num_ops):
+            schedule.append(t)
+            t += rng.expovariate(rate)
+        return schedule
+    raise ValueError(f"Arrivées inconnues: {arrivals} (attendu: {', '.join(ARRIVALS)})")
+
+
+def run_open_loop(op, schedule, phase, workers=64):
+    """
+    Exécute op(i) à l'instant schedule[i] avec un pool de `workers` threads.
+    La latence enregistrée dans phase part de l'instant prévu: si tous les
+    workers sont occupés, le retard pris s'ajoute aux opérations suivantes.
+    Retourne l'histogramme du temps de service (début réel -> fin).
+    """
+    service = HistogramRecorder()
+    record = phase.record
+    counter = itertools.count()  # next() atomique sous le GIL
+    clock = time.perf_counter_ns
+    planned = [int(t * 1e9) for t in schedule]
+    num_ops = len(planned)
+    start = clock()
+
+    def worker():
+        while True:
+            i = next(counter)
+            if i >= num_ops:
+                return
+            intended = start + planned[i]
+            wait = intended - clock()
+            if wait > 0:
+                time.sleep(wait / 1e9)
+            begin = clock()
+            op(i)
+            end = clock()
+            record(end - intended)
+            service.record(end - begin)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(worker) for _ in range(workers)]
+        for f in futures:
+            f.result()
+    return service.merged()
+
+
+def raise_fd_limit(connections):
+    """
+    Relève RLIMIT_NOFILE (soft, jusqu'au hard) pour ouvrir `connections` sockets
+    de plus. NotSupportedError si le plafond hard ne suffit pas (ulimit -Hn).
+    """
+    try:
+        import resource
+    except ImportError:
+        return  # Windows: pas de RLIMIT_NOFILE
+    needed = connections + FD_MARGIN
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY or soft >= needed:
+        return
+    if hard != resource.RLIM_INFINITY and hard < needed:
+        raise backends.NotSupportedError(
+            f"{connections} connexions demandent {needed} descripteurs, ulimit -Hn = {hard} "
+            f"(relever la limite ou réduire ASYNC_CONCURRENCY / BENCH_ASYNC_POOL_SIZE)")
+    resource.setrlimit(resource.RLIMIT_NOFILE, (needed, hard))
+
+
+# ============================================
+# CHARGE MULTI-PROCESSUS
+# ============================================
+def _process_main(target, args, stand_ins, cpu, barrier, conn):
+    """Point d'entrée d'un processus fils: envoie (True, résultat) ou (False, erreur)"""
+    try:
+        if stand_ins:
+            backends.use_stand_ins()
+        if cpu is not None:
+            os.sched_setaffinity(0, {cpu})
+
+        def ready():
+            # 1er passage: connecté; 2e: départ commun donné par le parent
+            barrier.wait()
+            barrier.wait()
+
+        conn.send((True, target(*args, ready=ready)))
+    except BaseException as e:
+        barrier.abort()
+        conn.send((False, f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def _first_error(conns):
+    for conn in conns:
+        try:
+            if conn.poll(1):
+                ok, value = conn.recv()
+                if not ok:
+                    return value
+        except (EOFError, OSError):
+            continue
+    return None
+
+
+def run_in_processes(target, args_list, results, name, pin_cpus=False, timeout=READY_TIMEOUT):
+    """
+    Lance target(*args, ready=ready) dans un processus par élément de args_list.
+    target ouvre ses connexions, appelle ready(), fait sa charge et retourne
+    (nb_ops, LatencyHistogram). La Phase `name` ne couvre que la charge: elle
+    démarre quand tous les processus sont connectés. pin_cpus fixe chaque
+    processus sur un CPU (Linux). Retourne le nombre total d'opérations.
+    """
+    ctx = multiprocessing.get_context("spawn")  # Aucun socket hérité du parent
+    barrier = ctx.Barrier(len(args_list) + 1, timeout=timeout)
+    cpus = sorted(os.sched_getaffinity(0)) if pin_cpus and hasattr(os, "sched_setaffinity") else None
+    procs, conns = [], []
+    try:
+        for i, args in enumerate(args_list):
+            parent_conn, child_conn = ctx.Pipe(duplex=False)
+            cpu = cpus[i % len(cpus)] if cpus else None
+            proc = ctx.Process(
+                target=_process_main,
+                args=(target, args, backends.stand_ins_enabled(), cpu, barrier, child_conn),
+                daemon=True
+            )
+            proc.start()
+            child_conn.close()
+            procs.append(proc)
+            conns.append(parent_conn)
+
+        try:
+            barrier.wait()
+        except BrokenBarrierError:
+            raise RuntimeError(_first_error(conns) or "processus non prêts")
+
+        with Phase(results, name) as phase:
+            barrier.wait()
+            outcomes = [conn.recv() for conn in conns]
+            errors = [value for ok, value in outcomes if not ok]
+            if errors:
+                raise RuntimeError(errors[0])
+            total_ops = 0
+            for ops, hist in (value for _, value in outcomes):
+                phase.merge(hist)
+                total_ops += ops
+            phase.ops = total_ops
+        return total_ops
+    finally:
+        for proc in procs:
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.terminate()
@@ -0,0 +1,277 @@
+"""
+Écriture des résultats vers InfluxDB, asynchrone et tolérante aux pannes.
+
+write() ne fait qu'un put_nowait dans une file bornée (quelques µs, utilisable
+dans une boucle chronométrée). Un thread de fond sérialise les Points en line
+protocol, les regroupe par lots et les envoie compressés (gzip) à InfluxDB.
+Si InfluxDB est absent ou lent, les lots (et les points qui débordent de la
+file) sont ajoutés à un fichier de spill local, rejoué plus tard:
+
+    python scenarios/metrics.py --replay     # ou: influx write -b bench -f results/metrics_spill.lp
+
+Un seul client par processus: les scénarios lancés par run_all_benchmarks.py
+partagent le même écrivain.
+
+Usage:
+    import metrics
+    metrics.write(Point("scenario1_crud").tag("database", "Redis").field("latency_ms", 0.2))
+    metrics.close()
+"""
+import argparse
+import atexit
+import os
+import queue
+import shutil
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ---------------- INFLUXDB CONFIG ----------------
+INFLUX_URL = os.getenv("INFLUX_URL", "http://localhost:8086")
+INFLUX_TOKEN = os.getenv("INFLUX_TOKEN")
+INFLUX_ORG = os.getenv("INFLUX_ORG", "ensa")
+INFLUX_BUCKET = os.getenv("INFLUX_BUCKET", "bench")
+INFLUX_TIMEOUT_MS = int(os.getenv("INFLUX_TIMEOUT_MS", "10000"))
+
+# ---------------- SINK CONFIG ----------------
+QUEUE_SIZE = int(os.getenv("METRICS_QUEUE_SIZE", "100000"))  # Points en attente max
+BATCH_SIZE = int(os.getenv("METRICS_BATCH_SIZE", "5000"))    # Lignes par requête HTTP
+FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1.0"))  # s avant envoi d'un lot partiel
+RETRY_INTERVAL = float(os.getenv("METRICS_RETRY_INTERVAL", "30.0"))  # s sans essai après un échec
+SPILL_PATH = os.getenv("METRICS_SPILL_PATH", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "results", "metrics_spill.lp"))
+
+_STOP = object()
+
+
+def to_lines(record, default_time_ns):
+    """Line protocol d'un Point, d'une ligne ou d'une liste; horodate les Points sans temps"""
+    if isinstance(record, (list, tuple)):
+        lines = []
+        for item in record:
+            lines.extend(to_lines(item, default_time_ns))
+        return lines
+    if isinstance(record, bytes):
+        record = record.decode()
+    if isinstance(record, str):
+        return [line for line in record.splitlines() if line]
+    if getattr(record, "_time", None) is None:
+        # Horodaté à l'émission, pas à l'envoi (différé ou rejoué)
+        from influxdb_client import WritePrecision
+        record.time(default_time_ns, WritePrecision.NS)
+    line = record.to_line_protocol()
+    return [line] if line else []
+
+
+class MetricsSink:
+    """File bornée + thread d'envoi par lots + fichier de spill"""
+
+    def __init__(self, url=INFLUX_URL, token=INFLUX_TOKEN, org=INFLUX_ORG, bucket=INFLUX_BUCKET,
+                 spill_path=SPILL_PATH, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL):
+        self.url, self.token, self.org, self.bucket = url, token, org, bucket
+        self.spill_path = spill_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stats = {"written": 0, "spilled": 0, "failures": 0}
+        self._client = None
+        self._write_api = None
+        self._retry_at = 0.0
+        self._spill_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="metrics-sink", daemon=True)
+        self._thread.start()
+
+    # ---------------- CHEMIN CHAUD ----------------
+
+    def write(self, record):
+        """Met en file sans bloquer; si la file est pleine, le point part au spill"""
+        now = time.time_ns()
+        try:
+            self.queue.put_nowait((record, now))
+        except queue.Full:
+            self._spill(to_lines(record, now))
+
+    # ---------------- THREAD DE FOND ----------------
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self.queue.get(timeout=max(deadline - time.monotonic(), 0.0))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._flush(batch)
+                return
+            if item is not None:
+                try:
+                    batch.extend(to_lines(*item))
+                except Exception as e:
+                    print(f"  ⚠️  Point ignoré (line protocol invalide): {e}")
+            if len(batch) >= self.batch_size or (batch and time.monotonic() >= deadline):
+                self._flush(batch)
+                batch = []
+            if item is None or not batch:
+                deadline = time.monotonic() + self.flush_interval
+
+    def _connect(self):
+        if self._write_api is None:
+            from influxdb_client import InfluxDBClient
+            from influxdb_client.client.write_api import SYNCHRONOUS
+            self._client = InfluxDBClient(url=self.url, token=self.token, org=self.org,
+                                          timeout=INFLUX_TIMEOUT_MS, enable_gzip=True)
+            self._write_api = self._client.write_api(write_options=SYNCHRONOUS)
+        return self._write_api
+
+    def send(self, lines):
+        """Envoi synchrone (gzip) d'un lot de lignes; lève une exception en cas d'échec"""
+        for start in range(0, len(lines), self.batch_size):
+            self._connect().write(bucket=self.bucket, org=self.org,
+                                  record=lines[start:start + self.batch_size])
+
+    def _flush(self, lines):
+        if not lines:
+            return
+        if time.monotonic() >= self._retry_at:
+            try:
+                self.send(lines)
+                self.stats["written"] += len(lines)
+                return
+            except Exception as e:
+                self.stats["failures"] += 1
+                self._retry_at = time.monotonic() + RETRY_INTERVAL
+                print(f"  ⚠️  InfluxDB indisponible ({type(e).__name__}), spill vers {self.spill_path}")
+        self._spill(lines)
+
+    def _spill(self, lines):
+        """Ajout en fin de fichier (append-only), une ligne de line protocol par point"""
+        if not lines:
+            return
+        with self._spill_lock:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            self.stats["spilled"] += len(lines)
+
+    def close(self, timeout=30.0):
+        """Vide la file (envoi ou spill) puis ferme le client"""
+        if self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join(timeout)
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            self._write_api = None
+        if self.stats["spilled"]:
+            print(f"  💾 {self.stats['spilled']} points en spill: python scenarios/metrics.py --replay")
+
+
+_sink = None
+_lock = threading.Lock()
+_default_tags = {}
+
+
+def set_default_tags(**tags):
+    """Étiquettes ajoutées aux Points écrits ensuite, sauf s'ils les portent déjà (ex: indexes=none)"""
+    _default_tags.update({k: str(v) for k, v in tags.items() if v is not None})
+
+
+def _tagged(record):
+    if isinstance(record, (list, tuple)):
+        for item in record:
+            _tagged(item)
+    elif hasattr(record, "_tags"):
+        for key, value in _default_tags.items():
+            if key not in record._tags:
+                record.tag(key, value)
+    return record
+
+
+def get_sink():
+    """Sink partagé, créé à la première utilisation"""
+    global _sink
+    sink = _sink
+    if sink is not None:
+        return sink
+    with _lock:
+        if _sink is None:
+            _sink = MetricsSink()
+        return _sink
+
+
+def write(record):
+    """Envoie un Point (ou une liste de Points / lignes) vers le bucket configuré, sans bloquer"""
+    get_sink().write(_tagged(record) if _default_tags else record)
+
+
+def close():
+    """Vide la file d'écriture et ferme le client"""
+    global _sink
+    with _lock:
+        if _sink is not None:
+            _sink.close()
+        _sink = None
+
+
+atexit.register(close)
+
+
+def _recover(replaying, path):
+    """Remet en fin de spill un fichier .replay laissé par un rejeu interrompu"""
+    with open(replaying, encoding="utf-8") as src, open(path, "a", encoding="utf-8") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(replaying)
+
+
+def replay(path=SPILL_PATH, batch_size=BATCH_SIZE):
+    """
+    Rejoue le fichier de spill dans InfluxDB. Les lignes envoyées sont retirées;
+    en cas d'échec ou d'interruption (Ctrl-C), le reste est remis dans le fichier
+    avant que la copie de rejeu ne soit supprimée. Retourne le nombre de lignes envoyées.
+    """
+    replaying = path + ".replay"
+    if os.path.exists(replaying):
+        print(f"  ♻️  Rejeu précédent interrompu: {replaying} remis dans le spill")
+        _recover(replaying, path)
+    if not os.path.exists(path):
+        print(f"✅ Aucun spill à rejouer ({path})")
+        return 0
+
+    # Renommé d'abord: un benchmark en cours peut continuer d'écrire dans un nouveau spill
+    os.replace(path, replaying)
+    with open(replaying, encoding="utf-8") as f:
+        lines = [line.rstrip("\n") for line in f if line.strip()]
+
+    sink = MetricsSink(spill_path=path, batch_size=batch_size)
+    sent = 0
+    try:
+        for start in range(0, len(lines), batch_size):
+            sink.send(lines[start:start + batch_size])
+            sent = min(start + batch_size, len(lines))
+            print(f"  📤 {sent}/{len(lines)} lignes rejouées")
+    except Exception as e:
+        print(f"❌ Rejeu interrompu: {e}")
+    finally:
+        # Non envoyées (échec, KeyboardInterrupt...): remises dans le spill; .replay
+        # n'est supprimé qu'une fois tout envoyé ou re-spillé
+        sink._spill(lines[sent:])
+        sink.close()
+        os.remove(replaying)
+    print(f"✅ {sent} lignes rejouées vers {INFLUX_URL} (bucket {INFLUX_BUCKET})")
+    return sent
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sink de métriques InfluxDB")
+    parser.add_argument("--replay", action="store_true", help="Rejoue le fichier de spill dans InfluxDB")
+    parser.add_argument("--spill", default=SPILL_PATH, help="Chemin du fichier de spill")
+    args = parser.parse_args()
+    if args.replay:
+        replay(args.spill)
+    else:
+        parser.print_help()
@@ -0,0 +1,211 @@
+"""
+Échantillonneur de ressources en arrière-plan.
+
+Un thread relève à fréquence fixe (BENCH_SAMPLE_HZ, 10 Hz par défaut) le CPU
+de l'hôte, le CPU et la RSS du processus de benchmark, ses changements de
+contexte et les octets disque / réseau de l'hôte. En fin de phase:
+moyenne, pic et intégrale par ressource, et série temporelle envoyée à
+InfluxDB (mesure "resources", tags scenario/database/phase).
+
+Avec `container` (containers.ContainerCgroup), chaque relevé lit aussi le
+cgroup du conteneur de la base: CPU, mémoire de travail, disque et réseau
+côté serveur, rapportés par opération si la phase connaît son nombre d'ops.
+
+Usage:
+    sampler = ResourceSampler().start()
+    ...  # phase mesurée
+    sampler.stop()
+    results.update(sampler.fields("insert", ops))  # insert_cpu, insert_rss_peak_mb, insert_server_cpu_ms_per_op...
+    sampler.write_series(phase="insert")
+"""
+import os
+import threading
+import time
+
+import psutil
+
+SAMPLE_HZ = float(os.getenv("BENCH_SAMPLE_HZ", "10"))
+WRITE_SERIES = os.getenv("BENCH_RESOURCE_SERIES", "1") == "1"  # Série temporelle vers InfluxDB
+MEASUREMENT = "resources"
+MB = 1024 * 1024
+
+# Tags courants (scénario, base) ajoutés aux séries, fixés par harness.run_tests
+_tags = {}
+
+
+def set_tags(**tags):
+    _tags.clear()
+    _tags.update({k: str(v) for k, v in tags.items() if v is not None})
+
+
+def get_tag(key):
+    return _tags.get(key)
+
+
+class ResourceSampler:
+    """Relevés périodiques pendant une phase (thread démon, arrêté par stop())"""
+
+    def __init__(self, hz=SAMPLE_HZ, container=None):
+        self.interval = 1.0 / hz
+        self.container = container
+        self.samples = []
+        self._process = psutil.Process()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        cpu = psutil.cpu_times()
+        proc_cpu = self._process.cpu_times()
+        ctx = self._process.num_ctx_switches()
+        disk = psutil.disk_io_counters()
+        net = psutil.net_io_counters()
+        self.samples.append({
+            "t": time.perf_counter(),
+            "ts": time.time_ns(),
+            "host_total": sum(cpu),
+            "host_idle": cpu.idle + getattr(cpu, "iowait", 0.0),
+            "client_cpu": proc_cpu.user + proc_cpu.system,
+            "rss": self._process.memory_info().rss,
+            "mem": psutil.virtual_memory().percent,
+            "ctx": ctx.voluntary + ctx.involuntary,
+            "disk_read": disk.read_bytes if disk else 0,
+            "disk_write": disk.write_bytes if disk else 0,
+            "net_sent": net.bytes_sent,
+            "net_recv": net.bytes_recv,
+            "server": self.container.read() if self.container else None,
+        })
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sample()
+        return self
+
+    # ---------------- AGREGATS ----------------
+
+    def intervals(self):
+        """Taux par intervalle entre deux relevés consécutifs"""
+        rates = []
+        for prev, cur in zip(self.samples, self.samples[1:]):
+            dt = cur["t"] - prev["t"]
+            total = cur["host_total"] - prev["host_total"]
+            if dt <= 0:
+                continue
+            idle = cur["host_idle"] - prev["host_idle"]
+            rates.append({
+                "ts": cur["ts"],
+                "cpu_percent": 100.0 * (1 - idle / total) if total > 0 else 0.0,
+                "client_cpu_percent": 100.0 * (cur["client_cpu"] - prev["client_cpu"]) / dt,
+                "rss_mb": cur["rss"] / MB,
+                "memory_percent": cur["mem"],
+                "ctx_switches_per_s": (cur["ctx"] - prev["ctx"]) / dt,
+                "disk_read_mbps": (cur["disk_read"] - prev["disk_read"]) / MB / dt,
+                "disk_write_mbps": (cur["disk_write"] - prev["disk_write"]) / MB / dt,
+                "net_sent_mbps": (cur["net_sent"] - prev["net_sent"]) / MB / dt,
+                "net_recv_mbps": (cur["net_recv"] - prev["net_recv"]) / MB / dt,
+            })
+            if self.container:
+                server, last = cur["server"], prev["server"]
+                rates[-1].update({
+                    "server_cpu_percent": 100.0 * (server["cpu_ns"] - last["cpu_ns"]) / 1e9 / dt,
+                    "server_mem_mb": server["mem"] / MB,
+                    "server_disk_read_mbps": (server["blk_read"] - last["blk_read"]) / MB / dt,
+                    "server_disk_write_mbps": (server["blk_write"] - last["blk_write"]) / MB / dt,
+                    "server_net_sent_mbps": (server["net_sent"] - last["net_sent"]) / MB / dt,
+                    "server_net_recv_mbps": (server["net_recv"] - last["net_recv"]) / MB / dt,
+                })
+        return rates
+
+    def fields(self, prefix, ops=None):
+        """
+        Champs par phase: {prefix}_cpu (CPU hôte moyen, %), _cpu_peak,
+        _client_cpu (processus de benchmark, % d'un cœur), _client_cpu_peak,
+        _client_cpu_s (intégrale), _mem (RAM hôte moyenne, %), _rss_mb,
+        _rss_peak_mb, _ctx_switches, _disk_read_mb, _disk_write_mb,
+        _net_sent_mb, _net_recv_mb (intégrales), et _server_* si conteneur
+        """
+        first, last = self.samples[0], self.samples[-1]
+        elapsed = last["t"] - first["t"]
+        total = last["host_total"] - first["host_total"]
+        idle = last["host_idle"] - first["host_idle"]
+        client_cpu_s = last["client_cpu"] - first["client_cpu"]
+        rates = self.intervals()
+
+        def peak(key, default):
+            return max((r[key] for r in rates), default=default)
+
+        cpu = 100.0 * (1 - idle / total) if total > 0 else 0.0
+        client_cpu = 100.0 * client_cpu_s / elapsed if elapsed > 0 else 0.0
+        fields = {
+            f'{prefix}_cpu': cpu,
+            f'{prefix}_cpu_peak': peak("cpu_percent", cpu),
+            f'{prefix}_client_cpu': client_cpu,
+            f'{prefix}_client_cpu_peak': peak("client_cpu_percent", client_cpu),
+            f'{prefix}_client_cpu_s': client_cpu_s,
+            f'{prefix}_mem': sum(s["mem"] for s in self.samples) / len(self.samples),
+            f'{prefix}_rss_mb': sum(s["rss"] for s in self.samples) / len(self.samples) / MB,
+            f'{prefix}_rss_peak_mb': max(s["rss"] for s in self.samples) / MB,
+            f'{prefix}_ctx_switches': float(last["ctx"] - first["ctx"]),
+            f'{prefix}_disk_read_mb': (last["disk_read"] - first["disk_read"]) / MB,
+            f'{prefix}_disk_write_mb': (last["disk_write"] - first["disk_write"]) / MB,
+            f'{prefix}_net_sent_mb': (last["net_sent"] - first["net_sent"]) / MB,
+            f'{prefix}_net_recv_mb': (last["net_recv"] - first["net_recv"]) / MB,
+        }
+        if self.container:
+            fields.update(self.server_fields(prefix, ops))
+        return fields
+
+    def server_fields(self, prefix, ops=None):
+        """
+        Coût côté serveur (cgroup du conteneur): {prefix}_server_cpu_ms,
+        _server_cpu (% d'un cœur), _server_mem_mb, _server_mem_peak_mb,
+        _server_disk_read_mb, _server_disk_write_mb, _server_net_sent_mb,
+        _server_net_recv_mb; avec ops: _server_cpu_ms_per_op, _server_write_bytes_per_op
+        """
+        first, last = self.samples[0]["server"], self.samples[-1]["server"]
+        elapsed = self.samples[-1]["t"] - self.samples[0]["t"]
+        cpu_ms = (last["cpu_ns"] - first["cpu_ns"]) / 1e6
+        written = last["blk_write"] - first["blk_write"]
+        fields = {
+            f'{prefix}_server_cpu_ms': cpu_ms,
+            f'{prefix}_server_cpu': 100.0 * cpu_ms / 1000 / elapsed if elapsed > 0 else 0.0,
+            f'{prefix}_server_mem_mb': sum(s["server"]["mem"] for s in self.samples) / len(self.samples) / MB,
+            f'{prefix}_server_mem_peak_mb': max(s["server"]["mem"] for s in self.samples) / MB,
+            f'{prefix}_server_disk_read_mb': (last["blk_read"] - first["blk_read"]) / MB,
+            f'{prefix}_server_disk_write_mb': written / MB,
+            f'{prefix}_server_net_sent_mb': (last["net_sent"] - first["net_sent"]) / MB,
+            f'{prefix}_server_net_recv_mb': (last["net_recv"] - first["net_recv"]) / MB,
+        }
+        if ops:
+            fields[f'{prefix}_server_cpu_ms_per_op'] = cpu_ms / ops
+            fields[f'{prefix}_server_write_bytes_per_op'] = written / ops
+        return fields
+
+    def write_series(self, **tags):
+        """Envoie la série (un point par intervalle) via le sink de métriques"""
+        if not WRITE_SERIES:
+            return
+        from influxdb_client import Point, WritePrecision
+        import metrics
+
+        points = []
+        for rate in self.intervals():
+            point = Point(MEASUREMENT).time(rate.pop("ts"), WritePrecision.NS)
+            for key, value in {**_tags, **tags}.items():
+                point.tag(key, value)
+            for key, value in rate.items():
+                point.field(key, float(value))
+            points.append(point)
+        if points:
+            metrics.write(points)
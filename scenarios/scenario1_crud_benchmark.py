@@ -1,436 +1,114 @@
-import time
-import psutil
-from influxdb_client import InfluxDBClient, Point, WritePrecision
-from pymongo import MongoClient
-import redis
-from neo4j import GraphDatabase
-from dotenv import load_dotenv
-import os
+from influxdb_client import Point
+import numpy as np
+
+import metrics
+from backends import get_backend
+from datagen import ColumnBatch, with_ids
+from datasets import declare
+from harness import Phase, run_tests, run_label, ADAPTIVE, MAX_OPS
+from schema import Index, Schema
 
 import warnings
 warnings.filterwarnings('ignore')
 
-load_dotenv()
-
-# ---------------- INFLUXDB CONFIG ----------------
-INFLUX_URL = os.getenv("INFLUX_URL")
-INFLUX_TOKEN = os.getenv("INFLUX_TOKEN")
-INFLUX_ORG = os.getenv("INFLUX_ORG")
-INFLUX_BUCKET = os.getenv("INFLUX_BUCKET")
-
-client_influx = InfluxDBClient(
-    url=INFLUX_URL,
-    token=INFLUX_TOKEN,
-    org=INFLUX_ORG
-)
-
-write_api = client_influx.write_api()
-
 # ---------------- NOMBRE D'OPERATIONS ----------------
 NUM_OPS = 100 # 100k opérations pour chaque test
 
 # ---------------- DONNEES DE TEST ----------------
-def get_test_data(user_id):
-    """Génère un document de test"""
-    return {
-        "user_id": user_id,
-        "name": f"Test User {user_id}",
-        "age": 25 + (user_id % 50),
-        "city": "Paris"
-    }
+NAMESPACE = "users_crud"
+USER_FIELDS = {"user_id": int, "name": str, "age": int, "city": str}
+
+def user_columns(ids, seed):
+    """Colonnes des documents de test (user_id, name, age, city)"""
+    return ColumnBatch({
+        "user_id": ids,
+        "name": with_ids("Test User ", ids),
+        "age": 25 + ids % 50,
+        "city": np.full(len(ids), "Paris")
+    })
+
+# READ/UPDATE/DELETE cherchent par user_id: index unique (Cassandra, Redis: clé primaire)
+SCHEMA = Schema({NAMESPACE: [Index(("user_id",), "unique")]}, probes={NAMESPACE: {"user_id": 0}})
+
+# Pré-généré sur disque (datasets.py), lu par mmap; ids négatifs (échauffement) générés à la volée
+USERS = declare("users_crud", user_columns, max(NUM_OPS, MAX_OPS) if ADAPTIVE else NUM_OPS)
 
 # ============================================
-# MONGODB CRUD TESTS
+# CRUD GENERIQUE (interface commune des backends)
 # ============================================
-def test_mongodb_crud():
-    print("\n🔵 Testing MongoDB CRUD...")
-    mongo = MongoClient("mongodb://localhost:27017")
-    db = mongo.testdb
-    collection = db.users_crud
-    
-    # Nettoyer la collection
-    collection.drop()
+def run_crud(db_name):
+    """Exécute INSERT/READ/UPDATE/DELETE sur un backend via l'interface commune"""
+    backend = get_backend(db_name)
+    backend.reset(NAMESPACE, key="user_id", fields=USER_FIELDS)
     
+    # Documents générés hors chrono (Phase.run: arguments préparés avant chaque appel).
+    # Nombre d'ops fixe (NUM_OPS) ou adaptatif selon la précision visée (BENCH_ADAPTIVE)
     results = {}
+    SCHEMA.provision(backend, NAMESPACE, results, "before")
     
-    # 1️⃣ INSERT
-    print(f"  📝 INSERT {NUM_OPS} documents...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    mem_start = psutil.virtual_memory().percent
+    # Échauffement: documents d'ids négatifs, hors des documents mesurés
+    def warmup_insert(i):
+        backend.put(NAMESPACE, -1 - i, USERS[-1 - i])
     
-    docs = [get_test_data(i) for i in range(NUM_OPS)]
-    collection.insert_many(docs)
+    # 1️⃣ INSERT
+    print(f"  📝 INSERT {run_label(NUM_OPS)} records...")
+    with Phase(results, 'insert', NUM_OPS, warmup=warmup_insert) as phase:
+        inserted = phase.run(backend.put, lambda i: (NAMESPACE, i, USERS[i]))
+    SCHEMA.provision(backend, NAMESPACE, results, "after")
     
-    insert_time = time.time() - start
-    cpu_used = psutil.cpu_percent() - cpu_start
-    mem_used = psutil.virtual_memory().percent - mem_start
+    # Échauffements suivants sur les documents d'échauffement insérés (ids -1..-warmed),
+    # en boucle: jamais sur les clés mesurées, jamais sur des clés absentes
+    warmed = int(results.get('insert_warmup_ops', 0))
     
-    results['insert_time'] = insert_time
-    results['insert_latency'] = insert_time / NUM_OPS
-    results['insert_cpu'] = cpu_used
-    results['insert_mem'] = mem_used
-    print(f"     ✅ Done in {insert_time:.2f}s (avg: {results['insert_latency']*1000:.4f}ms)")
+    def warmup_on(op):
+        return (lambda i: op(-1 - i % warmed)) if warmed else None
     
     # 2️⃣ READ
-    print(f"  📖 READ {NUM_OPS} documents...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    mem_start = psutil.virtual_memory().percent
-    
-    for i in range(NUM_OPS):
-        collection.find_one({"user_id": i})
-    
-    read_time = time.time() - start
-    cpu_used = psutil.cpu_percent() - cpu_start
-    mem_used = psutil.virtual_memory().percent - mem_start
-    
-    results['read_time'] = read_time
-    results['read_latency'] = read_time / NUM_OPS
-    results['read_cpu'] = cpu_used
-    results['read_mem'] = mem_used
-    print(f"     ✅ Done in {read_time:.2f}s (avg: {results['read_latency']*1000:.4f}ms)")
+    print(f"  📖 READ {run_label(NUM_OPS)} records...")
+    with Phase(results, 'read', NUM_OPS, warmup=warmup_on(lambda key: backend.get(NAMESPACE, key))) as phase:
+        phase.run(backend.get, lambda i: (NAMESPACE, i % inserted))
     
     # 3️⃣ UPDATE
-    print(f"  🔄 UPDATE {NUM_OPS} documents...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    mem_start = psutil.virtual_memory().percent
-    
-    for i in range(NUM_OPS):
-        collection.update_one({"user_id": i}, {"$set": {"age": 30}})
-    
-    update_time = time.time() - start
-    cpu_used = psutil.cpu_percent() - cpu_start
-    mem_used = psutil.virtual_memory().percent - mem_start
-    
-    results['update_time'] = update_time
-    results['update_latency'] = update_time / NUM_OPS
-    results['update_cpu'] = cpu_used
-    results['update_mem'] = mem_used
-    print(f"     ✅ Done in {update_time:.2f}s (avg: {results['update_latency']*1000:.4f}ms)")
+    print(f"  🔄 UPDATE {run_label(NUM_OPS)} records...")
+    with Phase(results, 'update', NUM_OPS,
+               warmup=warmup_on(lambda key: backend.update(NAMESPACE, key, {"age": 30}))) as phase:
+        phase.run(backend.update, lambda i: (NAMESPACE, i % inserted, {"age": 30}))
     
-    # 4️⃣ DELETE
-    print(f"  🗑️  DELETE {NUM_OPS} documents...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    mem_start = psutil.virtual_memory().percent
+    # 4️⃣ DELETE (au plus les documents insérés); échauffement: chaque document d'échauffement une fois
+    print(f"  🗑️  DELETE {run_label(NUM_OPS)} records...")
+    with Phase(results, 'delete', NUM_OPS, warmup=warmup_on(lambda key: backend.delete(NAMESPACE, key)),
+               warmup_ops=warmed) as phase:
+        phase.run(backend.delete, lambda i: (NAMESPACE, i), limit=inserted)
     
-    for i in range(NUM_OPS):
-        collection.delete_one({"user_id": i})
-    
-    delete_time = time.time() - start
-    cpu_used = psutil.cpu_percent() - cpu_start
-    mem_used = psutil.virtual_memory().percent - mem_start
-    
-    results['delete_time'] = delete_time
-    results['delete_latency'] = delete_time / NUM_OPS
-    results['delete_cpu'] = cpu_used
-    results['delete_mem'] = mem_used
-    print(f"     ✅ Done in {delete_time:.2f}s (avg: {results['delete_latency']*1000:.4f}ms)")
-    
-    mongo.close()
     return results
 
-# ============================================
-# REDIS CRUD TESTS
-# ============================================
+def test_mongodb_crud():
+    print("\n🔵 Testing MongoDB CRUD...")
+    return run_crud("MongoDB")
+
 def test_redis_crud():
     print("\n🔴 Testing Redis CRUD...")
-    r = redis.Redis(host="localhost", port=6379, decode_responses=True)
-    
-    # Nettoyer
-    r.flushdb()
-    
-    results = {}
-    
-    # 1️⃣ INSERT (SET)
-    print(f"  📝 INSERT {NUM_OPS} keys...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    mem_start = psutil.virtual_memory().percent
-    
-    for i in range(NUM_OPS):
-        data = get_test_data(i)
-        r.hset(f"user:{i}", mapping=data)
-    
-    insert_time = time.time() - start
-    cpu_used = psutil.cpu_percent() - cpu_start
-    mem_used = psutil.virtual_memory().percent - mem_start
-    
-    results['insert_time'] = insert_time
-    results['insert_latency'] = insert_time / NUM_OPS
-    results['insert_cpu'] = cpu_used
-    results['insert_mem'] = mem_used
-    print(f"     ✅ Done in {insert_time:.2f}s (avg: {results['insert_latency']*1000:.4f}ms)")
-    
-    # 2️⃣ READ (GET)
-    print(f"  📖 READ {NUM_OPS} keys...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    mem_start = psutil.virtual_memory().percent
-    
-    for i in range(NUM_OPS):
-        r.hgetall(f"user:{i}")
-    
-    read_time = time.time() - start
-    cpu_used = psutil.cpu_percent() - cpu_start
-    mem_used = psutil.virtual_memory().percent - mem_start
-    
-    results['read_time'] = read_time
-    results['read_latency'] = read_time / NUM_OPS
-    results['read_cpu'] = cpu_used
-    results['read_mem'] = mem_used
-    print(f"     ✅ Done in {read_time:.2f}s (avg: {results['read_latency']*1000:.4f}ms)")
-    
-    # 3️⃣ UPDATE
-    print(f"  🔄 UPDATE {NUM_OPS} keys...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    mem_start = psutil.virtual_memory().percent
-    
-    for i in range(NUM_OPS):
-        r.hset(f"user:{i}", "age", 30)
-    
-    update_time = time.time() - start
-    cpu_used = psutil.cpu_percent() - cpu_start
-    mem_used = psutil.virtual_memory().percent - mem_start
-    
-    results['update_time'] = update_time
-    results['update_latency'] = update_time / NUM_OPS
-    results['update_cpu'] = cpu_used
-    results['update_mem'] = mem_used
-    print(f"     ✅ Done in {update_time:.2f}s (avg: {results['update_latency']*1000:.4f}ms)")
-    
-    # 4️⃣ DELETE
-    print(f"  🗑️  DELETE {NUM_OPS} keys...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    mem_start = psutil.virtual_memory().percent
-    
-    for i in range(NUM_OPS):
-        r.delete(f"user:{i}")
-    
-    delete_time = time.time() - start
-    cpu_used = psutil.cpu_percent() - cpu_start
-    mem_used = psutil.virtual_memory().percent - mem_start
-    
-    results['delete_time'] = delete_time
-    results['delete_latency'] = delete_time / NUM_OPS
-    results['delete_cpu'] = cpu_used
-    results['delete_mem'] = mem_used
-    print(f"     ✅ Done in {delete_time:.2f}s (avg: {results['delete_latency']*1000:.4f}ms)")
-    
-    return results
+    return run_crud("Redis")
 
-# ============================================
-# CASSANDRA CRUD TESTS (Version simplifiée sans driver Python)
-# ============================================
 def test_cassandra_crud():
     print("\n🟣 Testing Cassandra CRUD...")
-    print("  ⚠️  Cassandra nécessite une configuration spéciale pour Python 3.12+")
-    print("  ℹ️  Cassandra sera testé via docker exec pour ce scénario")
-    
-    import subprocess
-    results = {}
-    
-    # Fonction helper pour exécuter CQL via docker
-    def run_cql(query):
-        cmd = f'docker exec cassandra cqlsh -e "{query}"'
-        try:
-            result = subprocess.run(cmd, shell=True, capture_output=True, timeout=10)
-            return result.returncode == 0
-        except:
-            return False
-    
-    # Setup keyspace et table
-    print("  ⚙️  Configuration du keyspace et table...")
-    run_cql("CREATE KEYSPACE IF NOT EXISTS testks WITH replication = {'class': 'SimpleStrategy', 'replication_factor': 1}")
-    run_cql("CREATE TABLE IF NOT EXISTS testks.users (user_id int PRIMARY KEY, name text, age int, city text)")
-    run_cql("TRUNCATE testks.users")
-    
-    # 1️⃣ INSERT
-    print(f"  📝 INSERT {NUM_OPS} rows...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    mem_start = psutil.virtual_memory().percent
-    
-    for i in range(NUM_OPS):
-        data = get_test_data(i)
-        query = f"INSERT INTO testks.users (user_id, name, age, city) VALUES ({data['user_id']}, '{data['name']}', {data['age']}, '{data['city']}')"
-        run_cql(query)
-    
-    insert_time = time.time() - start
-    cpu_used = psutil.cpu_percent() - cpu_start
-    mem_used = psutil.virtual_memory().percent - mem_start
-    
-    results['insert_time'] = insert_time
-    results['insert_latency'] = insert_time / NUM_OPS
-    results['insert_cpu'] = cpu_used
-    results['insert_mem'] = mem_used
-    print(f"     ✅ Done in {insert_time:.2f}s (avg: {results['insert_latency']*1000:.4f}ms)")
-    
-    # 2️⃣ READ
-    print(f"  📖 READ {NUM_OPS} rows...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    mem_start = psutil.virtual_memory().percent
-    
-    for i in range(NUM_OPS):
-        query = f"SELECT * FROM testks.users WHERE user_id = {i}"
-        run_cql(query)
-    
-    read_time = time.time() - start
-    cpu_used = psutil.cpu_percent() - cpu_start
-    mem_used = psutil.virtual_memory().percent - mem_start
-    
-    results['read_time'] = read_time
-    results['read_latency'] = read_time / NUM_OPS
-    results['read_cpu'] = cpu_used
-    results['read_mem'] = mem_used
-    print(f"     ✅ Done in {read_time:.2f}s (avg: {results['read_latency']*1000:.4f}ms)")
-    
-    # 3️⃣ UPDATE
-    print(f"  🔄 UPDATE {NUM_OPS} rows...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    mem_start = psutil.virtual_memory().percent
-    
-    for i in range(NUM_OPS):
-        query = f"UPDATE testks.users SET age = 30 WHERE user_id = {i}"
-        run_cql(query)
-    
-    update_time = time.time() - start
-    cpu_used = psutil.cpu_percent() - cpu_start
-    mem_used = psutil.virtual_memory().percent - mem_start
-    
-    results['update_time'] = update_time
-    results['update_latency'] = update_time / NUM_OPS
-    results['update_cpu'] = cpu_used
-    results['update_mem'] = mem_used
-    print(f"     ✅ Done in {update_time:.2f}s (avg: {results['update_latency']*1000:.4f}ms)")
-    
-    # 4️⃣ DELETE
-    print(f"  🗑️  DELETE {NUM_OPS} rows...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    mem_start = psutil.virtual_memory().percent
-    
-    for i in range(NUM_OPS):
-        query = f"DELETE FROM testks.users WHERE user_id = {i}"
-        run_cql(query)
-    
-    delete_time = time.time() - start
-    cpu_used = psutil.cpu_percent() - cpu_start
-    mem_used = psutil.virtual_memory().percent - mem_start
-    
-    results['delete_time'] = delete_time
-    results['delete_latency'] = delete_time / NUM_OPS
-    results['delete_cpu'] = cpu_used
-    results['delete_mem'] = mem_used
-    print(f"     ✅ Done in {delete_time:.2f}s (avg: {results['delete_latency']*1000:.4f}ms)")
-    
-    return results
+    return run_crud("Cassandra")
 
-# ============================================
-# NEO4J CRUD TESTS
-# ============================================
 def test_neo4j_crud():
     print("\n🟢 Testing Neo4j CRUD...")
-    driver = GraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", "password"))
-    
-    results = {}
-    
-    with driver.session() as session:
-        # Nettoyer
-        session.run("MATCH (n:User) DELETE n")
-        
-        # 1️⃣ INSERT (CREATE)
-        print(f"  📝 INSERT {NUM_OPS} nodes...")
-        start = time.time()
-        cpu_start = psutil.cpu_percent()
-        mem_start = psutil.virtual_memory().percent
-        
-        for i in range(NUM_OPS):
-            data = get_test_data(i)
-            session.run(
-                "CREATE (u:User {user_id: $user_id, name: $name, age: $age, city: $city})",
-                **data
-            )
-        
-        insert_time = time.time() - start
-        cpu_used = psutil.cpu_percent() - cpu_start
-        mem_used = psutil.virtual_memory().percent - mem_start
-        
-        results['insert_time'] = insert_time
-        results['insert_latency'] = insert_time / NUM_OPS
-        results['insert_cpu'] = cpu_used
-        results['insert_mem'] = mem_used
-        print(f"     ✅ Done in {insert_time:.2f}s (avg: {results['insert_latency']*1000:.4f}ms)")
-        
-        # 2️⃣ READ (MATCH)
-        print(f"  📖 READ {NUM_OPS} nodes...")
-        start = time.time()
-        cpu_start = psutil.cpu_percent()
-        mem_start = psutil.virtual_memory().percent
-        
-        for i in range(NUM_OPS):
-            session.run("MATCH (u:User {user_id: $user_id}) RETURN u", user_id=i)
-        
-        read_time = time.time() - start
-        cpu_used = psutil.cpu_percent() - cpu_start
-        mem_used = psutil.virtual_memory().percent - mem_start
-        
-        results['read_time'] = read_time
-        results['read_latency'] = read_time / NUM_OPS
-        results['read_cpu'] = cpu_used
-        results['read_mem'] = mem_used
-        print(f"     ✅ Done in {read_time:.2f}s (avg: {results['read_latency']*1000:.4f}ms)")
-        
-        # 3️⃣ UPDATE (SET)
-        print(f"  🔄 UPDATE {NUM_OPS} nodes...")
-        start = time.time()
-        cpu_start = psutil.cpu_percent()
-        mem_start = psutil.virtual_memory().percent
-        
-        for i in range(NUM_OPS):
-            session.run("MATCH (u:User {user_id: $user_id}) SET u.age = 30", user_id=i)
-        
-        update_time = time.time() - start
-        cpu_used = psutil.cpu_percent() - cpu_start
-        mem_used = psutil.virtual_memory().percent - mem_start
-        
-        results['update_time'] = update_time
-        results['update_latency'] = update_time / NUM_OPS
-        results['update_cpu'] = cpu_used
-        results['update_mem'] = mem_used
-        print(f"     ✅ Done in {update_time:.2f}s (avg: {results['update_latency']*1000:.4f}ms)")
-        
-        # 4️⃣ DELETE
-        print(f"  🗑️  DELETE {NUM_OPS} nodes...")
-        start = time.time()
-        cpu_start = psutil.cpu_percent()
-        mem_start = psutil.virtual_memory().percent
-        
-        for i in range(NUM_OPS):
-            session.run("MATCH (u:User {user_id: $user_id}) DELETE u", user_id=i)
-        
-        delete_time = time.time() - start
-        cpu_used = psutil.cpu_percent() - cpu_start
-        mem_used = psutil.virtual_memory().percent - mem_start
-        
-        results['delete_time'] = delete_time
-        results['delete_latency'] = delete_time / NUM_OPS
-        results['delete_cpu'] = cpu_used
-        results['delete_mem'] = mem_used
-        print(f"     ✅ Done in {delete_time:.2f}s (avg: {results['delete_latency']*1000:.4f}ms)")
-    
-    driver.close()
-    return results
+    return run_crud("Neo4j")
 
 # ============================================
 # ENVOI DES RESULTATS VERS INFLUXDB
 # ============================================
+LATENCY_STATS = ["p50", "p95", "p99", "p999", "max", "stddev"]
+WARMUP_STATS = ["ops", "time", "p50_ms", "p99_ms"]
+PRECISION_STATS = ["precision", "precision_target", "converged"]
+RESOURCE_STATS = ["cpu_peak", "client_cpu", "client_cpu_peak", "client_cpu_s", "rss_peak_mb",
+                  "ctx_switches", "disk_write_mb", "net_sent_mb", "net_recv_mb"]
+SERVER_STATS = ["server_cpu_ms", "server_cpu", "server_mem_peak_mb", "server_disk_write_mb",
+                "server_cpu_ms_per_op", "server_write_bytes_per_op"]
+
 def send_results_to_influx(db_name, results, scenario="scenario1_crud"):
     """Envoie les résultats vers InfluxDB"""
     for operation in ['insert', 'read', 'update', 'delete']:
@@ -442,61 +120,62 @@ def send_results_to_influx(db_name, results, scenario="scenario1_crud"):
             .field("cpu_percent", results[f'{operation}_cpu']) \
             .field("memory_percent", results[f'{operation}_mem'])
         
-        write_api.write(bucket=INFLUX_BUCKET, org=INFLUX_ORG, record=point)
+        # Distribution des latences par opération (histogramme)
+        for stat in LATENCY_STATS:
+            point.field(f"{stat}_ms", results[f'{operation}_{stat}_ms'])
+        point.field("ops", results[f'{operation}_samples'])
+        
+        # Ressources échantillonnées pendant la phase
+        for stat in RESOURCE_STATS:
+            point.field(stat, results[f'{operation}_{stat}'])
+        
+        # Coût côté serveur (cgroup du conteneur, absent sans docker)
+        for stat in SERVER_STATS:
+            if f'{operation}_{stat}' in results:
+                point.field(stat, results[f'{operation}_{stat}'])
+        
+        # Précision atteinte (durée adaptative)
+        for stat in PRECISION_STATS:
+            if f'{operation}_{stat}' in results:
+                point.field(stat, results[f'{operation}_{stat}'])
+        
+        # Échauffement, rapporté à part
+        for stat in WARMUP_STATS:
+            if f'{operation}_warmup_{stat}' in results:
+                point.field(f"warmup_{stat}", results[f'{operation}_warmup_{stat}'])
+        
+        metrics.write(point)
     
     print(f"  📊 Résultats envoyés vers InfluxDB pour {db_name}")
 
 # ============================================
-# MAIN - EXECUTION DES TESTS
+# MAIN
 # ============================================
-if __name__ == "__main__":
+DB_TESTS = [
+    ("MongoDB", test_mongodb_crud),
+    ("Redis", test_redis_crud),
+    ("Cassandra", test_cassandra_crud),
+    ("Neo4j", test_neo4j_crud),
+]
+
+def run(databases=None):
+    """Exécute le scénario sur les bases sélectionnées (toutes par défaut)"""
     print("="*60)
     print("🔥 SCENARIO 1 - TESTS CRUD BASIQUES")
-    print(f"📊 Nombre d'opérations par test: {NUM_OPS}")
+    print(f"📊 Nombre d'opérations par test: {run_label(NUM_OPS)}")
     print("="*60)
     
-    try:
-        # Test MongoDB
-        try:
-            mongo_results = test_mongodb_crud()
-            send_results_to_influx("MongoDB", mongo_results)
-        except Exception as e:
-            print(f"❌ Erreur MongoDB: {e}")
-        
-        time.sleep(2)
-        
-        # Test Redis
-        try:
-            redis_results = test_redis_crud()
-            send_results_to_influx("Redis", redis_results)
-        except Exception as e:
-            print(f"❌ Erreur Redis: {e}")
-        
-        time.sleep(2)
-        
-        # Test Cassandra
-        try:
-            cassandra_results = test_cassandra_crud()
-            send_results_to_influx("Cassandra", cassandra_results)
-        except Exception as e:
-            print(f"❌ Erreur Cassandra: {e}")
-        
-        time.sleep(2)
-        
-        # Test Neo4j
-        try:
-            neo4j_results = test_neo4j_crud()
-            send_results_to_influx("Neo4j", neo4j_results)
-        except Exception as e:
-            print(f"❌ Erreur Neo4j: {e}")
-        
-        print("\n" + "="*60)
-        print("✅ TOUS LES TESTS SONT TERMINÉS !")
-        print("📊 Vérifie Grafana sur http://localhost:3000")
-        print("="*60)
+    run_tests(DB_TESTS, send_results_to_influx, databases, scenario="scenario1_crud")
     
+    print("\n" + "="*60)
+    print("✅ TOUS LES TESTS SONT TERMINÉS !")
+    print("📊 Vérifie Grafana sur http://localhost:3000")
+    print("="*60)
+
+if __name__ == "__main__":
+    try:
+        run()
     finally:
         # Fermer proprement la connexion InfluxDB
-        write_api.close()
-        client_influx.close()
-        print("🔒 Connexion InfluxDB fermée proprement")
\ No newline at end of file
+        metrics.close()
+        print("🔒 Connexion InfluxDB fermée proprement")
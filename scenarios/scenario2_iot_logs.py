@@ -1,293 +1,602 @@
 import time
-import psutil
-from influxdb_client import InfluxDBClient, Point, WritePrecision
-from pymongo import MongoClient
-import redis
-from neo4j import GraphDatabase
+from influxdb_client import Point
 from datetime import datetime, timedelta
-import random
-import subprocess
-from dotenv import load_dotenv
 import os
+import numpy as np
 
-load_dotenv()
+import metrics
+from backends import get_backend, cql_type
+from datagen import ColumnBatch, choice, timestamps, uniform, integers
+from datasets import declare
+from harness import Phase, skip_native, run_tests, QUERY_WARMUP_OPS
+from schema import Index, Schema
+from ingest import ingest, INGEST_WRITERS
+from iot_queries import (IotQueries, MongoIotQueries, RedisZsetIotQueries, CassandraIotQueries,
+                         epoch, fan_out, random_windows, run_suite, selectivity_sweep)
 
 import warnings
 warnings.filterwarnings('ignore')
 
-# ---------------- INFLUXDB CONFIG ----------------
-INFLUX_URL = os.getenv("INFLUX_URL")
-INFLUX_TOKEN = os.getenv("INFLUX_TOKEN")
-INFLUX_ORG = os.getenv("INFLUX_ORG")
-INFLUX_BUCKET = os.getenv("INFLUX_BUCKET")
-
-client_influx = InfluxDBClient(
-    url=INFLUX_URL,
-    token=INFLUX_TOKEN,
-    org=INFLUX_ORG
-)
-
-write_api = client_influx.write_api()
-
 # ---------------- CONFIGURATION ----------------
 NUM_SENSORS = 100  # Nombre de capteurs
 NUM_RECORDS = 100  # Nombre d'enregistrements (changez à 100000 ou 1000000 pour tests finaux)
-BATCH_SIZE = 1000  # Taille des batchs pour insertion
+BATCH_SIZE = 1000  # Taille de batch initiale (ajustée selon la contre-pression, voir ingest.py)
+
+# Fenêtre de la requête par intervalle
+RANGE_START = "2025-12-03 18:00:00"
+RANGE_END = "2025-12-03 19:00:00"
+
+# Index temporels Redis (liste): "zset" (sorted set par capteur, score = epoch),
+# "stream" (Redis Stream par capteur, id = epoch ms, XRANGE)
+REDIS_TIME_INDEXES = [m for m in os.getenv("REDIS_IOT_INDEXES", "zset,stream").split(",") if m]
+
+# Schémas MongoDB comparés (liste): "plain" (collection classique, ts datetime),
+# "timeseries" (collection time-series native), "bucket" (un document par capteur-heure)
+MONGO_IOT_LAYOUTS = [m for m in os.getenv("MONGO_IOT_LAYOUTS", "plain,timeseries,bucket").split(",") if m]
+MONGO_TS_GRANULARITY = os.getenv("MONGO_TS_GRANULARITY", "seconds")  # Un relevé par seconde
+
+# Partitions Cassandra ((sensor_id, bucket), timestamp): "day" (YYYY-MM-DD) ou "hour" (YYYY-MM-DD HH)
+CASSANDRA_IOT_BUCKET = os.getenv("CASSANDRA_IOT_BUCKET", "day")
 
 # ---------------- GENERATION DE DONNEES ----------------
-def generate_sensor_data(record_id):
-    """Génère une entrée de capteur IoT"""
-    sensor_ids = [f"A{i:02d}" for i in range(1, NUM_SENSORS + 1)]
-    base_time = datetime(2025, 12, 3, 18, 0, 0)
-    
-    return {
-        "record_id": record_id,
-        "sensor_id": random.choice(sensor_ids),
-        "timestamp": (base_time + timedelta(seconds=record_id)).strftime("%Y-%m-%d %H:%M:%S"),
-        "temperature": round(random.uniform(15.0, 35.0), 2),
-        "humidity": random.randint(30, 90)
-    }
+SENSOR_KEY = ("sensor_id", "timestamp")
+SENSOR_FIELDS = {"sensor_id": str, "timestamp": str, "record_id": int, "temperature": float, "humidity": int}
+
+SENSOR_IDS = np.array([f"A{i:02d}" for i in range(1, NUM_SENSORS + 1)])
+BASE_TIME = "2025-12-03T18:00:00"
+
+def sensor_columns(ids, seed):
+    """Colonnes des relevés de capteurs IoT (un relevé par seconde)"""
+    return ColumnBatch({
+        "record_id": ids,
+        "sensor_id": choice(ids, seed, 1, SENSOR_IDS),
+        "timestamp": timestamps(ids, BASE_TIME),
+        "temperature": uniform(ids, seed, 2, 15.0, 35.0).round(2),
+        "humidity": integers(ids, seed, 3, 30, 91)
+    })
+
+SENSORS = declare("iot_sensors", sensor_columns, NUM_RECORDS)
+
+# Requêtes par intervalle de temps et par capteur (Cassandra: couvert par la clé (sensor_id, timestamp))
+SCHEMA = Schema({
+    "iot_sensors": [Index(("timestamp",)), Index(("sensor_id",))],
+    "sensors": [Index(("sensor_id", "timestamp"))],
+    "Sensor": [Index(("sensor_id", "timestamp"))],
+}, probes={
+    "iot_sensors": {"timestamp": (RANGE_START, RANGE_END)},
+    "sensors": {"sensor_id": "A01"},
+    "Sensor": {"sensor_id": "A01"},
+})
+
+# ============================================
+# INGESTION EN FLUX (commune à MongoDB, Redis, Cassandra)
+# ============================================
+def stream_insert(backend, ns, results, count=None):
+    """
+    Insère SENSORS[0:count] via le pipeline producteur / écrivains (mémoire
+    bornée, taille de lot adaptative). Latence par lot dans insert_*,
+    débit soutenu dans insert_records_per_s, insert_rate_p50...
+    """
+    count = NUM_RECORDS if count is None else count
+    print(f"  📝 STREAMING INSERT {count} records ({INGEST_WRITERS} writers)...")
+    SENSORS.open()  # Jeu construit / mappé hors chrono
+    with Phase(results, 'insert', count) as phase:
+        stats = ingest(backend, ns, SENSORS, count, phase, batch_size=BATCH_SIZE)
+    results.update(stats)
+    print(f"     📈 {stats['insert_records_per_s']:.0f} records/s soutenus "
+          f"(batch final: {stats['insert_batch_size_final']:.0f}, {stats['insert_backoffs']:.0f} reculs)")
 
 # ============================================
 # MONGODB - IoT Tests
 # ============================================
 def test_mongodb_iot():
     print("\n🔵 Testing MongoDB IoT...")
-    mongo = MongoClient("mongodb://localhost:27017")
-    db = mongo.testdb
-    collection = db.iot_sensors
+    backend = get_backend("MongoDB")
+    backend.reset("iot_sensors", key=SENSOR_KEY, fields=SENSOR_FIELDS)
     
-    collection.drop()
     results = {}
+    SCHEMA.provision(backend, "iot_sensors", results, "before")
+    
+    # 1️⃣ STREAMING INSERT (insert_many en parallèle)
+    stream_insert(backend, "iot_sensors", results)
     
-    # 1️⃣ BATCH INSERT
-    print(f"  📝 BATCH INSERT {NUM_RECORDS} records...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    mem_start = psutil.virtual_memory().percent
-    
-    # Insertion par batch
-    for batch_start in range(0, NUM_RECORDS, BATCH_SIZE):
-        batch = [generate_sensor_data(i) for i in range(batch_start, min(batch_start + BATCH_SIZE, NUM_RECORDS))]
-        collection.insert_many(batch)
-    
-    insert_time = time.time() - start
-    results['insert_time'] = insert_time
-    results['insert_throughput'] = NUM_RECORDS / insert_time
-    results['insert_cpu'] = psutil.cpu_percent() - cpu_start
-    results['insert_mem'] = psutil.virtual_memory().percent - mem_start
-    print(f"     ✅ Done in {insert_time:.2f}s ({results['insert_throughput']:.0f} records/sec)")
-    
-    # 2️⃣ INDEXATION
-    print(f"  🔍 CREATE INDEX on timestamp...")
-    start = time.time()
-    collection.create_index([("timestamp", 1)])
-    collection.create_index([("sensor_id", 1)])
-    index_time = time.time() - start
-    results['index_time'] = index_time
-    print(f"     ✅ Done in {index_time:.2f}s")
+    # 2️⃣ INDEXATION (timestamp, sensor_id), avant ou après le chargement selon BENCH_SCHEMA_STAGE
+    SCHEMA.provision(backend, "iot_sensors", results, "after")
+    if 'schema_iot_sensors_build_s' in results:
+        results['index_time'] = results['schema_iot_sensors_build_s']
     
     # 3️⃣ RANGE QUERY (par timestamp)
     print(f"  📖 RANGE QUERY (timestamp range)...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
+    def range_query():
+        return sum(1 for _ in backend.query("iot_sensors", where={"timestamp": (RANGE_START, RANGE_END)}))
     
-    start_ts = "2025-12-03 18:00:00"
-    end_ts = "2025-12-03 19:00:00"
-    cursor = collection.find({
-        "timestamp": {"$gte": start_ts, "$lte": end_ts}
-    })
-    count = len(list(cursor))
-    
-    query_time = time.time() - start
-    results['range_query_time'] = query_time
-    results['range_query_cpu'] = psutil.cpu_percent() - cpu_start
+    with Phase(results, 'range_query', warmup=lambda i: range_query(), warmup_ops=QUERY_WARMUP_OPS):
+        count = range_query()
     results['records_found'] = count
-    print(f"     ✅ Done in {query_time:.2f}s ({count} records found)")
+    print(f"     📊 {count} records found")
     
     # 4️⃣ AGGREGATION (par sensor_id)
-    print(f"  📊 AGGREGATION (avg temperature per sensor)...")
-    start = time.time()
-    
-    pipeline = [
-        {"$group": {
-            "_id": "$sensor_id",
-            "avg_temp": {"$avg": "$temperature"},
-            "count": {"$sum": 1}
-        }}
-    ]
-    result = list(collection.aggregate(pipeline))
-    
-    agg_time = time.time() - start
-    results['aggregation_time'] = agg_time
-    print(f"     ✅ Done in {agg_time:.2f}s ({len(result)} sensors)")
-    
-    mongo.close()
+    if not skip_native(backend, "AGGREGATION"):
+        print(f"  📊 AGGREGATION (avg temperature per sensor)...")
+        start = time.perf_counter()
+        
+        pipeline = [
+            {"$group": {
+                "_id": "$sensor_id",
+                "avg_temp": {"$avg": "$temperature"},
+                "count": {"$sum": 1}
+            }}
+        ]
+        result = backend.execute("iot_sensors", pipeline)
+        
+        agg_time = time.perf_counter() - start
+        results['aggregation_time'] = agg_time
+        print(f"     ✅ Done in {agg_time:.2f}s ({len(result)} sensors)")
+    
+    # 5️⃣ SUITE DE REQUETES (fenêtres et capteurs tirés au hasard)
+    windows = random_windows(SENSOR_IDS, BASE_TIME, NUM_RECORDS)
+    queries = (IotQueries if backend.stand_in else MongoIotQueries)(backend, "iot_sensors", SENSOR_IDS)
+    run_suite(queries, windows, results)
+    selectivity_sweep(queries, SENSOR_IDS, BASE_TIME, NUM_RECORDS, results)
+    
+    # 6️⃣ SCHEMAS TIME-SERIES (dates réelles)
+    if not skip_native(backend, "collections time-series / buckets"):
+        for layout in MONGO_IOT_LAYOUTS:
+            mongo_layout(backend, layout, results)
+    
     return results
 
+# ---------------- MONGODB: SCHEMAS TIME-SERIES ----------------
+def to_datetime(timestamp):
+    """'YYYY-MM-DD HH:MM:SS' -> datetime (UTC naïf, comme le stocke pymongo)"""
+    return datetime.fromisoformat(timestamp)
+
+def hour_of(ts):
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+def mongo_layout(backend, layout, results):
+    """
+    Même jeu de relevés, avec des dates réelles, dans trois schémas:
+      plain:      un document par relevé, index (sensor_id, ts)
+      timeseries: collection time-series (timeField ts, metaField sensor_id)
+      bucket:     un document par capteur-heure {readings: [...], count, sum_temp}
+    Champs {layout}_insert_*, {layout}_storage_mb, {layout}_index_mb,
+    {layout}_range_query_*, {layout}_range_all_*, {layout}_aggregation_*.
+    """
+    from pymongo import ASCENDING, UpdateOne
+    
+    db = backend.client
+    name = f"iot_{layout}"
+    db.drop_collection(name)
+    if layout == "timeseries":
+        db.create_collection(name, timeseries={
+            "timeField": "ts", "metaField": "sensor_id", "granularity": MONGO_TS_GRANULARITY
+        })
+        db[name].create_index([("sensor_id", ASCENDING), ("ts", ASCENDING)])
+    elif layout == "bucket":
+        db[name].create_index([("sensor_id", ASCENDING), ("hour", ASCENDING)])
+    else:
+        db[name].create_index([("sensor_id", ASCENDING), ("ts", ASCENDING)])
+        db[name].create_index([("ts", ASCENDING)])
+    collection = db[name]
+    
+    # Conversion des lots (dates réelles, regroupement par capteur-heure) dans le
+    # producteur d'ingest, hors chrono: seul insert_many / bulk_write est mesuré
+    def readings(rows):
+        return [{
+            "sensor_id": row["sensor_id"], "ts": to_datetime(row["timestamp"]), "record_id": row["record_id"],
+            "temperature": row["temperature"], "humidity": row["humidity"]
+        } for row in rows]
+    
+    def bucket_upserts(rows):
+        # Un upsert par capteur-heure du lot ($push $each des relevés)
+        buckets = {}
+        for row in rows:
+            ts = to_datetime(row["timestamp"])
+            buckets.setdefault((row["sensor_id"], hour_of(ts)), []).append({
+                "ts": ts, "record_id": row["record_id"],
+                "temperature": row["temperature"], "humidity": row["humidity"]
+            })
+        return [UpdateOne(
+            {"_id": f"{sensor_id}|{hour.isoformat()}"},
+            {"$setOnInsert": {"sensor_id": sensor_id, "hour": hour},
+             "$push": {"readings": {"$each": readings}},
+             "$inc": {"count": len(readings), "sum_temp": sum(r["temperature"] for r in readings)}},
+            upsert=True
+        ) for (sensor_id, hour), readings in buckets.items()]
+    
+    def write_readings(ns, docs):
+        collection.insert_many(docs, ordered=False)
+    
+    def write_buckets(ns, upserts):
+        collection.bulk_write(upserts, ordered=False)
+    
+    print(f"  📝 {layout.upper()} INSERT {NUM_RECORDS} records...")
+    bucketed = layout == "bucket"
+    with Phase(results, f'{layout}_insert', NUM_RECORDS) as phase:
+        stats = ingest(backend, name, SENSORS, NUM_RECORDS, phase, batch_size=BATCH_SIZE,
+                       prefix=f'{layout}_insert', bulk=write_buckets if bucketed else write_readings,
+                       prepare=bucket_upserts if bucketed else readings)
+    results.update(stats)
+    
+    # Taille sur disque (données compressées + index)
+    coll_stats = db.command("collStats", name)
+    results[f'{layout}_storage_mb'] = coll_stats.get("storageSize", 0) / (1024 * 1024)
+    results[f'{layout}_index_mb'] = coll_stats.get("totalIndexSize", 0) / (1024 * 1024)
+    print(f"     💾 Stockage: {results[f'{layout}_storage_mb']:.2f} MB + index {results[f'{layout}_index_mb']:.2f} MB")
+    
+    start, end = to_datetime(RANGE_START), to_datetime(RANGE_END)
+    
+    def window(sensor_id=None):
+        if layout == "bucket":
+            # Buckets qui recouvrent la fenêtre, relevés filtrés côté client
+            where = {"hour": {"$gte": hour_of(start), "$lte": end}}
+            if sensor_id:
+                where["sensor_id"] = sensor_id
+            return sum(1 for doc in collection.find(where, {"readings.ts": 1})
+                       for r in doc["readings"] if start <= r["ts"] <= end)
+        where = {"ts": {"$gte": start, "$lte": end}}
+        if sensor_id:
+            where["sensor_id"] = sensor_id
+        return sum(1 for _ in collection.find(where, {"_id": 0}))
+    
+    print(f"  📖 {layout.upper()} RANGE QUERY (A01)...")
+    with Phase(results, f'{layout}_range_query', warmup=lambda i: window("A01"), warmup_ops=QUERY_WARMUP_OPS):
+        count = window("A01")
+    results[f'{layout}_records_found'] = count
+    print(f"     📊 {count} records found")
+    
+    print(f"  📖 {layout.upper()} RANGE QUERY (tous capteurs)...")
+    with Phase(results, f'{layout}_range_all', warmup=lambda i: window(), warmup_ops=QUERY_WARMUP_OPS):
+        count = window()
+    results[f'{layout}_range_all_found'] = count
+    print(f"     📊 {count} records found")
+    
+    # Moyenne par capteur: sur les relevés, ou sur les agrégats pré-calculés des buckets
+    if layout == "bucket":
+        pipeline = [{"$group": {"_id": "$sensor_id", "sum_temp": {"$sum": "$sum_temp"}, "count": {"$sum": "$count"}}},
+                    {"$project": {"avg_temp": {"$divide": ["$sum_temp", "$count"]}, "count": 1}}]
+    else:
+        pipeline = [{"$group": {"_id": "$sensor_id", "avg_temp": {"$avg": "$temperature"}, "count": {"$sum": 1}}}]
+    
+    print(f"  📊 {layout.upper()} AGGREGATION (avg temperature per sensor)...")
+    def aggregation():
+        return list(collection.aggregate(pipeline))
+    
+    with Phase(results, f'{layout}_aggregation', warmup=lambda i: aggregation(), warmup_ops=QUERY_WARMUP_OPS):
+        sensors = aggregation()
+    results[f'{layout}_sensors_aggregated'] = len(sensors)
+    print(f"     ✅ {len(sensors)} sensors")
+
 # ============================================
 # REDIS - IoT Tests
 # ============================================
 def test_redis_iot():
     print("\n🔴 Testing Redis IoT...")
-    r = redis.Redis(host="localhost", port=6379, decode_responses=True)
-    r.flushdb()
+    backend = get_backend("Redis")
+    # Clés sensor:{sensor_id}:{timestamp}
+    backend.reset("sensor", key=SENSOR_KEY, fields=SENSOR_FIELDS)
     
     results = {}
     
-    # 1️⃣ BATCH INSERT
-    print(f"  📝 BATCH INSERT {NUM_RECORDS} records...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    mem_start = psutil.virtual_memory().percent
-    
-    pipe = r.pipeline()
-    for i in range(NUM_RECORDS):
-        data = generate_sensor_data(i)
-        pipe.hset(f"sensor:{data['sensor_id']}:{i}", mapping=data)
-    pipe.execute()
-    
-    insert_time = time.time() - start
-    results['insert_time'] = insert_time
-    results['insert_throughput'] = NUM_RECORDS / insert_time
-    results['insert_cpu'] = psutil.cpu_percent() - cpu_start
-    results['insert_mem'] = psutil.virtual_memory().percent - mem_start
-    print(f"     ✅ Done in {insert_time:.2f}s ({results['insert_throughput']:.0f} records/sec)")
+    # 1️⃣ STREAMING INSERT (pipelines en parallèle)
+    stream_insert(backend, "sensor", results)
     
     # 2️⃣ MEMORY USAGE
-    info = r.info('memory')
-    memory_used_mb = info['used_memory'] / (1024 * 1024)
-    results['memory_used_mb'] = memory_used_mb
-    print(f"  💾 Memory used: {memory_used_mb:.2f} MB")
+    if not skip_native(backend, "INFO memory"):
+        info = backend.client.info('memory')
+        memory_used_mb = info['used_memory'] / (1024 * 1024)
+        results['memory_used_mb'] = memory_used_mb
+        print(f"  💾 Memory used: {memory_used_mb:.2f} MB")
     
     # 3️⃣ KEY SCAN (simulation range query)
     print(f"  📖 SCAN keys (pattern search)...")
-    start = time.time()
+    def scan():
+        return list(backend.scan("sensor", prefix="A01:"))
     
-    keys = list(r.scan_iter(match="sensor:A01:*", count=100))
-    
-    scan_time = time.time() - start
-    results['scan_time'] = scan_time
+    with Phase(results, 'scan', warmup=lambda i: scan(), warmup_ops=QUERY_WARMUP_OPS):
+        keys = scan()
     results['keys_found'] = len(keys)
-    print(f"     ✅ Done in {scan_time:.2f}s ({len(keys)} keys found)")
+    print(f"     📊 {len(keys)} keys found")
+    
+    # 4️⃣ INDEX TEMPORELS (vraies requêtes par intervalle)
+    if not skip_native(backend, "index temporels (ZSET / Streams)"):
+        for mode in REDIS_TIME_INDEXES:
+            redis_time_index(backend, mode, results)
+    
+    # 5️⃣ SUITE DE REQUETES (sur l'index ZSET; hashes seuls = parcours complet par requête)
+    windows = random_windows(SENSOR_IDS, BASE_TIME, NUM_RECORDS)
+    if backend.stand_in:
+        queries = IotQueries(backend, "sensor", SENSOR_IDS)
+    elif "zset" in REDIS_TIME_INDEXES:
+        queries = RedisZsetIotQueries(backend, lambda s: time_index_key("zset", s),
+                                      backend.client.register_script(ZSET_AVG_SCRIPT), SENSOR_IDS)
+    else:
+        queries = None
+        print("  ⏭️  Suite de requêtes IoT: ignorée (REDIS_IOT_INDEXES sans zset)")
+    if queries is not None:
+        run_suite(queries, windows, results)
+        selectivity_sweep(queries, SENSOR_IDS, BASE_TIME, NUM_RECORDS, results)
     
     return results
 
+# ---------------- REDIS: INDEX TEMPORELS ----------------
+# Moyenne côté serveur sur une fenêtre: {nombre, somme} (Lua renvoie les flottants en chaîne)
+ZSET_AVG_SCRIPT = """
+local sum, n = 0, 0
+for _, member in ipairs(redis.call('ZRANGEBYSCORE', KEYS[1], ARGV[1], ARGV[2])) do
+    sum = sum + tonumber(string.match(member, '^[^|]+|([^|]+)'))
+    n = n + 1
+end
+return {n, tostring(sum)}
+"""
+
+STREAM_AVG_SCRIPT = """
+local sum, n = 0, 0
+for _, entry in ipairs(redis.call('XRANGE', KEYS[1], ARGV[1], ARGV[2])) do
+    local fields = entry[2]
+    for i = 1, #fields, 2 do
+        if fields[i] == 'temperature' then sum = sum + tonumber(fields[i + 1]) end
+    end
+    n = n + 1
+end
+return {n, tostring(sum)}
+"""
+
+def time_index_key(mode, sensor_id):
+    return f"iot:{mode}:{sensor_id}"
+
+def redis_time_index(backend, mode, results):
+    """
+    Stockage IoT indexé par le temps, par capteur:
+      zset:   ZADD iot:zset:{sensor} <epoch> "record_id|temperature|humidity"
+      stream: XADD iot:stream:{sensor} <epoch_ms>-0 record_id .. temperature .. humidity ..
+    puis les mêmes requêtes que MongoDB / Cassandra: intervalle sur un capteur,
+    intervalle sur tous les capteurs, moyenne par capteur (Lua, côté serveur).
+    Champs {mode}_insert_*, {mode}_range_query_*, {mode}_range_all_*, {mode}_aggregation_*.
+    """
+    r = backend.client
+    keys = [time_index_key(mode, s) for s in SENSOR_IDS.tolist()]
+    r.unlink(*keys)
+    start_s, end_s = epoch(RANGE_START), epoch(RANGE_END)
+    
+    # Clés, membres et scores préparés dans le producteur d'ingest (hors chrono)
+    def zset_entries(rows):
+        return [(time_index_key(mode, row["sensor_id"]),
+                 f"{row['record_id']}|{row['temperature']}|{row['humidity']}", epoch(row["timestamp"]))
+                for row in rows]
+    
+    def stream_entries(rows):
+        return [(time_index_key(mode, row["sensor_id"]),
+                 {"record_id": row["record_id"], "temperature": row["temperature"], "humidity": row["humidity"]},
+                 f"{epoch(row['timestamp']) * 1000}-0") for row in rows]
+    
+    def write_zset(ns, entries):
+        pipe = r.pipeline(transaction=False)
+        for key, member, score in entries:
+            pipe.zadd(key, {member: score})
+        pipe.execute()
+    
+    def write_stream(ns, entries):
+        pipe = r.pipeline(transaction=False)
+        for key, fields, entry_id in entries:
+            pipe.xadd(key, fields, id=entry_id)
+        pipe.execute()
+    
+    if mode == "zset":
+        write, prepare, writers = write_zset, zset_entries, INGEST_WRITERS
+        window = lambda key: r.zrangebyscore(key, start_s, end_s)
+        window_pipe = lambda pipe, key: pipe.zrangebyscore(key, start_s, end_s)
+        average = r.register_script(ZSET_AVG_SCRIPT)
+        full = ("-inf", "+inf")
+    else:
+        # Ids de stream croissants par capteur: un seul écrivain, lots dans l'ordre
+        write, prepare, writers = write_stream, stream_entries, 1
+        window = lambda key: r.xrange(key, start_s * 1000, end_s * 1000)
+        window_pipe = lambda pipe, key: pipe.xrange(key, start_s * 1000, end_s * 1000)
+        average = r.register_script(STREAM_AVG_SCRIPT)
+        full = ("-", "+")
+    
+    print(f"  📝 {mode.upper()} INSERT {NUM_RECORDS} records (index temporel par capteur)...")
+    with Phase(results, f'{mode}_insert', NUM_RECORDS) as phase:
+        stats = ingest(backend, mode, SENSORS, NUM_RECORDS, phase, writers=writers, batch_size=BATCH_SIZE,
+                       prefix=f'{mode}_insert', bulk=write, prepare=prepare)
+    results.update(stats)
+    
+    # Intervalle sur un capteur (comme Cassandra)
+    print(f"  📖 {mode.upper()} RANGE QUERY (A01, {RANGE_START} -> {RANGE_END})...")
+    def range_query():
+        return len(window(time_index_key(mode, "A01")))
+    
+    with Phase(results, f'{mode}_range_query', warmup=lambda i: range_query(), warmup_ops=QUERY_WARMUP_OPS):
+        count = range_query()
+    results[f'{mode}_records_found'] = count
+    print(f"     📊 {count} records found")
+    
+    # Intervalle sur tous les capteurs (comme MongoDB), un aller-retour pipeliné
+    print(f"  📖 {mode.upper()} RANGE QUERY (tous capteurs)...")
+    def range_all():
+        pipe = r.pipeline(transaction=False)
+        for key in keys:
+            window_pipe(pipe, key)
+        return sum(len(entries) for entries in pipe.execute())
+    
+    with Phase(results, f'{mode}_range_all', warmup=lambda i: range_all(), warmup_ops=QUERY_WARMUP_OPS):
+        count = range_all()
+    results[f'{mode}_range_all_found'] = count
+    print(f"     📊 {count} records found")
+    
+    # Moyenne de température par capteur, calculée côté serveur
+    print(f"  📊 {mode.upper()} AGGREGATION (avg temperature per sensor, Lua)...")
+    def aggregation():
+        pipe = r.pipeline(transaction=False)
+        for key in keys:
+            average(keys=[key], args=list(full), client=pipe)
+        return {key: float(total) / n for key, (n, total) in zip(keys, pipe.execute()) if n}
+    
+    with Phase(results, f'{mode}_aggregation', warmup=lambda i: aggregation(), warmup_ops=QUERY_WARMUP_OPS):
+        averages = aggregation()
+    results[f'{mode}_sensors_aggregated'] = len(averages)
+    print(f"     ✅ {len(averages)} sensors")
+
 # ============================================
 # CASSANDRA - IoT Tests
 # ============================================
 def test_cassandra_iot():
     print("\n🟣 Testing Cassandra IoT...")
-    print("  ⚠️  Using docker exec for Cassandra (Python 3.12+ compatibility)")
+    backend = get_backend("Cassandra")
+    # PRIMARY KEY (sensor_id, timestamp)
+    backend.reset("sensors", key=SENSOR_KEY, fields=SENSOR_FIELDS)
     
     results = {}
+    SCHEMA.provision(backend, "sensors", results, "before")
     
-    def run_cql(query, silent=False):
-        cmd = f'docker exec cassandra cqlsh -e "{query}"'
-        try:
-            result = subprocess.run(cmd, shell=True, capture_output=True, timeout=30)
-            return result.returncode == 0
-        except:
-            return False
-    
-    # Setup
-    print("  ⚙️  Setup keyspace and table...")
-    run_cql("CREATE KEYSPACE IF NOT EXISTS iotks WITH replication = {'class': 'SimpleStrategy', 'replication_factor': 1}")
-    run_cql("DROP TABLE IF EXISTS iotks.sensors")
-    run_cql("""CREATE TABLE iotks.sensors (
-        sensor_id text,
-        record_id int,
-        timestamp text,
-        temperature double,
-        humidity int,
-        PRIMARY KEY (sensor_id, timestamp)
-    ) WITH CLUSTERING ORDER BY (timestamp DESC)""")
-    
-    # 1️⃣ BATCH INSERT
-    print(f"  📝 BATCH INSERT {NUM_RECORDS} records...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    mem_start = psutil.virtual_memory().percent
-    
-    batch_size = 50  # Plus petit pour éviter timeout
-    for batch_start in range(0, NUM_RECORDS, batch_size):
-        batch_queries = []
-        for i in range(batch_start, min(batch_start + batch_size, NUM_RECORDS)):
-            data = generate_sensor_data(i)
-            batch_queries.append(
-                f"INSERT INTO iotks.sensors (sensor_id, record_id, timestamp, temperature, humidity) "
-                f"VALUES ('{data['sensor_id']}', {data['record_id']}, '{data['timestamp']}', {data['temperature']}, {data['humidity']})"
-            )
-        
-        batch_query = "BEGIN BATCH " + "; ".join(batch_queries) + "; APPLY BATCH"
-        run_cql(batch_query, silent=True)
-    
-    insert_time = time.time() - start
-    results['insert_time'] = insert_time
-    results['insert_throughput'] = NUM_RECORDS / insert_time
-    results['insert_cpu'] = psutil.cpu_percent() - cpu_start
-    results['insert_mem'] = psutil.virtual_memory().percent - mem_start
-    print(f"     ✅ Done in {insert_time:.2f}s ({results['insert_throughput']:.0f} records/sec)")
+    # 1️⃣ STREAMING INSERT (CQL asynchrone en parallèle)
+    stream_insert(backend, "sensors", results)
+    SCHEMA.provision(backend, "sensors", results, "after")
     
     # 2️⃣ RANGE QUERY
     print(f"  📖 RANGE QUERY (by sensor and timestamp)...")
-    start = time.time()
+    def range_query():
+        return sum(1 for _ in backend.query(
+            "sensors", where={"sensor_id": "A01", "timestamp": (RANGE_START, RANGE_END)}
+        ))
+    
+    with Phase(results, 'range_query', warmup=lambda i: range_query(), warmup_ops=QUERY_WARMUP_OPS):
+        count = range_query()
+    results['records_found'] = count
+    print(f"     📊 {count} records found")
     
-    query = "SELECT * FROM iotks.sensors WHERE sensor_id = 'A01' AND timestamp >= '2025-12-03 18:00:00' AND timestamp <= '2025-12-03 19:00:00'"
-    run_cql(query)
+    # 3️⃣ SUITE DE REQUETES (une partition par capteur)
+    windows = random_windows(SENSOR_IDS, BASE_TIME, NUM_RECORDS)
+    if backend.process_per_op:
+        print("  ⏭️  Suite de requêtes IoT: ignorée (repli cqlsh, un processus par requête)")
+    else:
+        queries = (IotQueries if backend.stand_in else CassandraIotQueries)(backend, "sensors", SENSOR_IDS)
+        run_suite(queries, windows, results)
+        selectivity_sweep(queries, SENSOR_IDS, BASE_TIME, NUM_RECORDS, results)
     
-    query_time = time.time() - start
-    results['range_query_time'] = query_time
-    print(f"     ✅ Done in {query_time:.2f}s")
+    # 4️⃣ PARTITIONS PAR CAPTEUR ET PAR JOUR (vs une partition par capteur)
+    if not skip_native(backend, "partitions (sensor_id, bucket)") and not backend.process_per_op:
+        cassandra_buckets(backend, windows, results)
     
     return results
 
+# ---------------- CASSANDRA: PARTITIONS PAR PERIODE ----------------
+# Format du bucket (préfixe du timestamp) et pas entre deux buckets
+BUCKET_FORMATS = {"day": ("%Y-%m-%d", timedelta(days=1)), "hour": ("%Y-%m-%d %H", timedelta(hours=1))}
+
+def bucket_of(timestamp):
+    """'YYYY-MM-DD HH:MM:SS' -> 'YYYY-MM-DD' (day) ou 'YYYY-MM-DD HH' (hour)"""
+    return timestamp[:13 if CASSANDRA_IOT_BUCKET == "hour" else 10]
+
+def buckets_between(start, end):
+    """Buckets recouverts par [start, end], dans l'ordre"""
+    fmt, step = BUCKET_FORMATS[CASSANDRA_IOT_BUCKET]
+    current, last = datetime.strptime(bucket_of(start), fmt), datetime.strptime(bucket_of(end), fmt)
+    buckets = []
+    while current <= last:
+        buckets.append(current.strftime(fmt))
+        current += step
+    return buckets
+
+def cassandra_buckets(backend, windows, results):
+    """
+    Variante PRIMARY KEY ((sensor_id, bucket), timestamp): une partition par
+    capteur et par jour (ou heure) au lieu d'une partition par capteur qui
+    grossit sans limite. Une fenêtre multi-jours / multi-capteurs devient une
+    requête par partition, exécutées en parallèle (fan_out) et fusionnées
+    dans l'ordre (bucket, timestamp). Mêmes fenêtres tirées sur les deux schémas:
+    single_range_sensor_* / bucketed_range_sensor_* (un capteur),
+    single_range_all_* / bucketed_range_all_* (tous les capteurs).
+    """
+    table = backend.table("sensors_bucketed")
+    backend.drop("sensors_bucketed")
+    # Mêmes types de colonnes que la table principale (reset): seule la clé change
+    columns = ", ".join(f"{f} {cql_type(t)}" for f, t in {**SENSOR_FIELDS, "bucket": str}.items())
+    backend.execute(f"CREATE TABLE {table} ({columns}, PRIMARY KEY ((sensor_id, bucket), timestamp))")
+    
+    # Colonne bucket ajoutée dans le producteur d'ingest (hors chrono)
+    def with_bucket(rows):
+        return [dict(row, bucket=bucket_of(row["timestamp"])) for row in rows]
+    
+    print(f"  📝 BUCKETED INSERT {NUM_RECORDS} records (partitions par {CASSANDRA_IOT_BUCKET})...")
+    with Phase(results, 'bucketed_insert', NUM_RECORDS) as phase:
+        stats = ingest(backend, "sensors_bucketed", SENSORS, NUM_RECORDS, phase, batch_size=BATCH_SIZE,
+                       prefix='bucketed_insert', prepare=with_bucket)
+    results.update(stats)
+    
+    single_query = (f"SELECT timestamp, temperature FROM {backend.table('sensors')} "
+                    "WHERE sensor_id = ? AND timestamp >= ? AND timestamp <= ?")
+    bucketed_query = (f"SELECT timestamp, temperature FROM {table} "
+                      "WHERE sensor_id = ? AND bucket = ? AND timestamp >= ? AND timestamp <= ?")
+    
+    def partitions(layout, sensors, w):
+        if layout == "single":
+            return single_query, [[s, w.start, w.end] for s in sensors]
+        return bucketed_query, [[s, b, w.start, w.end] for s in sensors for b in buckets_between(w.start, w.end)]
+    
+    all_sensors = SENSOR_IDS.tolist()
+    for shape in ("range_sensor", "range_all"):
+        for layout in ("single", "bucketed"):
+            touched, sizes = [], []
+            
+            def scan(w, measured=True):
+                query, params = partitions(layout, [w.sensor] if shape == "range_sensor" else all_sensors, w)
+                merged = [row for rows in fan_out(backend, query, params) for row in rows]
+                if measured:  # Moyennes sur les seules requêtes mesurées (pas l'échauffement)
+                    touched.append(len(params))
+                    sizes.append(len(merged))
+            
+            name = f"{layout}_{shape}"
+            print(f"  📖 {layout.upper()} {shape} ({len(windows)} fenêtres tirées)...")
+            with Phase(results, name, len(windows), warmup=lambda i: scan(windows[i % len(windows)], False),
+                       warmup_ops=QUERY_WARMUP_OPS) as phase:
+                phase.run(scan, lambda i: (windows[i % len(windows)],), limit=len(windows))
+            results[f'{name}_partitions_mean'] = sum(touched) / len(touched)
+            results[f'{name}_rows_mean'] = sum(sizes) / len(sizes)
+            print(f"     📊 {results[f'{name}_partitions_mean']:.1f} partitions, "
+                  f"{results[f'{name}_rows_mean']:.1f} lignes / requête en moyenne")
+
 # ============================================
 # NEO4J - IoT Tests (non recommandé pour IoT)
 # ============================================
 def test_neo4j_iot():
     print("\n🟢 Testing Neo4j IoT...")
     print("  ⚠️  Neo4j n'est pas adapté aux données IoT massives")
-    
-    driver = GraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", "password"))
+    backend = get_backend("Neo4j")
+    backend.reset("Sensor", key=SENSOR_KEY, fields=SENSOR_FIELDS)
     results = {}
+    SCHEMA.provision(backend, "Sensor", results, "before")
+    
+    # 1️⃣ INSERT (réduit pour Neo4j)
+    limited_records = min(NUM_RECORDS, 1000)  # Limité à 1000 pour Neo4j
+    records = SENSORS.rows(0, limited_records)
+    
+    print(f"  📝 INSERT {limited_records} records (limited)...")
+    with Phase(results, 'insert', limited_records) as phase:
+        put = phase.timer(backend.put)
+        for data in records:
+            put("Sensor", (data['sensor_id'], data['timestamp']), data)
+    results['records_inserted'] = limited_records
+    SCHEMA.provision(backend, "Sensor", results, "after")
+    
+    # 2️⃣ QUERY
+    print(f"  📖 QUERY (by sensor_id)...")
+    def query():
+        return sum(1 for _ in backend.query("Sensor", where={"sensor_id": "A01"}))
+    
+    with Phase(results, 'query', warmup=lambda i: query(), warmup_ops=QUERY_WARMUP_OPS):
+        count = query()
+    results['records_found'] = count
+    print(f"     📊 {count} records found")
     
-    with driver.session() as session:
-        session.run("MATCH (n:Sensor) DELETE n")
-        
-        # 1️⃣ INSERT (réduit pour Neo4j)
-        limited_records = min(NUM_RECORDS, 1000)  # Limité à 1000 pour Neo4j
-        print(f"  📝 INSERT {limited_records} records (limited)...")
-        start = time.time()
-        cpu_start = psutil.cpu_percent()
-        
-        for i in range(limited_records):
-            data = generate_sensor_data(i)
-            session.run(
-                "CREATE (s:Sensor {record_id: $record_id, sensor_id: $sensor_id, timestamp: $timestamp, temperature: $temperature, humidity: $humidity})",
-                **data
-            )
-        
-        insert_time = time.time() - start
-        results['insert_time'] = insert_time
-        results['insert_throughput'] = limited_records / insert_time
-        results['insert_cpu'] = psutil.cpu_percent() - cpu_start
-        results['records_inserted'] = limited_records
-        print(f"     ✅ Done in {insert_time:.2f}s ({results['insert_throughput']:.0f} records/sec)")
-        
-        # 2️⃣ QUERY
-        print(f"  📖 QUERY (by sensor_id)...")
-        start = time.time()
-        
-        result = session.run("MATCH (s:Sensor {sensor_id: 'A01'}) RETURN count(s) as cnt")
-        count = result.single()['cnt']
-        
-        query_time = time.time() - start
-        results['query_time'] = query_time
-        results['records_found'] = count
-        print(f"     ✅ Done in {query_time:.2f}s ({count} records)")
+    # 3️⃣ SUITE DE REQUETES (interface uniforme, sur les relevés insérés)
+    windows = random_windows(SENSOR_IDS, BASE_TIME, limited_records)
+    queries = IotQueries(backend, "Sensor", SENSOR_IDS)
+    run_suite(queries, windows, results)
+    selectivity_sweep(queries, SENSOR_IDS, BASE_TIME, limited_records, results)
     
-    driver.close()
     return results
 
 # ============================================
@@ -301,64 +610,38 @@ def send_results_to_influx(db_name, results, scenario="scenario2_iot"):
         if isinstance(value, (int, float)):
             point.field(key, value)
     
-    write_api.write(bucket=INFLUX_BUCKET, org=INFLUX_ORG, record=point)
+    metrics.write(point)
     print(f"  📊 Résultats envoyés vers InfluxDB pour {db_name}")
 
 # ============================================
 # MAIN
 # ============================================
-if __name__ == "__main__":
+DB_TESTS = [
+    ("MongoDB", test_mongodb_iot),
+    ("Redis", test_redis_iot),
+    ("Cassandra", test_cassandra_iot),
+    ("Neo4j", test_neo4j_iot),
+]
+
+def run(databases=None):
+    """Exécute le scénario sur les bases sélectionnées (toutes par défaut)"""
     print("="*60)
     print("🔥 SCENARIO 2 - DONNÉES MASSIVES (IoT/Logs)")
     print(f"📊 Nombre d'enregistrements: {NUM_RECORDS}")
     print(f"📊 Nombre de capteurs: {NUM_SENSORS}")
     print("="*60)
     
+    run_tests(DB_TESTS, send_results_to_influx, databases, scenario="scenario2_iot")
+    
+    print("\n" + "="*60)
+    print("✅ SCENARIO 2 TERMINÉ !")
+    print("📊 Vérifie Grafana sur http://localhost:3000")
+    print("="*60)
+
+if __name__ == "__main__":
     try:
-        # MongoDB
-        try:
-            print("\n" + "="*60)
-            mongo_results = test_mongodb_iot()
-            send_results_to_influx("MongoDB", mongo_results)
-        except Exception as e:
-            print(f"❌ Erreur MongoDB: {e}")
-        
-        time.sleep(2)
-        
-        # Redis
-        try:
-            print("\n" + "="*60)
-            redis_results = test_redis_iot()
-            send_results_to_influx("Redis", redis_results)
-        except Exception as e:
-            print(f"❌ Erreur Redis: {e}")
-        
-        time.sleep(2)
-        
-        # Cassandra
-        try:
-            print("\n" + "="*60)
-            cassandra_results = test_cassandra_iot()
-            send_results_to_influx("Cassandra", cassandra_results)
-        except Exception as e:
-            print(f"❌ Erreur Cassandra: {e}")
-        
-        time.sleep(2)
-        
-        # Neo4j
-        try:
-            print("\n" + "="*60)
-            neo4j_results = test_neo4j_iot()
-            send_results_to_influx("Neo4j", neo4j_results)
-        except Exception as e:
-            print(f"❌ Erreur Neo4j: {e}")
-        
-        print("\n" + "="*60)
-        print("✅ SCENARIO 2 TERMINÉ !")
-        print("📊 Vérifie Grafana sur http://localhost:3000")
-        print("="*60)
-        
+        run()
     finally:
-        write_api.close()
-        client_influx.close()
-        print("🔒 Connexion InfluxDB fermée proprement")
\ No newline at end of file
+        # Fermer proprement la connexion InfluxDB
+        metrics.close()
+        print("🔒 Connexion InfluxDB fermée proprement")
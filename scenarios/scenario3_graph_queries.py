@@ -1,235 +1,297 @@
-import time
-import psutil
-from influxdb_client import InfluxDBClient, Point
-from pymongo import MongoClient
-import redis
-from neo4j import GraphDatabase
-import random
-import subprocess
-from dotenv import load_dotenv
+from influxdb_client import Point
+import functools
 import os
+import time
 
-load_dotenv()
+import numpy as np
+
+import metrics
+from backends import get_backend, BULK_CHUNK
+from datagen import SEED, barabasi_albert, chung_lu, degrees, integers
+from harness import Phase, skip_native, run_tests, QUERY_WARMUP_OPS
+from schema import Index, Schema
 
 import warnings
 warnings.filterwarnings('ignore')
 
-# ---------------- INFLUXDB CONFIG ----------------
-INFLUX_URL = os.getenv("INFLUX_URL")
-INFLUX_TOKEN = os.getenv("INFLUX_TOKEN")
-INFLUX_ORG = os.getenv("INFLUX_ORG")
-INFLUX_BUCKET = os.getenv("INFLUX_BUCKET")
+# ---------------- CONFIGURATION ----------------
+NUM_USERS = 1000  # Nombre d'utilisateurs (le générateur tient le million)
+FRIENDS_PER_USER = 2  # Amitiés créées par nouvel utilisateur (≈ NUM_USERS * 2 amitiés)
+NUM_LIKES = 3000  # Nombre de "likes" tirés (avant dédoublonnage)
+
+# Modèle du graphe d'amitiés: "ba" (Barabási–Albert) ou "power_law" (Chung–Lu, exposant GRAPH_EXPONENT)
+GRAPH_MODEL = os.getenv("GRAPH_MODEL", "ba")
+GRAPH_EXPONENT = float(os.getenv("GRAPH_EXPONENT", "2.5"))  # Aussi pour les likes
+LOAD_CHUNK = BULK_CHUNK  # Arêtes / utilisateurs envoyés par appel
+TRAVERSAL_STARTS = int(os.getenv("BENCH_GRAPH_STARTS", "100"))  # Départs aléatoires des parcours k sauts
+TRAVERSAL_HOPS = (2, 3)  # Profondeurs mesurées (phases hop2, hop3)
 
-client_influx = InfluxDBClient(
-    url=INFLUX_URL,
-    token=INFLUX_TOKEN,
-    org=INFLUX_ORG
-)
+USER_FIELDS = {"user_id": int, "name": str}
+FRIENDSHIP_FIELDS = {"user1": int, "user2": int, "type": str}
 
-write_api = client_influx.write_api()
+# Chaque arête retrouve ses extrémités par user_id; les voisins se lisent par user1
+SCHEMA = Schema({
+    "User": [Index(("user_id",), "unique")],
+    "graph_users": [Index(("user_id",), "unique")],
+    "graph_friendships": [Index(("user1",)), Index(("user2",))],
+}, probes={"User": {"user_id": 0}, "graph_users": {"user_id": 0}, "graph_friendships": {"user1": 0}})
 
-# ---------------- CONFIGURATION ----------------
-NUM_USERS = 1000  # Nombre d'utilisateurs
-NUM_FRIENDSHIPS = 2000  # Nombre de relations d'amitié
-NUM_LIKES = 3000  # Nombre de "likes"
+# ---------------- GENERATION DU GRAPHE ----------------
+@functools.lru_cache(maxsize=None)
+def social_graph():
+    """
+    (amitiés, likes): tableaux int32 (source, cible) dédupliqués, générés une
+    fois et partagés par toutes les bases. Amitiés non orientées (source <
+    cible), likes orientés; degrés en loi de puissance (hubs = ids bas).
+    """
+    if GRAPH_MODEL == "power_law":
+        friendships = chung_lu(NUM_USERS, NUM_USERS * FRIENDS_PER_USER, GRAPH_EXPONENT, SEED)
+    else:
+        friendships = barabasi_albert(NUM_USERS, FRIENDS_PER_USER, SEED)
+    likes = chung_lu(NUM_USERS, NUM_LIKES, GRAPH_EXPONENT, SEED, stream=221, directed=True)
+    return friendships, likes
+
+def edge_chunks(edges, both_directions=False, size=LOAD_CHUNK):
+    """Arêtes en listes de paires (user1, user2), lot par lot (et leur inverse si demandé)"""
+    src, dst = edges
+    for start in range(0, len(src), size):
+        pairs = list(zip(src[start:start + size].tolist(), dst[start:start + size].tolist()))
+        yield pairs + [(b, a) for a, b in pairs] if both_directions else pairs
+
+def user_chunks(count, size=LOAD_CHUNK):
+    for start in range(0, count, size):
+        yield [{"user_id": i, "name": f"User_{i}"} for i in range(start, min(start + size, count))]
+
+def graph_stats(results):
+    """Taille et forme du graphe d'amitiés (hubs)"""
+    (src, dst), likes = social_graph()
+    degree = degrees(src, dst, NUM_USERS)
+    results['graph_friendships'] = float(len(src))
+    results['graph_likes'] = float(len(likes[0]))
+    results['graph_mean_degree'] = float(degree.mean())
+    results['graph_max_degree'] = float(degree.max())
+    print(f"  🕸️  Graphe {GRAPH_MODEL}: {len(src)} amitiés, {len(likes[0])} likes, "
+          f"degré moyen {degree.mean():.1f}, max {degree.max()} (user {degree.argmax()})")
+
+def traversal_starts(count=TRAVERSAL_STARTS):
+    """Utilisateurs de départ des parcours, tirés une fois: mêmes départs pour toutes les bases"""
+    return integers(np.arange(count), SEED, 231, 0, NUM_USERS).tolist()
+
+def traversal_phases(results, reach, starts=None, prefix="hop", label=""):
+    """
+    Parcours à k sauts (TRAVERSAL_HOPS) depuis chaque départ, une mesure par
+    départ: reach(start, hops) -> nombre d'utilisateurs distincts atteints en
+    au plus `hops` sauts, départ exclu, ou None si la requête a échoué (limite
+    serveur): comptée dans {prefix}{k}_failed, hors latences. Champs
+    {prefix}{k}_* et {prefix}{k}_reached_mean.
+    """
+    starts = traversal_starts() if starts is None else starts
+    clock = time.perf_counter_ns
+    for hops in TRAVERSAL_HOPS:
+        name = f'{prefix}{hops}'
+        print(f"  🔍 Query: {hops}-hop{label} depuis {len(starts)} utilisateurs...")
+        reached = []
+        with Phase(results, name, len(starts), warmup=lambda i: reach(starts[i % len(starts)], hops),
+                   warmup_ops=QUERY_WARMUP_OPS) as phase:
+            for start in starts:
+                begin = clock()
+                count = reach(start, hops)
+                if count is not None:
+                    phase.record(clock() - begin)
+                    reached.append(count)
+            phase.ops = len(reached)
+        failed = len(starts) - len(reached)
+        results[f'{name}_failed'] = float(failed)
+        if failed:
+            print(f"     ⚠️  {failed}/{len(starts)} parcours en échec")
+        results[f'{name}_starts'] = float(len(starts))
+        results[f'{name}_reached_mean'] = float(np.mean(reached)) if reached else 0.0
+        results[f'{name}_reached_max'] = float(max(reached, default=0))
+        print(f"     📊 {results[f'{name}_reached_mean']:.0f} utilisateurs atteints en moyenne "
+              f"(max {results[f'{name}_reached_max']:.0f})")
+
+def create_users(backend, ns, results, count=NUM_USERS):
+    print(f"  👥 Creating {count} users...")
+    with Phase(results, 'create_users', count) as phase:
+        bulk = phase.timer(backend.bulk)
+        for users in user_chunks(count):
+            bulk(ns, users)
 
 # ============================================
 # NEO4J - Graph Queries (OPTIMAL)
 # ============================================
 def test_neo4j_graph():
     print("\n🟢 Testing Neo4j Graph Queries...")
-    driver = GraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", "password"))
+    backend = get_backend("Neo4j")
     
     results = {}
     
-    with driver.session() as session:
-        # Nettoyage
-        print("  🗑️  Cleaning database...")
-        session.run("MATCH (n) DETACH DELETE n")
-        
-        # 1️⃣ CREATE USERS
-        print(f"  👥 Creating {NUM_USERS} users...")
-        start = time.time()
-        cpu_start = psutil.cpu_percent()
-        
-        for i in range(NUM_USERS):
-            session.run(
-                "CREATE (u:User {user_id: $user_id, name: $name})",
-                user_id=i,
-                name=f"User_{i}"
+    # Nettoyage
+    print("  🗑️  Cleaning database...")
+    backend.reset("User", key="user_id", fields=USER_FIELDS)
+    SCHEMA.provision(backend, "User", results, "before")
+    
+    # 1️⃣ CREATE USERS
+    graph_stats(results)
+    create_users(backend, "User", results)
+    # Contrainte user_id posée avant les arêtes: chaque MATCH d'extrémité est une recherche d'index
+    SCHEMA.provision(backend, "User", results, "after")
+    
+    if skip_native(backend, "Relations et traversées Cypher"):
+        return results
+    
+    friendships, likes = social_graph()
+    
+    # 2️⃣ CREATE FRIENDSHIPS (arêtes dédupliquées: CREATE, pas MERGE)
+    print(f"  🤝 Creating {len(friendships[0])} friendships...")
+    with Phase(results, 'create_friendships', len(friendships[0])) as phase:
+        execute = phase.timer(backend.execute)
+        for pairs in edge_chunks(friendships):
+            execute(
+                "UNWIND $pairs AS pair "
+                "MATCH (u1:User {user_id: pair[0]}), (u2:User {user_id: pair[1]}) "
+                "CREATE (u1)-[:FRIEND_OF]->(u2)",
+                pairs=pairs
+            )
+    
+    # 3️⃣ CREATE LIKES
+    print(f"  ❤️  Creating {len(likes[0])} likes...")
+    with Phase(results, 'create_likes', len(likes[0])) as phase:
+        execute = phase.timer(backend.execute)
+        for pairs in edge_chunks(likes):
+            execute(
+                "UNWIND $pairs AS pair "
+                "MATCH (u1:User {user_id: pair[0]}), (u2:User {user_id: pair[1]}) "
+                "CREATE (u1)-[:LIKES]->(u2)",
+                pairs=pairs
             )
-        
-        create_time = time.time() - start
-        results['create_users_time'] = float(create_time)
-        results['create_users_cpu'] = float(psutil.cpu_percent() - cpu_start)
-        print(f"     ✅ Done in {create_time:.2f}s")
-        
-        # 2️⃣ CREATE FRIENDSHIPS
-        print(f"  🤝 Creating {NUM_FRIENDSHIPS} friendships...")
-        start = time.time()
-        
-        for _ in range(NUM_FRIENDSHIPS):
-            user1 = random.randint(0, NUM_USERS - 1)
-            user2 = random.randint(0, NUM_USERS - 1)
-            if user1 != user2:
-                session.run(
-                    "MATCH (u1:User {user_id: $user1}), (u2:User {user_id: $user2}) "
-                    "MERGE (u1)-[:FRIEND_OF]->(u2)",
-                    user1=user1, user2=user2
-                )
-        
-        friendship_time = time.time() - start
-        results['create_friendships_time'] = float(friendship_time)
-        print(f"     ✅ Done in {friendship_time:.2f}s")
-        
-        # 3️⃣ CREATE LIKES
-        print(f"  ❤️  Creating {NUM_LIKES} likes...")
-        start = time.time()
-        
-        for _ in range(NUM_LIKES):
-            user1 = random.randint(0, NUM_USERS - 1)
-            user2 = random.randint(0, NUM_USERS - 1)
-            if user1 != user2:
-                session.run(
-                    "MATCH (u1:User {user_id: $user1}), (u2:User {user_id: $user2}) "
-                    "MERGE (u1)-[:LIKES]->(u2)",
-                    user1=user1, user2=user2
-                )
-        
-        likes_time = time.time() - start
-        results['create_likes_time'] = float(likes_time)
-        print(f"     ✅ Done in {likes_time:.2f}s")
-        
-        # 4️⃣ QUERY: Friends of Friends
-        print(f"  🔍 Query: Friends of friends...")
-        start = time.time()
-        cpu_start = psutil.cpu_percent()
-        
-        result = session.run(
+    
+    # 4️⃣ QUERY: Friends of Friends
+    print(f"  🔍 Query: Friends of friends...")
+    def friends_of_friends():
+        return backend.execute(
             "MATCH (u:User {user_id: 0})-[:FRIEND_OF*2]-(fof:User) "
             "RETURN DISTINCT fof.user_id LIMIT 100"
         )
-        fof_list = [record['fof.user_id'] for record in result]
-        
-        fof_time = time.time() - start
-        results['friends_of_friends_time'] = float(fof_time)
-        results['friends_of_friends_cpu'] = float(psutil.cpu_percent() - cpu_start)
-        results['fof_count'] = float(len(fof_list))
-        print(f"     ✅ Done in {fof_time:.2f}s (found {len(fof_list)} friends)")
-        
-        # 5️⃣ QUERY: 3-Level Connections
-        print(f"  🔍 Query: 3-level connections...")
-        start = time.time()
-        
-        result = session.run(
+    
+    with Phase(results, 'friends_of_friends', warmup=lambda i: friends_of_friends(), warmup_ops=QUERY_WARMUP_OPS):
+        fof_list = friends_of_friends()
+    results['fof_count'] = float(len(fof_list))
+    print(f"     📊 Found {len(fof_list)} friends")
+    
+    # 5️⃣ QUERY: 3-Level Connections
+    print(f"  🔍 Query: 3-level connections...")
+    def three_level():
+        return backend.execute(
             "MATCH (u:User {user_id: 0})-[:FRIEND_OF*1..3]-(connected:User) "
             "RETURN DISTINCT connected.user_id LIMIT 100"
         )
-        connections = [record['connected.user_id'] for record in result]
-        
-        three_level_time = time.time() - start
-        results['three_level_time'] = float(three_level_time)
-        results['three_level_count'] = float(len(connections))
-        print(f"     ✅ Done in {three_level_time:.2f}s (found {len(connections)} connections)")
-        
-        # 6️⃣ QUERY: Community Detection (simple)
-        print(f"  🔍 Query: Find communities (shared friends)...")
-        start = time.time()
-        
-        result = session.run(
+    
+    with Phase(results, 'three_level', warmup=lambda i: three_level(), warmup_ops=QUERY_WARMUP_OPS):
+        connections = three_level()
+    results['three_level_count'] = float(len(connections))
+    print(f"     📊 Found {len(connections)} connections")
+    
+    # 6️⃣ QUERY: Community Detection (simple)
+    print(f"  🔍 Query: Find communities (shared friends)...")
+    def community_detection():
+        return backend.execute(
             "MATCH (u1:User)-[:FRIEND_OF]->(common:User)<-[:FRIEND_OF]-(u2:User) "
             "WHERE u1.user_id < u2.user_id "
             "RETURN u1.user_id, u2.user_id, count(common) as shared_friends "
             "ORDER BY shared_friends DESC LIMIT 10"
         )
-        communities = list(result)
-        
-        community_time = time.time() - start
-        results['community_detection_time'] = float(community_time)
-        results['top_communities'] = float(len(communities))
-        print(f"     ✅ Done in {community_time:.2f}s (found {len(communities)} pairs)")
-    
-    driver.close()
+    
+    with Phase(results, 'community_detection', warmup=lambda i: community_detection(),
+               warmup_ops=QUERY_WARMUP_OPS):
+        communities = community_detection()
+    results['top_communities'] = float(len(communities))
+    print(f"     📊 Found {len(communities)} pairs")
+    
+    # 7️⃣ PARCOURS À 2 ET 3 SAUTS (MATCH à longueur variable, mêmes départs que MongoDB / Redis)
+    def reach(start, hops):
+        return backend.execute(
+            f"MATCH (u:User {{user_id: $start}})-[:FRIEND_OF*1..{int(hops)}]-(v:User) "
+            "WHERE v <> u RETURN count(DISTINCT v) AS reached",
+            start=start
+        )[0]["reached"]
+    
+    traversal_phases(results, reach)
+    
     return results
 
 # ============================================
 # MONGODB - Graph Queries (SUBOPTIMAL)
 # ============================================
+def graph_lookup(start, hops):
+    """
+    Pipeline $graphLookup: arêtes atteintes depuis `start` en au plus `hops`
+    sauts (maxDepth = hops - 1, la profondeur 0 étant les arêtes du départ),
+    chaque niveau résolu par l'index user1; nombre d'extrémités distinctes.
+    """
+    return [
+        {"$match": {"user_id": start}},
+        {"$graphLookup": {
+            "from": "graph_friendships",
+            "startWith": "$user_id",
+            "connectFromField": "user2",
+            "connectToField": "user1",
+            "as": "edges",
+            "maxDepth": hops - 1,
+            "restrictSearchWithMatch": {"type": "friend"},
+        }},
+        # Seules les extrémités restent: le document ne porte plus les arêtes complètes
+        {"$project": {"_id": 0, "user_id": 1, "reached": "$edges.user2"}},
+        {"$project": {"reached": {"$size": {"$setDifference": ["$reached", ["$user_id"]]}}}},
+    ]
+
 def test_mongodb_graph():
     print("\n🔵 Testing MongoDB Graph Queries...")
     print("  ⚠️  MongoDB n'est pas optimal pour les requêtes de graphes")
+    backend = get_backend("MongoDB")
     
-    mongo = MongoClient("mongodb://localhost:27017")
-    db = mongo.testdb
-    users = db.graph_users
-    friendships = db.graph_friendships
-    
-    users.drop()
-    friendships.drop()
+    backend.reset("graph_users", key="user_id", fields=USER_FIELDS)
+    backend.reset("graph_friendships", key=("user1", "user2"), fields=FRIENDSHIP_FIELDS)
     
     results = {}
+    SCHEMA.provision(backend, "graph_users", results, "before")
+    SCHEMA.provision(backend, "graph_friendships", results, "before")
     
     # 1️⃣ CREATE USERS
-    print(f"  👥 Creating {NUM_USERS} users...")
-    start = time.time()
-    
-    user_docs = [{"user_id": i, "name": f"User_{i}"} for i in range(NUM_USERS)]
-    users.insert_many(user_docs)
-    
-    create_time = time.time() - start
-    results['create_users_time'] = float(create_time)
-    print(f"     ✅ Done in {create_time:.2f}s")
-    
-    # 2️⃣ CREATE FRIENDSHIPS
-    print(f"  🤝 Creating {NUM_FRIENDSHIPS} friendships...")
-    start = time.time()
-    
-    friendship_docs = []
-    for _ in range(NUM_FRIENDSHIPS):
-        user1 = random.randint(0, NUM_USERS - 1)
-        user2 = random.randint(0, NUM_USERS - 1)
-        if user1 != user2:
-            friendship_docs.append({"user1": user1, "user2": user2, "type": "friend"})
-    
-    if friendship_docs:
-        friendships.insert_many(friendship_docs)
-    
-    friendship_time = time.time() - start
-    results['create_friendships_time'] = float(friendship_time)
-    print(f"     ✅ Done in {friendship_time:.2f}s")
-    
-    # 3️⃣ CREATE INDEX
-    print(f"  🔍 Creating indexes...")
-    friendships.create_index([("user1", 1)])
-    friendships.create_index([("user2", 1)])
+    graph_stats(results)
+    create_users(backend, "graph_users", results)
+    SCHEMA.provision(backend, "graph_users", results, "after")
+    
+    # 2️⃣ CREATE FRIENDSHIPS (un document par sens, comme les ensembles Redis)
+    friendships, _ = social_graph()
+    print(f"  🤝 Creating {len(friendships[0])} friendships...")
+    with Phase(results, 'create_friendships', len(friendships[0])) as phase:
+        bulk = phase.timer(backend.bulk)
+        for pairs in edge_chunks(friendships, both_directions=True):
+            bulk("graph_friendships", [{"user1": user1, "user2": user2, "type": "friend"} for user1, user2 in pairs])
+    
+    # 3️⃣ CREATE INDEX (user1, user2), ou déjà créés avant le chargement selon BENCH_SCHEMA_STAGE
+    SCHEMA.provision(backend, "graph_friendships", results, "after")
+    
+    if skip_native(backend, "Parcours $graphLookup"):
+        return results
+    
+    # 4️⃣ PARCOURS À 2 ET 3 SAUTS ($graphLookup côté serveur, index sur user1)
+    from pymongo.errors import OperationFailure
+    users = backend.collection("graph_users")
+    
+    def reach(start, hops):
+        # Hubs du graphe en loi de puissance: limite mémoire de $graphLookup (100 MB)
+        # ou taille de document (16 MB) possibles, comptées comme parcours en échec
+        try:
+            cursor = users.aggregate(graph_lookup(start, hops), allowDiskUse=True)
+            return next(cursor, {"reached": 0})["reached"]
+        except OperationFailure as e:
+            print(f"     ❌ {hops}-hop depuis {start}: {e.details.get('errmsg', e) if e.details else e}")
+            return None
     
-    # 4️⃣ QUERY: Friends of Friends (SLOW)
-    print(f"  🔍 Query: Friends of friends...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    
-    # Trouver les amis directs
-    direct_friends = friendships.find({"user1": 0})
-    friend_ids = [f["user2"] for f in direct_friends]
-    
-    # Trouver les amis des amis
-    fof_set = set()
-    for friend_id in friend_ids[:10]:  # Limité pour performance
-        fof = friendships.find({"user1": friend_id})
-        fof_set.update([f["user2"] for f in fof])
-    
-    fof_time = time.time() - start
-    results['friends_of_friends_time'] = float(fof_time)
-    results['friends_of_friends_cpu'] = float(psutil.cpu_percent() - cpu_start)
-    results['fof_count'] = float(len(fof_set))
-    print(f"     ✅ Done in {fof_time:.2f}s (found {len(fof_set)} friends)")
-    
-    # 5️⃣ QUERY: 3-Level Connections (VERY SLOW - skip)
-    print(f"  ⚠️  Skipping 3-level query (too slow for MongoDB)")
-    results['three_level_time'] = float(0.0)  # Changed from -1 to 0.0
-    results['three_level_supported'] = 0.0  # Added flag
+    traversal_phases(results, reach)
     
-    mongo.close()
     return results
 
 # ============================================
@@ -239,38 +301,32 @@ def test_cassandra_graph():
     print("\n🟣 Testing Cassandra Graph Queries...")
     print("  ⚠️  Cassandra n'est PAS conçu pour les requêtes de graphes")
     print("  ℹ️  Test basique uniquement")
+    backend = get_backend("Cassandra")
     
-    results = {}
-    
-    def run_cql(query):
-        cmd = f'docker exec cassandra cqlsh -e "{query}"'
-        try:
-            result = subprocess.run(cmd, shell=True, capture_output=True, timeout=30)
-            return result.returncode == 0
-        except:
-            return False
-    
-    # Setup
-    run_cql("CREATE KEYSPACE IF NOT EXISTS graphks WITH replication = {'class': 'SimpleStrategy', 'replication_factor': 1}")
-    run_cql("DROP TABLE IF EXISTS graphks.users")
-    run_cql("DROP TABLE IF EXISTS graphks.friendships")
-    
-    run_cql("CREATE TABLE graphks.users (user_id int PRIMARY KEY, name text)")
-    run_cql("CREATE TABLE graphks.friendships (user1 int, user2 int, PRIMARY KEY (user1, user2))")
-    
-    # 1️⃣ INSERT USERS
-    print(f"  👥 Creating {min(NUM_USERS, 100)} users (limited)...")
-    start = time.time()
-    
-    limited_users = min(NUM_USERS, 100)
-    for i in range(limited_users):
-        run_cql(f"INSERT INTO graphks.users (user_id, name) VALUES ({i}, 'User_{i}')")
-    
-    create_time = time.time() - start
-    results['create_users_time'] = float(create_time)
-    print(f"     ✅ Done in {create_time:.2f}s")
+    backend.reset("graph_users", key="user_id", fields=USER_FIELDS)
+    backend.reset("graph_friendships", key=("user1", "user2"), fields=FRIENDSHIP_FIELDS)
     
-    # 2️⃣ Note
+    results = {}
+    SCHEMA.provision(backend, "graph_users", results, "before")
+    SCHEMA.provision(backend, "graph_friendships", results, "before")
+    
+    # 1️⃣ INSERT USERS (limité sur le repli cqlsh)
+    limited_users = min(NUM_USERS, 100) if backend.process_per_op else NUM_USERS
+    graph_stats(results)
+    create_users(backend, "graph_users", results, limited_users)
+    SCHEMA.provision(backend, "graph_users", results, "after")
+    
+    # 2️⃣ CREATE FRIENDSHIPS (listes d'adjacence: une partition par user1, un sens par ligne)
+    if not backend.process_per_op:
+        friendships, _ = social_graph()
+        print(f"  🤝 Creating {len(friendships[0])} friendships...")
+        with Phase(results, 'create_friendships', len(friendships[0])) as phase:
+            bulk = phase.timer(backend.bulk)
+            for pairs in edge_chunks(friendships, both_directions=True):
+                bulk("graph_friendships", [{"user1": user1, "user2": user2, "type": "friend"} for user1, user2 in pairs])
+    SCHEMA.provision(backend, "graph_friendships", results, "after")
+    
+    # 3️⃣ Note
     print(f"  ⚠️  Cassandra ne peut pas effectuer de traversée de graphe")
     print(f"  ℹ️  Requêtes de graphes impossibles avec Cassandra")
     
@@ -287,69 +343,91 @@ def test_redis_graph():
     print("\n🔴 Testing Redis Graph Queries...")
     print("  ⚠️  Redis standard ne supporte pas les graphes natifs")
     print("  ℹ️  Simulation avec structures Redis")
+    backend = get_backend("Redis")
     
-    r = redis.Redis(host="localhost", port=6379, decode_responses=True)
-    r.flushdb()
+    backend.reset("user", key="user_id", fields=USER_FIELDS)
+    backend.reset("friends")
     
     results = {}
     
     # 1️⃣ CREATE USERS
-    print(f"  👥 Creating {NUM_USERS} users...")
-    start = time.time()
-    
-    pipe = r.pipeline()
-    for i in range(NUM_USERS):
-        pipe.hset(f"user:{i}", mapping={"user_id": i, "name": f"User_{i}"})
-    pipe.execute()
-    
-    create_time = time.time() - start
-    results['create_users_time'] = float(create_time)
-    print(f"     ✅ Done in {create_time:.2f}s")
-    
-    # 2️⃣ CREATE FRIENDSHIPS (via Sets)
-    print(f"  🤝 Creating {NUM_FRIENDSHIPS} friendships...")
-    start = time.time()
-    
-    pipe = r.pipeline()
-    for _ in range(NUM_FRIENDSHIPS):
-        user1 = random.randint(0, NUM_USERS - 1)
-        user2 = random.randint(0, NUM_USERS - 1)
-        if user1 != user2:
-            pipe.sadd(f"friends:{user1}", user2)
-            pipe.sadd(f"friends:{user2}", user1)
-    pipe.execute()
-    
-    friendship_time = time.time() - start
-    results['create_friendships_time'] = float(friendship_time)
-    print(f"     ✅ Done in {friendship_time:.2f}s")
-    
-    # 3️⃣ QUERY: Friends of Friends
-    print(f"  🔍 Query: Friends of friends...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    
-    # Amis directs
-    direct_friends = r.smembers("friends:0")
-    
-    # Amis des amis
-    fof_set = set()
-    for friend in list(direct_friends)[:20]:  # Limité pour performance
-        fof = r.smembers(f"friends:{friend}")
-        fof_set.update(fof)
-    
-    fof_time = time.time() - start
-    results['friends_of_friends_time'] = float(fof_time)
-    results['friends_of_friends_cpu'] = float(psutil.cpu_percent() - cpu_start)
-    results['fof_count'] = float(len(fof_set))
-    print(f"     ✅ Done in {fof_time:.2f}s (found {len(fof_set)} friends)")
-    
-    # 4️⃣ Note
-    print(f"  ⚠️  Redis ne peut pas faire de traversée profonde efficacement")
-    results['three_level_time'] = float(0.0)  # Changed from -1 to 0.0
-    results['three_level_supported'] = 0.0  # Added flag
+    graph_stats(results)
+    create_users(backend, "user", results)
+    
+    if skip_native(backend, "Ensembles d'adjacence Redis"):
+        return results
+    r = backend.client
+    
+    # 2️⃣ CREATE FRIENDSHIPS (via Sets, un pipeline par lot)
+    friendships, _ = social_graph()
+    print(f"  🤝 Creating {len(friendships[0])} friendships...")
+    with Phase(results, 'create_friendships', len(friendships[0])) as phase:
+        for pairs in edge_chunks(friendships):
+            start = time.perf_counter_ns()
+            pipe = r.pipeline(transaction=False)
+            for user1, user2 in pairs:
+                pipe.sadd(f"friends:{user1}", user2)
+                pipe.sadd(f"friends:{user2}", user1)
+            pipe.execute()
+            phase.record(time.perf_counter_ns() - start)
+    
+    # 3️⃣ PARCOURS À 2 ET 3 SAUTS: BFS côté serveur (Lua), un aller-retour par parcours
+    bfs = r.register_script(REDIS_BFS_SCRIPT)
+    
+    def reach(start, hops):
+        return bfs(keys=REDIS_BFS_KEYS, args=[start, hops, "friends:"])
+    
+    traversal_phases(results, reach, label=" (Lua)")
+    
+    # 4️⃣ MÊMES PARCOURS CÔTÉ CLIENT: un pipeline de SMEMBERS par niveau
+    traversal_phases(results, lambda start, hops: redis_bfs_pipelined(r, start, hops),
+                     prefix="pipelined_hop", label=" (pipeline)")
     
     return results
 
+# Parcours en largeur sur les ensembles friends:{id}, atomique côté serveur.
+# Frontière et voisins sont des ensembles temporaires: SUNIONSTORE réunit les
+# listes d'adjacence de toute la frontière, SDIFFSTORE retire les déjà visités.
+# Les clés d'adjacence sont calculées dans le script (instance seule, pas de cluster).
+REDIS_BFS_KEYS = ["bfs:visited", "bfs:frontier", "bfs:next"]
+REDIS_BFS_SCRIPT = """
+local visited, frontier, nxt = KEYS[1], KEYS[2], KEYS[3]
+local hops, prefix = tonumber(ARGV[2]), ARGV[3]
+redis.call('DEL', visited, frontier, nxt)
+redis.call('SADD', visited, ARGV[1])
+redis.call('SADD', frontier, ARGV[1])
+for depth = 1, hops do
+    local members = redis.call('SMEMBERS', frontier)
+    if #members == 0 then break end
+    redis.call('DEL', nxt)
+    -- Par tranches: unpack est borné par la pile Lua
+    for i = 1, #members, 4000 do
+        local keys = {}
+        for j = i, math.min(i + 3999, #members) do keys[#keys + 1] = prefix .. members[j] end
+        redis.call('SUNIONSTORE', nxt, nxt, unpack(keys))
+    end
+    redis.call('SDIFFSTORE', frontier, nxt, visited)
+    redis.call('SUNIONSTORE', visited, visited, frontier)
+end
+local reached = redis.call('SCARD', visited) - 1
+redis.call('DEL', visited, frontier, nxt)
+return reached
+"""
+
+def redis_bfs_pipelined(r, start, hops):
+    """BFS côté client: un pipeline SMEMBERS par niveau, ensembles visités en Python"""
+    visited = {str(start)}
+    frontier = visited
+    for _ in range(hops):
+        if not frontier:
+            break
+        pipe = r.pipeline(transaction=False)
+        for user in frontier:
+            pipe.smembers(f"friends:{user}")
+        frontier = set().union(*pipe.execute()) - visited
+        visited |= frontier
+    return len(visited) - 1
+
 # ============================================
 # ENVOI DES RESULTATS
 # ============================================
@@ -363,7 +441,7 @@ def send_results_to_influx(db_name, results, scenario="scenario3_graph_v2"):
             point.field(key, float(value))
     
     try:
-        write_api.write(bucket=INFLUX_BUCKET, org=INFLUX_ORG, record=point)
+        metrics.write(point)
         print(f"  📊 Résultats envoyés vers InfluxDB pour {db_name}")
     except Exception as e:
         print(f"  ⚠️  Erreur lors de l'envoi vers InfluxDB: {e}")
@@ -371,63 +449,37 @@ def send_results_to_influx(db_name, results, scenario="scenario3_graph_v2"):
 # ============================================
 # MAIN
 # ============================================
-if __name__ == "__main__":
+DB_TESTS = [
+    ("Neo4j", test_neo4j_graph),
+    ("MongoDB", test_mongodb_graph),
+    ("Redis", test_redis_graph),
+    ("Cassandra", test_cassandra_graph),
+]
+
+def run(databases=None):
+    """Exécute le scénario sur les bases sélectionnées (toutes par défaut)"""
     print("="*60)
     print("🔥 SCENARIO 3 - REQUÊTES RELATIONNELLES (GRAPHES)")
     print(f"📊 Nombre d'utilisateurs: {NUM_USERS}")
-    print(f"📊 Nombre de relations: {NUM_FRIENDSHIPS}")
+    print(f"📊 Graphe: {GRAPH_MODEL}, {FRIENDS_PER_USER} amitiés par utilisateur")
     print("="*60)
     
+    run_tests(DB_TESTS, send_results_to_influx, databases, scenario="scenario3_graph_v2")
+    
+    print("\n" + "="*60)
+    print("✅ SCENARIO 3 TERMINÉ !")
+    print("📊 Résultats attendus:")
+    print("   🟢 Neo4j: EXCELLENT pour graphes")
+    print("   🔵 MongoDB: LENT, pas adapté")
+    print("   🔴 Redis: BFS Lua sur ensembles d'adjacence, 2-3 sauts")
+    print("   🟣 Cassandra: NON ADAPTÉ")
+    print("📊 Vérifie Grafana sur http://localhost:3000")
+    print("="*60)
+
+if __name__ == "__main__":
     try:
-        # Neo4j (OPTIMAL)
-        try:
-            print("\n" + "="*60)
-            neo4j_results = test_neo4j_graph()
-            send_results_to_influx("Neo4j", neo4j_results)
-        except Exception as e:
-            print(f"❌ Erreur Neo4j: {e}")
-        
-        time.sleep(2)
-        
-        # MongoDB (SUBOPTIMAL)
-        try:
-            print("\n" + "="*60)
-            mongo_results = test_mongodb_graph()
-            send_results_to_influx("MongoDB", mongo_results)
-        except Exception as e:
-            print(f"❌ Erreur MongoDB: {e}")
-        
-        time.sleep(2)
-        
-        # Redis (LIMITED)
-        try:
-            print("\n" + "="*60)
-            redis_results = test_redis_graph()
-            send_results_to_influx("Redis", redis_results)
-        except Exception as e:
-            print(f"❌ Erreur Redis: {e}")
-        
-        time.sleep(2)
-        
-        # Cassandra (NOT SUITABLE)
-        try:
-            print("\n" + "="*60)
-            cassandra_results = test_cassandra_graph()
-            send_results_to_influx("Cassandra", cassandra_results)
-        except Exception as e:
-            print(f"❌ Erreur Cassandra: {e}")
-        
-        print("\n" + "="*60)
-        print("✅ SCENARIO 3 TERMINÉ !")
-        print("📊 Résultats attendus:")
-        print("   🟢 Neo4j: EXCELLENT pour graphes")
-        print("   🔵 MongoDB: LENT, pas adapté")
-        print("   🔴 Redis: LIMITÉ, traversée difficile")
-        print("   🟣 Cassandra: NON ADAPTÉ")
-        print("📊 Vérifie Grafana sur http://localhost:3000")
-        print("="*60)
-        
+        run()
     finally:
-        write_api.close()
-        client_influx.close()
-        print("🔒 Connexion InfluxDB fermée proprement")
\ No newline at end of file
+        # Fermer proprement la connexion InfluxDB
+        metrics.close()
+        print("🔒 Connexion InfluxDB fermée proprement")
@@ -1,46 +1,90 @@
-import time
-import psutil
-from influxdb_client import InfluxDBClient, Point
-from pymongo import MongoClient
-import redis
-from neo4j import GraphDatabase
-import random
-import string
-import subprocess
-from dotenv import load_dotenv
-import os
+from influxdb_client import Point
 
-load_dotenv()
+import metrics
+from backends import get_backend
+from datagen import ColumnBatch, SEED, random_strings
+from datasets import declare
+from harness import Phase, skip_native, run_tests, run_label, ADAPTIVE, MAX_OPS
+from schema import Index, Schema
 
 import warnings
 warnings.filterwarnings('ignore')
 
-# ---------------- INFLUXDB CONFIG ----------------
-INFLUX_URL = "http://localhost:8086"
-INFLUX_TOKEN = os.getenv("INFLUX_TOKEN")
-INFLUX_ORG = os.getenv("INFLUX_ORG")
-INFLUX_BUCKET = os.getenv("INFLUX_BUCKET")
-
-client_influx = InfluxDBClient(
-    url=INFLUX_URL,
-    token=INFLUX_TOKEN,
-    org=INFLUX_ORG
-)
-
-write_api = client_influx.write_api()
-
 # ---------------- CONFIGURATION ----------------
 NUM_OPS = 100  # 100k opérations SET/GET
 TTL_SECONDS = 60  # Time to live pour expiration
 
+KV_FIELDS = {"key": str, "value": str}
+TTL_KEYS = 10000  # Clés session:* avec expiration
+
 # ---------------- GENERATION DE DONNEES ----------------
-def generate_random_key():
-    """Génère une clé aléatoire"""
-    return ''.join(random.choices(string.ascii_letters + string.digits, k=16))
+def kv_columns(ids, seed):
+    """Colonnes clé (16 caractères) / valeur (token de session, 64 caractères)"""
+    return ColumnBatch({
+        "key": random_strings(ids, seed, 1, 16),
+        "value": random_strings(ids, seed, 2, 64)
+    })
+
+# Pré-générés sur disque (datasets.py); sessions TTL: autre graine, valeurs distinctes
+KV_PAIRS = declare("kv_pairs", kv_columns, max(NUM_OPS, MAX_OPS) if ADAPTIVE else NUM_OPS)
+SESSIONS = declare("kv_sessions", kv_columns, TTL_KEYS, seed=SEED + 1)
+
+# GET par clé: index unique (équivalent de l'index primaire _id); Redis et Cassandra: clé primaire
+SCHEMA = Schema({
+    "keyvalue": [Index(("key",), "unique")],
+    "KeyValue": [Index(("key",), "unique")],
+}, probes={"keyvalue": {"key": "warmup:0"}, "KeyValue": {"key": "warmup:0"}})
 
-def generate_random_value():
-    """Génère une valeur aléatoire (token/session)"""
-    return ''.join(random.choices(string.ascii_letters + string.digits, k=64))
+def session_values(count):
+    """Valeurs des clés session:* (TTL)"""
+    return [row["value"] for row in SESSIONS.rows(0, count)]
+
+def set_get_phases(backend, ns, num_ops, results, batch_size=None):
+    """
+    Phases SET/GET communes (interface uniforme des backends).
+    SET unitaire et GET: nombre d'ops adaptatif (Phase.run), les paires sont
+    lues dans KV_PAIRS hors chrono. SET par batch: num_ops clés. Index de
+    SCHEMA posés avant le SET ou entre SET et GET (BENCH_SCHEMA_STAGE).
+    """
+    SCHEMA.provision(backend, ns, results, "before")
+    
+    # 1️⃣ SET
+    print(f"  📝 SET {num_ops if batch_size else run_label(num_ops)} keys...")
+    keys = []
+    
+    def set_args(i):
+        doc = KV_PAIRS[i]
+        keys.append(doc["key"])
+        return ns, doc["key"], doc
+    
+    # Échauffement sur des clés "warmup:*", distinctes des clés mesurées
+    def warmup_set(i):
+        doc = {"key": f"warmup:{i}", "value": KV_PAIRS[-1 - i]["value"]}
+        if batch_size:
+            backend.bulk(ns, [doc])
+        else:
+            backend.put(ns, doc["key"], doc)
+    
+    docs = KV_PAIRS.rows(0, num_ops) if batch_size else None
+    with Phase(results, 'set', num_ops, warmup=warmup_set) as phase:
+        if batch_size:
+            bulk = phase.timer(backend.bulk)  # Latence par batch
+            for i in range(0, num_ops, batch_size):
+                bulk(ns, docs[i:i + batch_size])
+            keys = [doc["key"] for doc in docs]
+        else:
+            phase.run(backend.put, set_args)
+    results['set_latency_ms'] = results['set_latency'] * 1000
+    SCHEMA.provision(backend, ns, results, "after")
+    
+    # 2️⃣ GET
+    print(f"  📖 GET {run_label(num_ops)} keys...")
+    # Échauffement en boucle sur les seules clés "warmup:*" créées par l'échauffement du SET
+    warmed = int(results.get('set_warmup_ops', 0))
+    warmup_get = (lambda i: backend.get(ns, f"warmup:{i % warmed}")) if warmed else None
+    with Phase(results, 'get', num_ops, warmup=warmup_get) as phase:
+        phase.run(backend.get, lambda i: (ns, keys[i % len(keys)]))
+    results['get_latency_ms'] = results['get_latency'] * 1000
 
 # ============================================
 # REDIS - Key-Value (OPTIMAL)
@@ -48,77 +92,34 @@ def generate_random_value():
 def test_redis_keyvalue():
     print("\n🔴 Testing Redis Key-Value...")
     print("  ⚡ Redis est conçu pour cela !")
-    
-    r = redis.Redis(host="localhost", port=6379, decode_responses=True)
-    r.flushdb()
+    backend = get_backend("Redis")
+    backend.reset("kv", key="key", fields=KV_FIELDS)
     
     results = {}
+    set_get_phases(backend, "kv", NUM_OPS, results)
     
-    # 1️⃣ SET Operations
-    print(f"  📝 SET {NUM_OPS} keys...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    mem_start = psutil.virtual_memory().percent
-    
-    keys_data = [(generate_random_key(), generate_random_value()) for _ in range(NUM_OPS)]
-    
-    for key, value in keys_data:
-        r.set(key, value)
-    
-    set_time = time.time() - start
-    results['set_time'] = float(set_time)
-    results['set_throughput'] = float(NUM_OPS / set_time)
-    results['set_latency_ms'] = float((set_time / NUM_OPS) * 1000)
-    results['set_cpu'] = float(psutil.cpu_percent() - cpu_start)
-    results['set_mem'] = float(psutil.virtual_memory().percent - mem_start)
-    print(f"     ✅ Done in {set_time:.2f}s ({results['set_throughput']:.0f} ops/sec)")
-    print(f"     ⏱️  Latency: {results['set_latency_ms']:.4f}ms per operation")
-    
-    # 2️⃣ GET Operations
-    print(f"  📖 GET {NUM_OPS} keys...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    
-    for key, _ in keys_data:
-        r.get(key)
-    
-    get_time = time.time() - start
-    results['get_time'] = float(get_time)
-    results['get_throughput'] = float(NUM_OPS / get_time)
-    results['get_latency_ms'] = float((get_time / NUM_OPS) * 1000)
-    results['get_cpu'] = float(psutil.cpu_percent() - cpu_start)
-    print(f"     ✅ Done in {get_time:.2f}s ({results['get_throughput']:.0f} ops/sec)")
-    print(f"     ⏱️  Latency: {results['get_latency_ms']:.4f}ms per operation")
+    if skip_native(backend, "TTL / pipeline / INFO"):
+        return results
+    r = backend.client
     
     # 3️⃣ SET with TTL (Expiration)
     print(f"  ⏰ SET with TTL ({TTL_SECONDS}s)...")
-    start = time.time()
-    
-    ttl_keys = 10000
-    for i in range(ttl_keys):
-        key = f"session:{i}"
-        value = generate_random_value()
-        r.setex(key, TTL_SECONDS, value)
-    
-    ttl_time = time.time() - start
-    results['ttl_set_time'] = float(ttl_time)
-    results['ttl_throughput'] = float(ttl_keys / ttl_time)
-    print(f"     ✅ Done in {ttl_time:.2f}s ({results['ttl_throughput']:.0f} ops/sec)")
+    ttl_values = session_values(TTL_KEYS)
+    ttl_names = [f"session:{i}" for i in range(TTL_KEYS)]
+    with Phase(results, 'ttl_set', TTL_KEYS) as phase:
+        setex = phase.timer(r.setex)
+        for name, value in zip(ttl_names, ttl_values):
+            setex(name, TTL_SECONDS, value)
+    results['ttl_throughput'] = results['ttl_set_throughput']
     
     # 4️⃣ Pipeline Operations (bulk)
     print(f"  🚀 Pipeline operations...")
-    start = time.time()
-    
-    pipe = r.pipeline()
     pipeline_ops = 50000
-    for i in range(pipeline_ops):
-        pipe.set(f"pipe:{i}", f"value_{i}")
-    pipe.execute()
-    
-    pipeline_time = time.time() - start
-    results['pipeline_time'] = float(pipeline_time)
-    results['pipeline_throughput'] = float(pipeline_ops / pipeline_time)
-    print(f"     ✅ Done in {pipeline_time:.2f}s ({results['pipeline_throughput']:.0f} ops/sec)")
+    with Phase(results, 'pipeline', pipeline_ops):
+        pipe = r.pipeline(transaction=False)
+        for i in range(pipeline_ops):
+            pipe.set(f"pipe:{i}", f"value_{i}")
+        pipe.execute()
     
     # 5️⃣ Memory Info
     info = r.info('memory')
@@ -133,72 +134,28 @@ def test_redis_keyvalue():
 def test_mongodb_keyvalue():
     print("\n🔵 Testing MongoDB Key-Value...")
     print("  ⚠️  MongoDB n'est pas optimal pour simple GET/SET")
-    
-    mongo = MongoClient("mongodb://localhost:27017")
-    db = mongo.testdb
-    collection = db.keyvalue
-    
-    collection.drop()
+    backend = get_backend("MongoDB")
+    backend.reset("keyvalue", key="key", fields=KV_FIELDS)
     
     results = {}
-    
-    # 1️⃣ SET (INSERT)
-    print(f"  📝 SET {NUM_OPS} keys...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    mem_start = psutil.virtual_memory().percent
-    
-    keys_data = [(generate_random_key(), generate_random_value()) for _ in range(NUM_OPS)]
-    docs = [{"_id": key, "value": value} for key, value in keys_data]
-    
-    # Insertion par batch
-    batch_size = 1000
-    for i in range(0, len(docs), batch_size):
-        collection.insert_many(docs[i:i+batch_size])
-    
-    set_time = time.time() - start
-    results['set_time'] = float(set_time)
-    results['set_throughput'] = float(NUM_OPS / set_time)
-    results['set_latency_ms'] = float((set_time / NUM_OPS) * 1000)
-    results['set_cpu'] = float(psutil.cpu_percent() - cpu_start)
-    results['set_mem'] = float(psutil.virtual_memory().percent - mem_start)
-    print(f"     ✅ Done in {set_time:.2f}s ({results['set_throughput']:.0f} ops/sec)")
-    
-    # 2️⃣ GET (FIND)
-    print(f"  📖 GET {NUM_OPS} keys...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    
-    for key, _ in keys_data:
-        collection.find_one({"_id": key})
-    
-    get_time = time.time() - start
-    results['get_time'] = float(get_time)
-    results['get_throughput'] = float(NUM_OPS / get_time)
-    results['get_latency_ms'] = float((get_time / NUM_OPS) * 1000)
-    results['get_cpu'] = float(psutil.cpu_percent() - cpu_start)
-    print(f"     ✅ Done in {get_time:.2f}s ({results['get_throughput']:.0f} ops/sec)")
-    print(f"     ⏱️  Latency: {results['get_latency_ms']:.4f}ms per operation")
+    # Insertion par batch de 1000
+    set_get_phases(backend, "keyvalue", NUM_OPS, results, batch_size=1000)
     
     # 3️⃣ TTL (avec index)
+    if skip_native(backend, "TTL index"):
+        return results
     print(f"  ⏰ Creating TTL index...")
-    start = time.time()
-    
-    # MongoDB TTL index
-    collection.create_index("created_at", expireAfterSeconds=TTL_SECONDS)
-    
     from datetime import datetime
     ttl_docs = [
-        {"_id": f"session:{i}", "value": generate_random_value(), "created_at": datetime.utcnow()}
-        for i in range(10000)
+        {"key": f"session:{i}", "value": value, "created_at": datetime.utcnow()}
+        for i, value in enumerate(session_values(TTL_KEYS))
     ]
-    collection.insert_many(ttl_docs)
-    
-    ttl_time = time.time() - start
-    results['ttl_set_time'] = float(ttl_time)
-    print(f"     ✅ Done in {ttl_time:.2f}s")
+    collection = backend.collection("keyvalue")
+    with Phase(results, 'ttl_set'):
+        # MongoDB TTL index
+        collection.create_index("created_at", expireAfterSeconds=TTL_SECONDS)
+        collection.insert_many(ttl_docs)
     
-    mongo.close()
     return results
 
 # ============================================
@@ -207,69 +164,29 @@ def test_mongodb_keyvalue():
 def test_cassandra_keyvalue():
     print("\n🟣 Testing Cassandra Key-Value...")
     print("  ℹ️  Cassandra peut faire du key-value")
+    backend = get_backend("Cassandra")
+    backend.reset("keyvalue", key="key", fields=KV_FIELDS)
     
     results = {}
-    
-    def run_cql(query):
-        cmd = f'docker exec cassandra cqlsh -e "{query}"'
-        try:
-            result = subprocess.run(cmd, shell=True, capture_output=True, timeout=30)
-            return result.returncode == 0
-        except:
-            return False
-    
-    # Setup
-    run_cql("CREATE KEYSPACE IF NOT EXISTS kvks WITH replication = {'class': 'SimpleStrategy', 'replication_factor': 1}")
-    run_cql("DROP TABLE IF EXISTS kvks.keyvalue")
-    run_cql("CREATE TABLE kvks.keyvalue (key text PRIMARY KEY, value text)")
-    
-    # 1️⃣ SET (INSERT)
-    limited_ops = min(NUM_OPS, 10000)  # Limité pour éviter timeout
-    print(f"  📝 SET {limited_ops} keys (limited)...")
-    start = time.time()
-    cpu_start = psutil.cpu_percent()
-    
-    # Batch insert
-    batch_size = 100
-    for batch_start in range(0, limited_ops, batch_size):
-        batch_queries = []
-        for i in range(batch_start, min(batch_start + batch_size, limited_ops)):
-            key = f"key_{i}"
-            value = generate_random_value()
-            batch_queries.append(f"INSERT INTO kvks.keyvalue (key, value) VALUES ('{key}', '{value}')")
-        
-        batch_query = "BEGIN BATCH " + "; ".join(batch_queries) + "; APPLY BATCH"
-        run_cql(batch_query)
-    
-    set_time = time.time() - start
-    results['set_time'] = float(set_time)
-    results['set_throughput'] = float(limited_ops / set_time)
-    results['set_cpu'] = float(psutil.cpu_percent() - cpu_start)
-    print(f"     ✅ Done in {set_time:.2f}s ({results['set_throughput']:.0f} ops/sec)")
-    
-    # 2️⃣ GET (SELECT)
-    print(f"  📖 GET {min(limited_ops, 1000)} keys...")
-    start = time.time()
-    
-    test_gets = min(limited_ops, 1000)
-    for i in range(test_gets):
-        run_cql(f"SELECT value FROM kvks.keyvalue WHERE key = 'key_{i}'")
-    
-    get_time = time.time() - start
-    results['get_time'] = float(get_time)
-    results['get_throughput'] = float(test_gets / get_time)
-    print(f"     ✅ Done in {get_time:.2f}s ({results['get_throughput']:.0f} ops/sec)")
+    limited_ops = min(NUM_OPS, 10000) if backend.process_per_op else NUM_OPS  # Limité sur le repli cqlsh
+    set_get_phases(backend, "keyvalue", limited_ops, results, batch_size=100)
     
     # 3️⃣ TTL
+    if skip_native(backend, "USING TTL"):
+        return results
     print(f"  ⏰ SET with TTL...")
-    start = time.time()
-    
-    for i in range(100):
-        run_cql(f"INSERT INTO kvks.keyvalue (key, value) VALUES ('ttl_{i}', 'value') USING TTL {TTL_SECONDS}")
-    
-    ttl_time = time.time() - start
-    results['ttl_set_time'] = float(ttl_time)
-    print(f"     ✅ Done in {ttl_time:.2f}s")
+    # Requête préparée hors chrono, en cache par texte (le repli cqlsh n'a pas de requêtes préparées)
+    if backend.process_per_op:
+        statements = [(f"INSERT INTO {backend.table('keyvalue')} (key, value) VALUES ('ttl_{i}', 'value') "
+                       f"USING TTL {TTL_SECONDS}",) for i in range(100)]
+    else:
+        insert = f"INSERT INTO {backend.table('keyvalue')} (key, value) VALUES (?, ?) USING TTL ?"
+        backend.prepare(insert)
+        statements = [(insert, [f"ttl_{i}", "value", TTL_SECONDS]) for i in range(100)]
+    with Phase(results, 'ttl_set', 100) as phase:
+        execute = phase.timer(backend.execute)
+        for args in statements:
+            execute(*args)
     
     return results
 
@@ -279,49 +196,14 @@ def test_cassandra_keyvalue():
 def test_neo4j_keyvalue():
     print("\n🟢 Testing Neo4j Key-Value...")
     print("  ⚠️  Neo4j n'est PAS conçu pour du simple key-value")
-    
-    driver = GraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", "password"))
+    backend = get_backend("Neo4j")
+    backend.reset("KeyValue", key="key", fields=KV_FIELDS)
     
     results = {}
+    limited_ops = min(NUM_OPS, 5000)  # Très limité pour Neo4j
+    set_get_phases(backend, "KeyValue", limited_ops, results)
+    print(f"  ⚠️  Neo4j est très lent pour du key-value simple")
     
-    with driver.session() as session:
-        session.run("MATCH (n:KeyValue) DELETE n")
-        
-        # 1️⃣ SET (CREATE)
-        limited_ops = min(NUM_OPS, 5000)  # Très limité pour Neo4j
-        print(f"  📝 SET {limited_ops} keys (very limited)...")
-        start = time.time()
-        cpu_start = psutil.cpu_percent()
-        
-        for i in range(limited_ops):
-            key = f"key_{i}"
-            value = generate_random_value()
-            session.run(
-                "CREATE (kv:KeyValue {key: $key, value: $value})",
-                key=key, value=value
-            )
-        
-        set_time = time.time() - start
-        results['set_time'] = float(set_time)
-        results['set_throughput'] = float(limited_ops / set_time)
-        results['set_cpu'] = float(psutil.cpu_percent() - cpu_start)
-        print(f"     ✅ Done in {set_time:.2f}s ({results['set_throughput']:.0f} ops/sec)")
-        
-        # 2️⃣ GET (MATCH)
-        print(f"  📖 GET {limited_ops} keys...")
-        start = time.time()
-        
-        for i in range(limited_ops):
-            session.run("MATCH (kv:KeyValue {key: $key}) RETURN kv.value", key=f"key_{i}")
-        
-        get_time = time.time() - start
-        results['get_time'] = float(get_time)
-        results['get_throughput'] = float(limited_ops / get_time)
-        print(f"     ✅ Done in {get_time:.2f}s ({results['get_throughput']:.0f} ops/sec)")
-        
-        print(f"  ⚠️  Neo4j est très lent pour du key-value simple")
-    
-    driver.close()
     return results
 
 # ============================================
@@ -337,7 +219,7 @@ def send_results_to_influx(db_name, results, scenario="scenario4_keyvalue"):
             point.field(key, float(value))
     
     try:
-        write_api.write(bucket=INFLUX_BUCKET, org=INFLUX_ORG, record=point)
+        metrics.write(point)
         print(f"  📊 Résultats envoyés vers InfluxDB pour {db_name}")
     except Exception as e:
         print(f"  ⚠️  Erreur lors de l'envoi vers InfluxDB: {e}")
@@ -345,63 +227,37 @@ def send_results_to_influx(db_name, results, scenario="scenario4_keyvalue"):
 # ============================================
 # MAIN
 # ============================================
-if __name__ == "__main__":
+DB_TESTS = [
+    ("Redis", test_redis_keyvalue),
+    ("MongoDB", test_mongodb_keyvalue),
+    ("Cassandra", test_cassandra_keyvalue),
+    ("Neo4j", test_neo4j_keyvalue),
+]
+
+def run(databases=None):
+    """Exécute le scénario sur les bases sélectionnées (toutes par défaut)"""
     print("="*60)
     print("🔥 SCENARIO 4 - KEY-VALUE ULTRA RAPIDE")
-    print(f"📊 Nombre d'opérations: {NUM_OPS}")
+    print(f"📊 Nombre d'opérations: {run_label(NUM_OPS)}")
     print(f"⏰ TTL: {TTL_SECONDS} secondes")
     print("="*60)
     
+    run_tests(DB_TESTS, send_results_to_influx, databases, scenario="scenario4_keyvalue")
+    
+    print("\n" + "="*60)
+    print("✅ SCENARIO 4 TERMINÉ !")
+    print("📊 Résultats attendus:")
+    print("   🔴 Redis: IMBATTABLE (ultra rapide)")
+    print("   🔵 MongoDB: LENT pour GET/SET simple")
+    print("   🟣 Cassandra: OK mais pas optimal")
+    print("   🟢 Neo4j: TRÈS LENT, inutile")
+    print("📊 Vérifie Grafana sur http://localhost:3000")
+    print("="*60)
+
+if __name__ == "__main__":
     try:
-        # Redis (OPTIMAL)
-        try:
-            print("\n" + "="*60)
-            redis_results = test_redis_keyvalue()
-            send_results_to_influx("Redis", redis_results)
-        except Exception as e:
-            print(f"❌ Erreur Redis: {e}")
-        
-        time.sleep(2)
-        
-        # MongoDB (SUBOPTIMAL)
-        try:
-            print("\n" + "="*60)
-            mongo_results = test_mongodb_keyvalue()
-            send_results_to_influx("MongoDB", mongo_results)
-        except Exception as e:
-            print(f"❌ Erreur MongoDB: {e}")
-        
-        time.sleep(2)
-        
-        # Cassandra (OK)
-        try:
-            print("\n" + "="*60)
-            cassandra_results = test_cassandra_keyvalue()
-            send_results_to_influx("Cassandra", cassandra_results)
-        except Exception as e:
-            print(f"❌ Erreur Cassandra: {e}")
-        
-        time.sleep(2)
-        
-        # Neo4j (NOT SUITABLE)
-        try:
-            print("\n" + "="*60)
-            neo4j_results = test_neo4j_keyvalue()
-            send_results_to_influx("Neo4j", neo4j_results)
-        except Exception as e:
-            print(f"❌ Erreur Neo4j: {e}")
-        
-        print("\n" + "="*60)
-        print("✅ SCENARIO 4 TERMINÉ !")
-        print("📊 Résultats attendus:")
-        print("   🔴 Redis: IMBATTABLE (ultra rapide)")
-        print("   🔵 MongoDB: LENT pour GET/SET simple")
-        print("   🟣 Cassandra: OK mais pas optimal")
-        print("   🟢 Neo4j: TRÈS LENT, inutile")
-        print("📊 Vérifie Grafana sur http://localhost:3000")
-        print("="*60)
-        
+        run()
     finally:
-        write_api.close()
-        client_influx.close()
-        print("🔒 Connexion InfluxDB fermée proprement")
\ No newline at end of file
+        # Fermer proprement la connexion InfluxDB
+        metrics.close()
+        print("🔒 Connexion InfluxDB fermée proprement")
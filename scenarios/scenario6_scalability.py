@@ -1,370 +1,356 @@
-import time
-import psutil
-from influxdb_client import InfluxDBClient, Point
-from pymongo import MongoClient
-import redis
-from neo4j import GraphDatabase
+from influxdb_client import Point
+import asyncio
+import os
 import random
-import subprocess
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-import threading
-from dotenv import load_dotenv
-import os
-
-load_dotenv()
 
-INFLUX_URL = os.getenv("INFLUX_URL")
-INFLUX_TOKEN = os.getenv("INFLUX_TOKEN")
-INFLUX_ORG = os.getenv("INFLUX_ORG")
-INFLUX_BUCKET = os.getenv("INFLUX_BUCKET")
+import metrics
+from backends import get_backend, ASYNC_POOL_SIZE, NotSupportedError
+from datagen import ColumnBatch, integers, with_ids
+from datasets import declare
+from harness import Phase, run_tests
+from schema import Index, Schema
+from loadgen import arrival_schedule, raise_fd_limit, run_open_loop, run_in_processes
 
 import warnings
 warnings.filterwarnings('ignore')
 
-# ---------------- INFLUXDB CONFIG ----------------
-INFLUX_URL = "http://localhost:8086"
-INFLUX_TOKEN = "HicGzaKcJ-tiqSLYWGKaD6k74WKoOS0as4aLppGdcW3DNRashMrWRjF7QHn-I8N63yYMLAPe_sSjsckmunLE-w=="
-INFLUX_ORG = "ensa"
-INFLUX_BUCKET = "bench"
-
-client_influx = InfluxDBClient(
-    url=INFLUX_URL,
-    token=INFLUX_TOKEN,
-    org=INFLUX_ORG
-)
-
-write_api = client_influx.write_api()
-
 # ---------------- CONFIGURATION ----------------
 THREAD_COUNTS = [1, 5, 10, 20, 50]  # Nombre de threads à tester
 OPS_PER_THREAD = 1000  # Opérations par thread
 
-# Thread-local storage pour les connexions
-thread_local = threading.local()
+# Modes de charge (liste): "closed" (threads), "open" (débit imposé), "async" (asyncio),
+# "process" (plusieurs processus, hors GIL)
+LOAD_MODES = os.getenv("SCALABILITY_MODE", "closed,open,async,process").split(",")
+OPEN_LOOP_RATES = [int(r) for r in os.getenv("OPEN_LOOP_RATES", "500,1000,2000,5000,10000").split(",")]  # ops/s offerts
+OPEN_LOOP_DURATION = float(os.getenv("OPEN_LOOP_DURATION", "5"))  # Secondes par palier de débit
+OPEN_LOOP_ARRIVALS = os.getenv("OPEN_LOOP_ARRIVALS", "poisson")  # "poisson" ou "constant"
+OPEN_LOOP_WORKERS = int(os.getenv("OPEN_LOOP_WORKERS", "64"))  # Requêtes simultanées max
+OPEN_LOOP_KEYS = 1000  # Documents préchargés (hors mesure) pour les lectures/mises à jour
+READ_RATIO = 0.5
+SEED = 42
+ASYNC_CONCURRENCY = [int(c) for c in os.getenv("ASYNC_CONCURRENCY", "100,500,1000,5000,10000").split(",")]  # Requêtes en vol
+ASYNC_TOTAL_OPS = int(os.getenv("ASYNC_TOTAL_OPS", "20000"))  # INSERT+READ par palier, répartis entre clients
+PROCESS_COUNTS = [int(p) for p in os.getenv("PROCESS_COUNTS", "1,2,4,8").split(",")]  # Processus de charge
+PROCESS_THREADS = int(os.getenv("PROCESS_THREADS", "4"))  # Threads par processus
+PROCESS_PIN_CPUS = os.getenv("PROCESS_PIN_CPUS", "0") == "1"  # Un CPU par processus (Linux)
 
 # ---------------- DONNEES DE TEST ----------------
-def generate_test_doc(doc_id):
-    """Génère un document de test"""
-    return {
-        "doc_id": doc_id,
-        "name": f"Document_{doc_id}",
-        "value": random.randint(1, 1000),
-        "data": f"Data_{doc_id}_" + "x" * 50
-    }
+NAMESPACE = "scalability_test"
+DOC_FIELDS = {"doc_id": int, "name": str, "value": int, "data": str}
+
+# Lectures par doc_id (Cassandra, Redis: clé primaire)
+SCHEMA = Schema({NAMESPACE: [Index(("doc_id",))]}, probes={NAMESPACE: {"doc_id": 0}})
+
+def doc_columns(ids, seed):
+    """Colonnes des documents de test (doc_id, name, value, data)"""
+    return ColumnBatch({
+        "doc_id": ids,
+        "name": with_ids("Document_", ids),
+        "value": integers(ids, seed, 1, 1, 1001),
+        "data": with_ids("Data_", ids, "_" + "x" * 50)
+    })
+
+# Ids des workers en boucle fermée; au-delà (et ids négatifs), générés à la volée
+DOCS = declare("scalability_docs", doc_columns, max(THREAD_COUNTS) * OPS_PER_THREAD)
 
 # ============================================
-# MONGODB - Scalability Tests
+# WORKER GENERIQUE (interface commune des backends)
 # ============================================
-def mongodb_worker(worker_id, num_ops):
-    """Worker MongoDB pour un thread"""
-    # Connexion thread-safe
-    if not hasattr(thread_local, 'mongo'):
-        thread_local.mongo = MongoClient("mongodb://localhost:27017")
-    
-    db = thread_local.mongo.testdb
-    collection = db.scalability_test
-    
+def backend_worker(db_name, worker_id, num_ops, phase):
+    """Worker pour un thread: INSERT puis READ de chaque document"""
+    # Backend partagé: connexions poolées, thread-safe
+    backend = get_backend(db_name)
+    put = phase.timer(backend.put)
+    get = phase.timer(backend.get)
     ops_done = 0
     
     for i in range(num_ops):
         doc_id = worker_id * num_ops + i
         
         # INSERT
-        doc = generate_test_doc(doc_id)
-        collection.insert_one(doc)
+        doc = DOCS[doc_id]
+        put(NAMESPACE, doc_id, doc)
         ops_done += 1
         
         # READ
-        collection.find_one({"doc_id": doc_id})
+        get(NAMESPACE, doc_id)
         ops_done += 1
     
     return ops_done
 
-def test_mongodb_scalability():
-    print("\n🔵 Testing MongoDB Scalability...")
-    
-    mongo = MongoClient("mongodb://localhost:27017")
-    db = mongo.testdb
-    collection = db.scalability_test
-    
+def mongodb_worker(worker_id, num_ops, phase):
+    return backend_worker("MongoDB", worker_id, num_ops, phase)
+
+def redis_worker(worker_id, num_ops, phase):
+    return backend_worker("Redis", worker_id, num_ops, phase)
+
+def cassandra_worker(worker_id, num_ops, phase):
+    return backend_worker("Cassandra", worker_id, num_ops, phase)
+
+def neo4j_worker(worker_id, num_ops, phase):
+    return backend_worker("Neo4j", worker_id, num_ops, phase)
+
+def provision(backend, results):
+    """
+    Index de SCHEMA sur le namespace vide: écritures et lectures sont mêlées,
+    sans chargement séparé, donc before et after se confondent (none: sans index)
+    """
+    SCHEMA.provision(backend, NAMESPACE, results, "before")
+    SCHEMA.provision(backend, NAMESPACE, results, "after")
+
+def run_scalability(db_name, worker, thread_counts, ops_per_thread):
+    """Lance le worker avec un nombre croissant de threads"""
+    backend = get_backend(db_name)
     results = {}
     
-    for num_threads in THREAD_COUNTS:
-        print(f"\n  📊 Testing with {num_threads} thread(s)...")
+    def warmup(i):
+        # Ids négatifs: hors des documents mesurés
+        doc = DOCS[-1 - i]
+        backend.put(NAMESPACE, doc["doc_id"], doc)
+        backend.get(NAMESPACE, doc["doc_id"])
+    
+    for num_threads in thread_counts:
+        print(f"\n  📊 Testing with {num_threads} thread(s) ({ops_per_thread} ops/thread)...")
         
         # Nettoyer
-        collection.drop()
-        collection.create_index([("doc_id", 1)])
-        
-        start_time = time.time()
-        cpu_start = psutil.cpu_percent(interval=0.1)
-        mem_start = psutil.virtual_memory().percent
-        
-        # Lancer les threads
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
-            futures = [
-                executor.submit(mongodb_worker, i, OPS_PER_THREAD)
-                for i in range(num_threads)
-            ]
-            
-            total_ops = sum(f.result() for f in as_completed(futures))
-        
-        elapsed = time.time() - start_time
-        cpu_used = psutil.cpu_percent(interval=0.1) - cpu_start
-        mem_used = psutil.virtual_memory().percent - mem_start
-        
-        throughput = total_ops / elapsed
-        
-        results[f'threads_{num_threads}_time'] = float(elapsed)
-        results[f'threads_{num_threads}_throughput'] = float(throughput)
-        results[f'threads_{num_threads}_cpu'] = float(cpu_used)
-        results[f'threads_{num_threads}_mem'] = float(mem_used)
-        results[f'threads_{num_threads}_total_ops'] = float(total_ops)
-        
-        print(f"     ✅ {num_threads} threads: {elapsed:.2f}s ({throughput:.0f} ops/sec)")
-        print(f"        CPU: {cpu_used:.1f}%, MEM: {mem_used:.1f}%")
+        backend.reset(NAMESPACE, key="doc_id", fields=DOC_FIELDS)
+        provision(backend, results)
+        
+        prefix = f'threads_{num_threads}'
+        with Phase(results, prefix, warmup=warmup) as phase:
+            # Lancer les threads
+            with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                futures = [
+                    executor.submit(worker, i, ops_per_thread, phase)
+                    for i in range(num_threads)
+                ]
+                
+                total_ops = sum(f.result() for f in as_completed(futures))
+            phase.ops = total_ops
+        
+        results[f'{prefix}_total_ops'] = float(total_ops)
+        print(f"        CPU: {results[f'{prefix}_cpu']:.1f}%, MEM: {results[f'{prefix}_mem']:.1f}%")
+    
+    return results
+
+def run_open_loop_sweep(db_name, rates, duration):
+    """
+    Balayage de débits offerts en boucle ouverte: lectures / mises à jour
+    aléatoires planifiées à `rate` ops/s, latence mesurée depuis l'instant prévu.
+    Champs: rate_{r}_offered, rate_{r}_throughput (atteint), rate_{r}_p99_ms
+    (temps de réponse), rate_{r}_service_p99_ms (temps de service seul)...
+    """
+    backend = get_backend(db_name)
+    results = {}
+    
+    # Précharger les documents (hors mesure)
+    backend.reset(NAMESPACE, key="doc_id", fields=DOC_FIELDS)
+    SCHEMA.provision(backend, NAMESPACE, results, "before")
+    backend.bulk(NAMESPACE, DOCS.rows(0, OPEN_LOOP_KEYS))
+    SCHEMA.provision(backend, NAMESPACE, results, "after")
+    
+    for rate in rates:
+        num_ops = max(1, int(rate * duration))
+        print(f"\n  📈 Open loop: {rate} ops/s offerts ({OPEN_LOOP_ARRIVALS}, {num_ops} ops)...")
+        
+        # Planning, clés et champs mis à jour générés avant la mesure
+        rng = random.Random(SEED + rate)
+        schedule = arrival_schedule(rate, num_ops, OPEN_LOOP_ARRIVALS, seed=SEED + rate)
+        keys = [rng.randrange(OPEN_LOOP_KEYS) for _ in range(num_ops)]
+        updates = [None if rng.random() < READ_RATIO else {"value": rng.randint(1, 1000)} for _ in keys]
+        
+        def op(i):
+            # Mise à jour en place (pas put: insert_one / CREATE dupliqueraient
+            # les documents et feraient grossir le jeu d'un palier à l'autre)
+            if updates[i] is None:
+                backend.get(NAMESPACE, keys[i])
+            else:
+                backend.update(NAMESPACE, keys[i], updates[i])
+        
+        prefix = f'rate_{rate}'
+        with Phase(results, prefix, num_ops) as phase:
+            service = run_open_loop(op, schedule, phase, workers=OPEN_LOOP_WORKERS)
+        results.update(service.fields(f'{prefix}_service'))
+        results[f'{prefix}_offered'] = float(rate)
+        
+        if results[f'{prefix}_throughput'] < rate * 0.9:
+            print(f"        ⚠️  Saturation: {results[f'{prefix}_throughput']:.0f} ops/s atteints pour {rate} offerts")
+        print(f"        Service p99: {results[f'{prefix}_service_p99_ms']:.3f}ms "
+              f"(réponse p99: {results[f'{prefix}_p99_ms']:.3f}ms)")
     
-    mongo.close()
     return results
 
 # ============================================
-# REDIS - Scalability Tests
+# CLIENTS ASYNCIO (milliers de requêtes en vol, un seul thread)
 # ============================================
-def redis_worker(worker_id, num_ops):
-    """Worker Redis pour un thread"""
-    # Connexion thread-safe
-    if not hasattr(thread_local, 'redis'):
-        thread_local.redis = redis.Redis(host="localhost", port=6379, decode_responses=True)
-    
-    r = thread_local.redis
+async def async_client(backend, client_id, num_ops, phase):
+    """Client asyncio: INSERT puis READ de chaque document, comme backend_worker"""
+    record = phase.record
+    clock = time.perf_counter_ns
     ops_done = 0
     
     for i in range(num_ops):
-        doc_id = worker_id * num_ops + i
+        doc_id = client_id * num_ops + i
+        doc = DOCS[doc_id]
         
-        # INSERT (SET)
-        doc = generate_test_doc(doc_id)
-        r.hset(f"doc:{doc_id}", mapping=doc)
-        ops_done += 1
+        start = clock()
+        await backend.aput(NAMESPACE, doc_id, doc)
+        record(clock() - start)
         
-        # READ (GET)
-        r.hgetall(f"doc:{doc_id}")
-        ops_done += 1
+        start = clock()
+        await backend.aget(NAMESPACE, doc_id)
+        record(clock() - start)
+        ops_done += 2
     
     return ops_done
 
-def test_redis_scalability():
-    print("\n🔴 Testing Redis Scalability...")
-    
-    r = redis.Redis(host="localhost", port=6379, decode_responses=True)
-    r.flushdb()
-    
+async def async_sweep(db_name, concurrency_levels, total_ops):
+    backend = get_backend(db_name)
     results = {}
-    
-    for num_threads in THREAD_COUNTS:
-        print(f"\n  📊 Testing with {num_threads} thread(s)...")
-        
-        # Nettoyer
-        r.flushdb()
-        
-        start_time = time.time()
-        cpu_start = psutil.cpu_percent(interval=0.1)
-        mem_start = psutil.virtual_memory().percent
-        
-        # Lancer les threads
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
-            futures = [
-                executor.submit(redis_worker, i, OPS_PER_THREAD)
-                for i in range(num_threads)
-            ]
+    # Une socket par connexion du pool: ulimit -n (souvent 1024) relevé avant le premier palier
+    raise_fd_limit(min(max(concurrency_levels), ASYNC_POOL_SIZE))
+    for num_clients in concurrency_levels:
+        ops_per_client = max(1, total_ops // num_clients)
+        # Pool async à la taille du palier: sinon les requêtes au-delà du pool
+        # attendent une connexion côté client et cette attente compte comme latence
+        in_flight = min(num_clients, ASYNC_POOL_SIZE)
+        print(f"\n  ⚡ asyncio: {num_clients} requêtes en vol ({ops_per_client} ops/client)...")
+        if in_flight < num_clients:
+            print(f"        ⚠️  Pool plafonné à {in_flight} connexions (BENCH_ASYNC_POOL_SIZE)")
+        
+        # Nettoyer (hors mesure)
+        backend.reset(NAMESPACE, key="doc_id", fields=DOC_FIELDS)
+        provision(backend, results)
+        
+        await backend.aopen(in_flight)
+        try:
+            # Connexions ouvertes à la demande par les drivers: une lecture hors chrono
+            # par client, toutes en vol, remplit le pool avant la mesure
+            await asyncio.gather(*(backend.aget(NAMESPACE, -1 - i) for i in range(num_clients)))
             
-            total_ops = sum(f.result() for f in as_completed(futures))
-        
-        elapsed = time.time() - start_time
-        cpu_used = psutil.cpu_percent(interval=0.1) - cpu_start
-        mem_used = psutil.virtual_memory().percent - mem_start
-        
-        throughput = total_ops / elapsed
-        
-        results[f'threads_{num_threads}_time'] = float(elapsed)
-        results[f'threads_{num_threads}_throughput'] = float(throughput)
-        results[f'threads_{num_threads}_cpu'] = float(cpu_used)
-        results[f'threads_{num_threads}_mem'] = float(mem_used)
-        results[f'threads_{num_threads}_total_ops'] = float(total_ops)
-        
-        print(f"     ✅ {num_threads} threads: {elapsed:.2f}s ({throughput:.0f} ops/sec)")
-        print(f"        CPU: {cpu_used:.1f}%, MEM: {mem_used:.1f}%")
-    
+            prefix = f'async_{num_clients}'
+            with Phase(results, prefix) as phase:
+                counts = await asyncio.gather(*(
+                    async_client(backend, i, ops_per_client, phase) for i in range(num_clients)
+                ))
+                total = sum(counts)
+                phase.ops = total
+        finally:
+            await backend.aclose()
+        
+        results[f'{prefix}_total_ops'] = float(total)
+        results[f'{prefix}_in_flight'] = float(in_flight)
+        print(f"        CPU: {results[f'{prefix}_cpu']:.1f}%, MEM: {results[f'{prefix}_mem']:.1f}%")
     return results
 
+def run_async_scalability(db_name, concurrency_levels, total_ops):
+    """
+    Même mesure que run_scalability avec des clients asyncio (drivers async)
+    au lieu de threads. Champs async_{n}_* alignés sur threads_{n}_*.
+    """
+    try:
+        return asyncio.run(async_sweep(db_name, concurrency_levels, total_ops))
+    except NotSupportedError as e:
+        print(f"  ⏭️  asyncio: ignoré ({e})")
+        return {}
+
 # ============================================
-# CASSANDRA - Scalability Tests
+# PROCESSUS DE CHARGE (hors GIL)
 # ============================================
-def cassandra_worker(worker_id, num_ops):
-    """Worker Cassandra pour un thread"""
-    ops_done = 0
-    
-    def run_cql(query):
-        cmd = f'docker exec cassandra cqlsh -e "{query}"'
-        try:
-            result = subprocess.run(cmd, shell=True, capture_output=True, timeout=10)
-            return result.returncode == 0
-        except:
-            return False
-    
-    for i in range(num_ops):
-        doc_id = worker_id * num_ops + i
-        doc = generate_test_doc(doc_id)
-        
-        # INSERT
-        query = f"INSERT INTO scaleks.docs (doc_id, name, value, data) VALUES ({doc['doc_id']}, '{doc['name']}', {doc['value']}, '{doc['data']}')"
-        if run_cql(query):
-            ops_done += 1
-        
-        # READ
-        query = f"SELECT * FROM scaleks.docs WHERE doc_id = {doc_id}"
-        if run_cql(query):
-            ops_done += 1
-    
-    return ops_done
+def process_worker(db_name, process_id, num_threads, ops_per_thread, ready):
+    """Exécuté dans un processus fils: ses propres connexions, num_threads workers"""
+    get_backend(db_name).ping()
+    # Jeu de données ouvert (empreinte, mmap) avant la barrière, hors chrono
+    DOCS.open()
+    # Phase utilisée comme simple enregistreur (timer), le chrono est côté parent
+    phase = Phase({}, "process")
+    ready()
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        futures = [
+            executor.submit(backend_worker, db_name, process_id * num_threads + t, ops_per_thread, phase)
+            for t in range(num_threads)
+        ]
+        ops = sum(f.result() for f in futures)
+    return ops, phase.recorder.merged()
 
-def test_cassandra_scalability():
-    print("\n🟣 Testing Cassandra Scalability...")
-    print("  ⚠️  Test limité (docker exec est lent)")
-    
-    def run_cql(query):
-        cmd = f'docker exec cassandra cqlsh -e "{query}"'
-        try:
-            result = subprocess.run(cmd, shell=True, capture_output=True, timeout=30)
-            return result.returncode == 0
-        except:
-            return False
-    
-    # Setup
-    run_cql("CREATE KEYSPACE IF NOT EXISTS scaleks WITH replication = {'class': 'SimpleStrategy', 'replication_factor': 1}")
-    run_cql("DROP TABLE IF EXISTS scaleks.docs")
-    run_cql("""CREATE TABLE scaleks.docs (
-        doc_id int PRIMARY KEY,
-        name text,
-        value int,
-        data text
-    )""")
-    
+def run_process_scalability(db_name, process_counts, threads_per_process, ops_per_thread):
+    """
+    Même charge que run_scalability, répartie sur plusieurs processus.
+    Champs procs_{n}_* (n processus de threads_per_process threads).
+    """
+    backend = get_backend(db_name)
     results = {}
     
-    # Test avec moins de threads pour Cassandra
-    limited_threads = [1, 5, 10]
-    limited_ops = 100  # Réduit pour éviter timeout
-    
-    for num_threads in limited_threads:
-        print(f"\n  📊 Testing with {num_threads} thread(s) ({limited_ops} ops/thread)...")
-        
-        # Nettoyer
-        run_cql("TRUNCATE scaleks.docs")
-        
-        start_time = time.time()
-        cpu_start = psutil.cpu_percent(interval=0.1)
-        
-        # Lancer les threads
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
-            futures = [
-                executor.submit(cassandra_worker, i, limited_ops)
-                for i in range(num_threads)
-            ]
-            
-            total_ops = sum(f.result() for f in as_completed(futures))
+    for num_procs in process_counts:
+        print(f"\n  🧩 {num_procs} processus x {threads_per_process} threads ({ops_per_thread} ops/thread)"
+              f"{', CPU fixés' if PROCESS_PIN_CPUS else ''}...")
         
-        elapsed = time.time() - start_time
-        cpu_used = psutil.cpu_percent(interval=0.1) - cpu_start
+        # Nettoyer (hors mesure)
+        backend.reset(NAMESPACE, key="doc_id", fields=DOC_FIELDS)
+        provision(backend, results)
         
-        throughput = total_ops / elapsed if elapsed > 0 else 0
+        prefix = f'procs_{num_procs}'
+        args_list = [(db_name, p, threads_per_process, ops_per_thread) for p in range(num_procs)]
+        total_ops = run_in_processes(process_worker, args_list, results, prefix, pin_cpus=PROCESS_PIN_CPUS)
         
-        results[f'threads_{num_threads}_time'] = float(elapsed)
-        results[f'threads_{num_threads}_throughput'] = float(throughput)
-        results[f'threads_{num_threads}_cpu'] = float(cpu_used)
-        results[f'threads_{num_threads}_total_ops'] = float(total_ops)
-        
-        print(f"     ✅ {num_threads} threads: {elapsed:.2f}s ({throughput:.0f} ops/sec)")
-        print(f"        CPU: {cpu_used:.1f}%")
+        results[f'{prefix}_total_ops'] = float(total_ops)
+        print(f"        CPU: {results[f'{prefix}_cpu']:.1f}%, MEM: {results[f'{prefix}_mem']:.1f}%")
     
     return results
 
+def run_load(db_name, worker, thread_counts, ops_per_thread, rates, concurrency_levels, async_ops,
+             process_counts=PROCESS_COUNTS):
+    """Boucle fermée (threads), boucle ouverte, asyncio et/ou multi-processus selon LOAD_MODES"""
+    results = {}
+    if "closed" in LOAD_MODES:
+        results.update(run_scalability(db_name, worker, thread_counts, ops_per_thread))
+    if "open" in LOAD_MODES:
+        results.update(run_open_loop_sweep(db_name, rates, OPEN_LOOP_DURATION))
+    if "async" in LOAD_MODES and concurrency_levels:
+        results.update(run_async_scalability(db_name, concurrency_levels, async_ops))
+    if "process" in LOAD_MODES and process_counts:
+        results.update(run_process_scalability(db_name, process_counts, PROCESS_THREADS, ops_per_thread))
+    return results
+
 # ============================================
-# NEO4J - Scalability Tests
+# MONGODB - Scalability Tests
 # ============================================
-def neo4j_worker(worker_id, num_ops):
-    """Worker Neo4j pour un thread"""
-    driver = GraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", "password"))
-    ops_done = 0
-    
-    with driver.session() as session:
-        for i in range(num_ops):
-            doc_id = worker_id * num_ops + i
-            doc = generate_test_doc(doc_id)
-            
-            # INSERT (CREATE)
-            session.run(
-                "CREATE (d:Doc {doc_id: $doc_id, name: $name, value: $value, data: $data})",
-                **doc
-            )
-            ops_done += 1
-            
-            # READ (MATCH)
-            session.run("MATCH (d:Doc {doc_id: $doc_id}) RETURN d", doc_id=doc_id)
-            ops_done += 1
-    
-    driver.close()
-    return ops_done
+def test_mongodb_scalability():
+    print("\n🔵 Testing MongoDB Scalability...")
+    return run_load("MongoDB", mongodb_worker, THREAD_COUNTS, OPS_PER_THREAD, OPEN_LOOP_RATES,
+                    ASYNC_CONCURRENCY, ASYNC_TOTAL_OPS)
+
+# ============================================
+# REDIS - Scalability Tests
+# ============================================
+def test_redis_scalability():
+    print("\n🔴 Testing Redis Scalability...")
+    return run_load("Redis", redis_worker, THREAD_COUNTS, OPS_PER_THREAD, OPEN_LOOP_RATES,
+                    ASYNC_CONCURRENCY, ASYNC_TOTAL_OPS)
 
+# ============================================
+# CASSANDRA - Scalability Tests
+# ============================================
+def test_cassandra_scalability():
+    print("\n🟣 Testing Cassandra Scalability...")
+    if get_backend("Cassandra").process_per_op:
+        # Repli cqlsh: un processus par requête, test réduit
+        print("  ⚠️  Test limité (docker exec est lent)")
+        return run_load("Cassandra", cassandra_worker, [1, 5, 10], 100, [2, 5], [], 0, [])
+    return run_load("Cassandra", cassandra_worker, THREAD_COUNTS, OPS_PER_THREAD, OPEN_LOOP_RATES,
+                    ASYNC_CONCURRENCY, ASYNC_TOTAL_OPS)
+
+# ============================================
+# NEO4J - Scalability Tests
+# ============================================
 def test_neo4j_scalability():
     print("\n🟢 Testing Neo4j Scalability...")
     print("  ⚠️  Neo4j a des limitations en multi-threading")
-    
-    driver = GraphDatabase.driver("bolt://localhost:7687", auth=("neo4j", "password"))
-    
-    with driver.session() as session:
-        session.run("MATCH (n:Doc) DELETE n")
-    
-    driver.close()
-    
-    results = {}
-    
     # Test avec moins de threads pour Neo4j
-    limited_threads = [1, 5, 10]
-    limited_ops = 200  # Réduit
-    
-    for num_threads in limited_threads:
-        print(f"\n  📊 Testing with {num_threads} thread(s) ({limited_ops} ops/thread)...")
-        
-        start_time = time.time()
-        cpu_start = psutil.cpu_percent(interval=0.1)
-        mem_start = psutil.virtual_memory().percent
-        
-        # Lancer les threads
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
-            futures = [
-                executor.submit(neo4j_worker, i, limited_ops)
-                for i in range(num_threads)
-            ]
-            
-            total_ops = sum(f.result() for f in as_completed(futures))
-        
-        elapsed = time.time() - start_time
-        cpu_used = psutil.cpu_percent(interval=0.1) - cpu_start
-        mem_used = psutil.virtual_memory().percent - mem_start
-        
-        throughput = total_ops / elapsed
-        
-        results[f'threads_{num_threads}_time'] = float(elapsed)
-        results[f'threads_{num_threads}_throughput'] = float(throughput)
-        results[f'threads_{num_threads}_cpu'] = float(cpu_used)
-        results[f'threads_{num_threads}_mem'] = float(mem_used)
-        results[f'threads_{num_threads}_total_ops'] = float(total_ops)
-        
-        print(f"     ✅ {num_threads} threads: {elapsed:.2f}s ({throughput:.0f} ops/sec)")
-        print(f"        CPU: {cpu_used:.1f}%, MEM: {mem_used:.1f}%")
-    
-    return results
+    return run_load("Neo4j", neo4j_worker, [1, 5, 10], 200, [r for r in OPEN_LOOP_RATES if r <= 2000],
+                    [c for c in ASYNC_CONCURRENCY if c <= 1000], 2000, [p for p in PROCESS_COUNTS if p <= 4])
 
 # ============================================
 # ENVOI DES RESULTATS
@@ -378,7 +364,7 @@ def send_results_to_influx(db_name, results, scenario="scenario6_scalability"):
             point.field(key, float(value))
     
     try:
-        write_api.write(bucket=INFLUX_BUCKET, org=INFLUX_ORG, record=point)
+        metrics.write(point)
         print(f"  📊 Résultats envoyés vers InfluxDB pour {db_name}")
     except Exception as e:
         print(f"  ⚠️  Erreur lors de l'envoi vers InfluxDB: {e}")
@@ -386,63 +372,40 @@ def send_results_to_influx(db_name, results, scenario="scenario6_scalability"):
 # ============================================
 # MAIN
 # ============================================
-if __name__ == "__main__":
+DB_TESTS = [
+    ("Redis", test_redis_scalability),
+    ("MongoDB", test_mongodb_scalability),
+    ("Cassandra", test_cassandra_scalability),
+    ("Neo4j", test_neo4j_scalability),
+]
+
+def run(databases=None):
+    """Exécute le scénario sur les bases sélectionnées (toutes par défaut)"""
     print("="*60)
     print("🔥 SCENARIO 6 - SCALABILITÉ HORIZONTALE (MULTI-THREADING)")
     print(f"📊 Threads testés: {THREAD_COUNTS}")
     print(f"📊 Opérations par thread: {OPS_PER_THREAD}")
+    print(f"📊 Modes: {', '.join(LOAD_MODES)} (débits offerts: {OPEN_LOOP_RATES} ops/s, {OPEN_LOOP_ARRIVALS})")
+    print(f"📊 Requêtes en vol (asyncio): {ASYNC_CONCURRENCY}")
+    print(f"📊 Processus: {PROCESS_COUNTS} x {PROCESS_THREADS} threads")
     print("="*60)
     
+    run_tests(DB_TESTS, send_results_to_influx, databases, scenario="scenario6_scalability")
+    
+    print("\n" + "="*60)
+    print("✅ SCENARIO 6 TERMINÉ !")
+    print("📊 Résultats attendus:")
+    print("   🔴 Redis: EXCELLENT (très rapide, scalable)")
+    print("   🔵 MongoDB: BON (bonne scalabilité)")
+    print("   🟣 Cassandra: EXCELLENT (driver natif, requêtes préparées)")
+    print("   🟢 Neo4j: LIMITÉ (contraintes multi-threading)")
+    print("📊 Vérifie Grafana sur http://localhost:3000")
+    print("="*60)
+
+if __name__ == "__main__":
     try:
-        # Redis (EXCELLENT)
-        try:
-            print("\n" + "="*60)
-            redis_results = test_redis_scalability()
-            send_results_to_influx("Redis", redis_results)
-        except Exception as e:
-            print(f"❌ Erreur Redis: {e}")
-        
-        time.sleep(2)
-        
-        # MongoDB (GOOD)
-        try:
-            print("\n" + "="*60)
-            mongo_results = test_mongodb_scalability()
-            send_results_to_influx("MongoDB", mongo_results)
-        except Exception as e:
-            print(f"❌ Erreur MongoDB: {e}")
-        
-        time.sleep(2)
-        
-        # Cassandra (EXCELLENT mais limité par docker exec)
-        try:
-            print("\n" + "="*60)
-            cassandra_results = test_cassandra_scalability()
-            send_results_to_influx("Cassandra", cassandra_results)
-        except Exception as e:
-            print(f"❌ Erreur Cassandra: {e}")
-        
-        time.sleep(2)
-        
-        # Neo4j (LIMITED)
-        try:
-            print("\n" + "="*60)
-            neo4j_results = test_neo4j_scalability()
-            send_results_to_influx("Neo4j", neo4j_results)
-        except Exception as e:
-            print(f"❌ Erreur Neo4j: {e}")
-        
-        print("\n" + "="*60)
-        print("✅ SCENARIO 6 TERMINÉ !")
-        print("📊 Résultats attendus:")
-        print("   🔴 Redis: EXCELLENT (très rapide, scalable)")
-        print("   🔵 MongoDB: BON (bonne scalabilité)")
-        print("   🟣 Cassandra: EXCELLENT en production (limité ici par docker)")
-        print("   🟢 Neo4j: LIMITÉ (contraintes multi-threading)")
-        print("📊 Vérifie Grafana sur http://localhost:3000")
-        print("="*60)
-        
+        run()
     finally:
-        write_api.close()
-        client_influx.close()
-        print("🔒 Connexion InfluxDB fermée proprement")
\ No newline at end of file
+        # Fermer proprement la connexion InfluxDB
+        metrics.close()
+        print("🔒 Connexion InfluxDB fermée proprement")
@@ -0,0 +1,139 @@
+"""
+Schéma déclaratif des scénarios: index, contraintes d'unicité et TTL, posés
+par une étape de provisionnement chronométrée à part des phases mesurées.
+
+Chaque scénario déclare ses namespaces indexés (mêmes noms que reset()) et,
+pour chacun, une requête sonde dont le plan d'exécution est relevé:
+
+    SCHEMA = Schema({
+        "users_crud": [Index(("user_id",), "unique")],
+    }, probes={"users_crud": {"user_id": 0}})
+
+    backend.reset("users_crud", key="user_id", fields=USER_FIELDS)
+    SCHEMA.provision(backend, "users_crud", results, "before")   # namespace vide
+    ... chargement ...
+    SCHEMA.provision(backend, "users_crud", results, "after")    # données chargées
+
+BENCH_SCHEMA_STAGE choisit le moment de la création:
+    before  avant le chargement (le coût de maintenance pèse sur les insertions)
+    after   après le chargement (construction sur les données, mesurée seule)
+    none    sans index: ceux du schéma sont supprimés (référence non indexée)
+
+Chaque base traduit l'index à sa façon (backend.create_index): index ou
+contrainte MongoDB / Neo4j, index secondaire ou TTL de table Cassandra. Une
+clé primaire Cassandra (partition + clustering) couvre déjà son préfixe;
+Redis n'a pas d'index secondaire. Tous les points InfluxDB portent
+l'étiquette indexes=<mode>: runs indexés et non indexés se comparent dans un
+même rapport. La mesure "schema" donne, par namespace, la durée de
+construction et le plan de la requête sonde (champ texte plan, indexed 0/1).
+"""
+import os
+import time
+from collections import namedtuple
+
+from influxdb_client import Point
+
+import metrics
+from backends import NotSupportedError
+from harness import skip_native
+from sampler import get_tag
+
+SCHEMA_STAGES = ("before", "after", "none")
+SCHEMA_STAGE = os.getenv("BENCH_SCHEMA_STAGE", "before")
+MEASUREMENT = "schema"
+
+# fields: tuple de champs; kind: index, unique, text ou ttl (ttl en secondes)
+Index = namedtuple("Index", ["fields", "kind", "ttl"], defaults=("index", None))
+
+
+def set_stage(stage):
+    """Change le moment de création des index et l'étiquette indexes des points"""
+    global SCHEMA_STAGE
+    if stage not in SCHEMA_STAGES:
+        raise ValueError(f"BENCH_SCHEMA_STAGE inconnu: {stage} (attendu: {', '.join(SCHEMA_STAGES)})")
+    SCHEMA_STAGE = stage
+    metrics.set_default_tags(indexes=stage)
+
+
+def index_name(ns, index):
+    """Nom stable de l'index (unique dans la base: préfixé par le namespace)"""
+    return f"{ns}_{'_'.join(index.fields)}_{index.kind}".lower()
+
+
+class Schema:
+    """Index par namespace + requête sonde (where de backend.query) par namespace"""
+
+    def __init__(self, indexes, probes=None):
+        self.indexes = indexes
+        self.probes = probes or {}
+        self._skipped = set()  # (base, ns) déjà signalés en stand-in
+
+    def provision(self, backend, ns, results, stage):
+        """
+        Étape `stage` ("before" juste après reset(), "after" une fois les
+        données chargées): crée les index si c'est le mode choisi, les
+        supprime en mode none, puis relève le plan de la sonde après chargement.
+        """
+        if ns not in self.indexes:
+            return
+        if stage == "before" and SCHEMA_STAGE == "none":
+            for index in self.indexes[ns]:
+                backend.drop_index(ns, index_name(ns, index))
+        if stage == SCHEMA_STAGE:
+            self.create(backend, ns, results)
+        if stage == "after":
+            self.explain(backend, ns, results)
+
+    def create(self, backend, ns, results):
+        """Crée les index du namespace, un par un, chacun chronométré"""
+        if backend.stand_in:
+            if (backend.name, ns) not in self._skipped:
+                self._skipped.add((backend.name, ns))
+                skip_native(backend, f"Schéma {ns}")
+            return
+        print(f"  🧱 Schéma {ns} ({SCHEMA_STAGE}): {len(self.indexes[ns])} index...")
+        total, created = 0.0, 0
+        for index in self.indexes[ns]:
+            name = index_name(ns, index)
+            start = time.perf_counter()
+            try:
+                if not backend.create_index(ns, name, index.fields, index.kind, index.ttl):
+                    print(f"     ℹ️  {name}: couvert par la clé primaire")
+                    continue
+            except NotSupportedError as e:
+                print(f"     ℹ️  {name}: {e}")
+                continue
+            elapsed = time.perf_counter() - start
+            results[f'index_{name}_build_s'] = elapsed
+            total += elapsed
+            created += 1
+            print(f"     ✅ {name} en {elapsed:.3f}s")
+        results[f'schema_{ns}_build_s'] = total
+        results[f'schema_{ns}_indexes'] = float(created)
+        results['schema_build_s'] = sum(value for key, value in results.items()
+                                        if key.startswith('schema_') and key.endswith('_build_s')
+                                        and key != 'schema_build_s')
+
+    def explain(self, backend, ns, results):
+        """Plan de la requête sonde, affiché, mis dans results et envoyé (mesure schema)"""
+        where = self.probes.get(ns)
+        if where is None or backend.stand_in:
+            return
+        try:
+            plan, indexed = backend.explain(ns, where)
+        except NotSupportedError:
+            return
+        results[f'plan_{ns}_indexed'] = 1.0 if indexed else 0.0
+        print(f"  🧭 Plan {ns} {where}: {plan}{'' if indexed else ' (sans index)'}")
+
+        point = Point(MEASUREMENT).tag("ns", ns).field("plan", plan).field("indexed", 1.0 if indexed else 0.0)
+        for key in ("scenario", "database"):
+            if get_tag(key) is not None:
+                point.tag(key, get_tag(key))
+        for field in ("build_s", "indexes"):
+            if f'schema_{ns}_{field}' in results:
+                point.field(field, results[f'schema_{ns}_{field}'])
+        metrics.write(point)
+
+
+set_stage(SCHEMA_STAGE)